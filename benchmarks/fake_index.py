@@ -0,0 +1,99 @@
+"""A local stand-in for PyPI serving minimal wheels of the package managers.
+
+The wheels only provide the console script of the tool, which exits at once.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import http.server
+import threading
+import zipfile
+from pathlib import Path
+
+TOOLS = ("pdm", "pipenv", "poetry", "uv")
+
+
+def _record_hash(data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def build_wheel(directory: Path, name: str, version: str) -> Path:
+    module = f"fake_{name}"
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        f"{module}/__init__.py": "def main():\n    pass\n",
+        f"{dist_info}/METADATA": (
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+        ),
+        f"{dist_info}/WHEEL": (
+            "Wheel-Version: 1.0\nGenerator: onepm-benchmarks\n"
+            "Root-Is-Purelib: true\nTag: py3-none-any\n"
+        ),
+        f"{dist_info}/entry_points.txt": (
+            f"[console_scripts]\n{name} = {module}:main\n"
+        ),
+    }
+    record = [
+        f"{path},{_record_hash(content.encode())},{len(content.encode())}"
+        for path, content in files.items()
+    ]
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = "\n".join(record) + "\n"
+    wheel = directory / f"{name}-{version}-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w") as zf:
+        for path, content in files.items():
+            zf.writestr(path, content)
+    return wheel
+
+
+def build_index(root: Path, versions: dict[str, list[str]]) -> Path:
+    """Build a PEP 503 simple repository under the root."""
+    packages = root / "packages"
+    packages.mkdir(parents=True, exist_ok=True)
+    for name, name_versions in versions.items():
+        links = []
+        for version in name_versions:
+            wheel = build_wheel(packages, name, version)
+            sha256 = hashlib.sha256(wheel.read_bytes()).hexdigest()
+            links.append(
+                f'<a href="../../packages/{wheel.name}#sha256={sha256}">'
+                f"{wheel.name}</a>"
+            )
+        project_dir = root / "simple" / name
+        project_dir.mkdir(parents=True, exist_ok=True)
+        project_dir.joinpath("index.html").write_text(
+            "<!DOCTYPE html>\n<html><body>\n" + "\n".join(links) + "\n</body></html>\n"
+        )
+    return root
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class FakeIndex:
+    """Serve the simple repository on localhost in a background thread."""
+
+    def __init__(self, root: Path) -> None:
+        def handler(*args, **kwargs):
+            return _QuietHandler(*args, directory=str(root), **kwargs)
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/simple/"
+
+    def __enter__(self) -> FakeIndex:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
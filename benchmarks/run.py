@@ -0,0 +1,377 @@
+"""Benchmarks of the time onepm takes before it hands off to the package manager.
+
+Everything runs in a temporary home with fake installations of the package
+managers, whose executables exit at once, and a local stand-in index, so no
+network access is needed. "cold" runs start without the resolution caches,
+the OS file cache is warm in both cases.
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --compare results.json
+
+Comparing exits with status 1 when the median of any benchmark regressed by
+more than the threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent / "src"))
+
+from fake_index import TOOLS, FakeIndex, build_index  # noqa: E402
+
+from onepm.core import OneManager  # noqa: E402
+
+RESULTS_VERSION = 1
+INSTALL_VERSION = "9.0.0"
+# Regressions smaller than this are considered noise, in seconds
+MIN_DELTA = 0.002
+PROJECT_MARKERS = {
+    "pdm": "pdm.lock",
+    "poetry": "poetry.lock",
+    "uv": "uv.lock",
+    "pipenv": "Pipfile",
+    "pip": None,
+}
+ENTRY_POINTS = {
+    "pi": "from onepm import pi; pi([])",
+    "pr": "from onepm import pr; pr(['true'])",
+    "pa": "from onepm import pa; pa(['--version'])",
+    **{
+        f"shim-{name}": f"from onepm_shims.shims import {name}; {name}(['--version'])"
+        for name in TOOLS
+    },
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=10, help="Runs of each benchmark"
+    )
+    parser.add_argument(
+        "-k", "--filter", help="Only run the benchmarks containing the string"
+    )
+    parser.add_argument("-o", "--output", help="Write the results to the JSON file")
+    parser.add_argument("--compare", help="Compare with the results in the JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The relative slowdown of the median reported as a regression",
+    )
+    return parser.parse_args()
+
+
+@contextlib.contextmanager
+def use_home(home: Path) -> Iterator[None]:
+    old = {key: os.environ.get(key) for key in ("HOME", "USERPROFILE")}
+    os.environ["HOME"] = os.environ["USERPROFILE"] = str(home)
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def add_fake_installation(core: OneManager, name: str, version: str) -> Path:
+    from packaging.version import Version
+
+    venv = core.package_dir(name) / f"{name}-{version}"
+    bin_dir = venv / ("Scripts" if sys.platform == "win32" else "bin")
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    executable = bin_dir / name
+    executable.write_text("#!/bin/sh\nexit 0\n")
+    executable.chmod(0o755)
+    dist_info = venv / "lib" / "site-packages" / f"{name}-{version}.dist-info"
+    dist_info.mkdir(parents=True, exist_ok=True)
+    dist_info.joinpath("METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    )
+    index = core.installation_index(name)
+    index.add(index.make_installation(Version(version), venv))
+    return venv
+
+
+def make_project(root: Path, name: str) -> Path:
+    project = root / name
+    project.mkdir(parents=True)
+    project.joinpath("pyproject.toml").write_text(
+        f'[project]\nname = "bench-{name}"\nversion = "0.1.0"\n'
+    )
+    marker = PROJECT_MARKERS[name]
+    if marker is not None:
+        project.joinpath(marker).touch()
+    return project
+
+
+@contextlib.contextmanager
+def chdir(path: Path) -> Iterator[None]:
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+class Suite:
+    def __init__(self, root: Path, repeat: int, pattern: str | None) -> None:
+        self.root = root
+        self.repeat = repeat
+        self.pattern = pattern
+        self.home = root / "home"
+        self.tool_dir = self.home / ".onepm"
+        self.results: dict[str, dict[str, Any]] = {}
+
+    def measure(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        setup: Callable[[], Any] | None = None,
+        repeat: int | None = None,
+    ) -> None:
+        if not self.selected(name):
+            return
+        times: list[float] = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        self.results[name] = {
+            "min": min(times),
+            "median": statistics.median(times),
+            "max": max(times),
+            "runs": len(times),
+        }
+        print(f"{name:<32} {format_time(statistics.median(times)):>10}")
+
+    def selected(self, name: str) -> bool:
+        return not self.pattern or self.pattern in name
+
+    def clear_resolutions(self) -> None:
+        shutil.rmtree(self.tool_dir / "cache" / "resolutions", ignore_errors=True)
+        shutil.rmtree(self.tool_dir / "shims" / "resolutions", ignore_errors=True)
+
+    def run_command(self, command: list[str], cwd: Path) -> None:
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                [str(HERE.parent / "src"), os.getenv("PYTHONPATH", "")]
+            ),
+            "PWD": str(cwd),
+        }
+        subprocess.run(
+            command,
+            cwd=cwd,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def bench_entry_points(self, project: Path) -> None:
+        self.measure(
+            "python-startup",
+            lambda: self.run_command([sys.executable, "-c", "pass"], project),
+        )
+        commands = {
+            name: [sys.executable, "-c", code] for name, code in ENTRY_POINTS.items()
+        }
+        if sys.platform != "win32":
+            from onepm.launchers import launcher_dir, write_launchers
+
+            write_launchers(self.tool_dir)
+            commands["launcher-poetry"] = [
+                str(launcher_dir(self.tool_dir) / "poetry"),
+                "--version",
+            ]
+        for name, command in commands.items():
+
+            def run(command: list[str] = command) -> None:
+                self.run_command(command, project)
+
+            self.measure(f"{name}[cold]", run, setup=self.clear_resolutions)
+            if self.selected(f"{name}[warm]"):
+                run()
+                self.measure(f"{name}[warm]", run)
+
+    def bench_detect(self, projects: dict[str, Path]) -> None:
+        for name, project in projects.items():
+
+            def detect(project: Path = project) -> None:
+                with chdir(project):
+                    OneManager(project).detect_package_manager()
+
+            self.measure(f"detect[{name}]", detect)
+
+    def bench_get_installations(self) -> None:
+        for count in (1, 5, 50):
+            with use_home(self.root / f"home-{count}"):
+                core = OneManager(self.root)
+                for i in range(count):
+                    add_fake_installation(core, "pdm", f"2.{i}.0")
+                index = core.installation_index("pdm")
+                self.measure(
+                    f"get_installations[{count}][cold]",
+                    lambda core=core: core.get_installations("pdm"),
+                    setup=lambda index=index: index.path.unlink(missing_ok=True),
+                )
+                self.measure(
+                    f"get_installations[{count}][warm]",
+                    lambda core=core: core.get_installations("pdm"),
+                )
+
+    def bench_install_tool(self, index_url: str) -> None:
+        from packaging.requirements import Requirement
+
+        core = OneManager(self.root, index_url=index_url)
+        requirement = Requirement(f"poetry=={INSTALL_VERSION}")
+
+        def uninstall() -> None:
+            if any(
+                str(i.version) == INSTALL_VERSION
+                for i in core.get_installations("poetry")
+            ):
+                core.cleanup("poetry", INSTALL_VERSION)
+
+        self.measure(
+            "install_tool",
+            lambda: core.install_tool("poetry", requirement),
+            setup=uninstall,
+            repeat=min(self.repeat, 3),
+        )
+
+    def bench_make_venv(self) -> None:
+        import venv
+
+        from onepm.venvs import create_venv
+
+        core = OneManager(self.root)
+        target = self.root / "bench-venv"
+        templates = self.tool_dir / "shared" / "venv-templates"
+
+        def remove_target() -> None:
+            shutil.rmtree(target, ignore_errors=True)
+
+        def remove_template() -> None:
+            remove_target()
+            shutil.rmtree(templates, ignore_errors=True)
+
+        self.measure(
+            "make_venv[stdlib]",
+            lambda: venv.create(target, symlinks=True),
+            setup=remove_target,
+        )
+        self.measure(
+            "make_venv[stdlib-with-pip]",
+            lambda: venv.create(target, symlinks=True, with_pip=True),
+            setup=remove_target,
+            repeat=min(self.repeat, 3),
+        )
+        self.measure(
+            "make_venv[onepm][cold]",
+            lambda: create_venv(target, templates),
+            setup=remove_template,
+        )
+        self.measure(
+            "make_venv[onepm][warm]",
+            lambda: create_venv(target, templates),
+            setup=remove_target,
+        )
+        self.measure(
+            "make_venv[onepm-with-pip]",
+            lambda: core.make_venv(target),
+            setup=remove_target,
+        )
+
+    def run(self) -> None:
+        projects = {name: make_project(self.root, name) for name in PROJECT_MARKERS}
+        index = build_index(
+            self.root / "index",
+            {name: ["1.0.0", INSTALL_VERSION] for name in TOOLS},
+        )
+        with FakeIndex(index) as fake_index, use_home(self.home):
+            os.environ["PIP_INDEX_URL"] = fake_index.url
+            os.environ["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
+            core = OneManager(self.root)
+            for name in TOOLS:
+                add_fake_installation(core, name, "1.0.0")
+            self.bench_entry_points(projects["poetry"])
+            self.bench_detect(projects)
+            self.bench_get_installations()
+            self.bench_install_tool(fake_index.url)
+            self.bench_make_venv()
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """Print the comparison and return the names of the regressed benchmarks."""
+    regressed: list[str] = []
+    print(f"\n{'benchmark':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+        change = current["median"] / base["median"] - 1
+        flag = ""
+        if change > threshold and current["median"] - base["median"] > MIN_DELTA:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<32} {format_time(base['median']):>10} "
+            f"{format_time(current['median']):>10} {change:>+8.1%}{flag}"
+        )
+    return regressed
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="onepm-bench-") as tmp:
+        suite = Suite(Path(tmp).resolve(), args.repeat, args.filter)
+        suite.run()
+    results = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": suite.results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} benchmark(s) regressed: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
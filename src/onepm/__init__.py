@@ -1,23 +1,101 @@
 from __future__ import annotations
 
 import sys
-from typing import Callable, NoReturn
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, NoReturn
 
-from onepm.core import OneManager
+from onepm.tracing import span, traced
+
+if TYPE_CHECKING:
+    from onepm.pm.base import PackageManager
+
+
+@traced("resolve_package_manager")
+def resolve_package_manager(specified: str | None = None) -> PackageManager:
+    """Resolve the package manager for the current project.
+
+    A valid entry in the resolution cache is used directly, so neither the
+    project file parser nor the installations are touched on a cache hit.
+    On a miss, the running daemon is asked before resolving in process.
+    """
+    from onepm.cache import ResolutionCache, use_installation
+    from onepm.pm import get_package_manager_class
+    from onepm.project import get_project
+
+    project = get_project().root
+    tool_dir = Path.home() / ".onepm"
+    cache = ResolutionCache(tool_dir)
+    with span("ResolutionCache.get"):
+        cached = cache.get(project, specified)
+    if cached is not None and (cached.venv is None or use_installation(cached.venv)):
+        return get_package_manager_class(cached.name)(cached.executable)
+
+    from onepm.daemon import query
+
+    with span("daemon.query"):
+        resolved = query(tool_dir, project, specified)
+    if resolved is not None and resolved.venv and use_installation(resolved.venv):
+        cache.set(
+            project,
+            specified,
+            resolved.name,
+            resolved.executable,
+            Path(resolved.venv).parent,
+        )
+        return get_package_manager_class(resolved.name)(resolved.executable)
+
+    with span("import onepm.core"):
+        from onepm.core import OneManager
+
+    core = OneManager(project)
+    package_manager = core.get_package_manager(specified)
+    cache.set(
+        project,
+        specified,
+        package_manager.name,
+        package_manager.executable,
+        core.package_dir(package_manager.name),
+    )
+    return package_manager
 
 
 def make_shortcut(method_name: str) -> Callable[[list[str] | None], NoReturn]:
     def main(args: list[str] | None = None) -> NoReturn:  # type: ignore[misc]
         if args is None:
             args = sys.argv[1:]
-        package_manager = OneManager().get_package_manager()
+        package_manager = resolve_package_manager()
         getattr(package_manager, method_name)(*args)
 
     return main
 
 
-pi = make_shortcut("install")
+def pi(args: list[str] | None = None) -> NoReturn:
+    """Install the project, or the given packages. Without arguments, nothing
+    is done if the environment is in sync, see ``onepm.fingerprint``.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    package_manager = resolve_package_manager()
+    if args and args != ["--force"]:
+        package_manager.install(*args)
+    else:
+        from onepm.fingerprint import install
+
+        install(package_manager, Path.home() / ".onepm", force=bool(args))
+
+
 pu = make_shortcut("update")
 pun = make_shortcut("uninstall")
-pr = make_shortcut("run")
 pa = make_shortcut("execute")
+
+
+def pr(args: list[str] | None = None) -> NoReturn:
+    """Run the command in the project environment, directly if possible, see
+    ``onepm.environments``.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    package_manager = resolve_package_manager()
+    from onepm.environments import run
+
+    run(package_manager, args, Path.home() / ".onepm")
@@ -0,0 +1,229 @@
+"""Run a shortcut across the projects under a directory.
+
+The projects are grouped by the package manager requirement they resolve to,
+so each missing package manager is installed once before the shortcut runs
+in the projects, as a bounded number of concurrent subprocesses. The output of each
+project is streamed with its path as prefix.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, TextIO
+
+from onepm.project import PROJECT_FILES
+
+if TYPE_CHECKING:
+    from packaging.requirements import Requirement
+
+    from onepm.core import OneManager
+
+# The shortcut run for each action
+SHORTCUTS = {
+    "install": "pi",
+    "update": "pu",
+    "uninstall": "pun",
+    "run": "pr",
+    "exec": "pa",
+}
+# Directories never containing projects of their own
+SKIPPED_DIRS = frozenset({"node_modules", "__pycache__", "site-packages"})
+
+
+@dataclass
+class ProjectResult:
+    project: Path
+    returncode: int
+    duration: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def discover_projects(root: Path, exclude: Iterable[str] = ()) -> list[Path]:
+    """Find the projects under the root, excluding the relative paths matching
+    any of the glob patterns.
+    """
+    exclude = list(exclude)
+    projects: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        directory = Path(dirpath)
+        relative = directory.relative_to(root).as_posix()
+        if any(fnmatch.fnmatch(relative, pattern) for pattern in exclude):
+            dirnames[:] = []
+            continue
+        if "pyvenv.cfg" in filenames:
+            # A virtualenv
+            dirnames[:] = []
+            continue
+        dirnames[:] = sorted(
+            d for d in dirnames if not d.startswith(".") and d not in SKIPPED_DIRS
+        )
+        if PROJECT_FILES.intersection(filenames):
+            projects.append(directory)
+    return projects
+
+
+def group_projects(
+    projects: Iterable[Path],
+) -> tuple[dict[tuple[str, str], list[Path]], list[ProjectResult]]:
+    """Group the projects by the detected package manager and requirement.
+
+    Return the groups and the results of the projects failed to detect.
+    """
+    from onepm.core import OneManager
+
+    groups: dict[tuple[str, str], list[Path]] = {}
+    failed: list[ProjectResult] = []
+    for project in projects:
+        try:
+            package_manager, requirement = OneManager(project).detect_package_manager()
+        except Exception as e:
+            failed.append(ProjectResult(project, 1, error=str(e)))
+            continue
+        groups.setdefault((package_manager.name, str(requirement)), []).append(project)
+    return groups, failed
+
+
+def provision(
+    core: OneManager, groups: Iterable[tuple[str, str]], jobs: int | None = None
+) -> dict[tuple[str, str], Exception]:
+    """Install the package managers required by the groups once each.
+
+    Return the errors of the groups failed to install.
+    """
+    from packaging.requirements import Requirement
+
+    if not core.shim_enabled():
+        return {}
+    to_install: dict[Requirement, tuple[str, str]] = {}
+    for name, spec in groups:
+        # pip lives in the venv of each project
+        if name == "pip":
+            continue
+        requirement = Requirement(spec)
+        if not any(
+            requirement.specifier.contains(i.version)
+            for i in core.get_installations(name)
+        ):
+            to_install[requirement] = (name, spec)
+    errors: dict[tuple[str, str], Exception] = {}
+    for requirement, result in core.prefetch(to_install, jobs):
+        if isinstance(result, Exception):
+            errors[to_install[requirement]] = result
+    return errors
+
+
+class OutputWriter:
+    """Write the lines of the projects to the stream, prefixed by the project."""
+
+    def __init__(self, root: Path, stream: TextIO) -> None:
+        self.root = root
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def prefix(self, project: Path) -> str:
+        relative = os.path.relpath(project, self.root)
+        return f"[{relative.replace(os.sep, '/')}]"
+
+    def write(self, project: Path, line: str) -> None:
+        with self._lock:
+            self.stream.write(f"{self.prefix(project)} {line.rstrip()}\n")
+            self.stream.flush()
+
+
+async def run_project(
+    project: Path,
+    action: str,
+    args: list[str],
+    writer: OutputWriter,
+    timeout: float | None = None,
+) -> ProjectResult:
+    from onepm.process import run_command
+
+    shortcut = SHORTCUTS[action]
+    command = [
+        sys.executable,
+        "-c",
+        f"import sys; from onepm import {shortcut}; {shortcut}(sys.argv[1:])",
+        *args,
+    ]
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    env.pop("VIRTUAL_ENV", None)
+    start = time.monotonic()
+    try:
+        result = await run_command(
+            command,
+            cwd=project,
+            env=env,
+            on_output=lambda _, line: writer.write(project, line),
+            timeout=timeout,
+            capture=False,
+            merge_stderr=True,
+        )
+    except subprocess.TimeoutExpired:
+        return ProjectResult(
+            project,
+            1,
+            time.monotonic() - start,
+            error=f"Timed out after {timeout} seconds",
+        )
+    except OSError as e:
+        return ProjectResult(project, 1, error=str(e))
+    return ProjectResult(project, result.returncode, result.duration)
+
+
+def run_batch(
+    core: OneManager,
+    root: Path,
+    action: str,
+    args: list[str],
+    *,
+    jobs: int | None = None,
+    exclude: Iterable[str] = (),
+    timeout: float | None = None,
+    stream: TextIO | None = None,
+) -> list[ProjectResult]:
+    """Run the shortcut of the action in all projects under the root.
+
+    The projects are given ``timeout`` seconds each to finish.
+    """
+    import asyncio
+
+    from onepm.core import DEFAULT_JOBS
+    from onepm.process import run_concurrently
+
+    writer = OutputWriter(root, stream or sys.stdout)
+    groups, results = group_projects(discover_projects(root, exclude))
+    for (_, spec), projects in groups.items():
+        writer.stream.write(f"{spec}: {len(projects)} project(s)\n")
+    errors = provision(core, groups, jobs)
+    to_run: list[Path] = []
+    for key, projects in groups.items():
+        if key in errors:
+            results.extend(
+                ProjectResult(project, 1, error=f"Failed to install {key[1]}")
+                for project in projects
+            )
+        else:
+            to_run.extend(projects)
+    finished = asyncio.run(
+        run_concurrently(
+            (run_project(p, action, args, writer, timeout) for p in to_run),
+            jobs or DEFAULT_JOBS,
+        )
+    )
+    for project, result in zip(to_run, finished, strict=True):
+        if isinstance(result, Exception):
+            result = ProjectResult(project, 1, error=str(result))
+        results.append(result)
+    return sorted(results, key=lambda r: r.project)
@@ -0,0 +1,173 @@
+"""Bundles of package manager installations for machines without network.
+
+A bundle is a compressed tarball holding the locks of the exported versions,
+the files they install and the cached index pages:
+
+    onepm-bundle.json      # the format version, environment and tools
+    locks/<name>.lock      # see onepm.lockfile
+    wheels/...             # the files of the locked packages
+    index/<name>.json      # the cached project pages of the index
+
+Importing it installs the tools from the locks in offline mode, so the venvs
+are created for the interpreter of the target machine rather than copied.
+The target must match the environment of the bundle.
+"""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Iterable
+
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from onepm.lockfile import LockFile, ToolLock, current_environment
+
+if TYPE_CHECKING:
+    from packaging.requirements import Requirement
+
+    from onepm.core import OneManager
+    from onepm.installations import Installation
+
+MANIFEST = "onepm-bundle.json"
+BUNDLE_FORMAT_VERSION = 1
+
+
+def _selected(
+    core: OneManager, specs: Iterable[Requirement]
+) -> list[tuple[str, Version]]:
+    from onepm.core import PACKAGE_MANAGERS
+
+    specs = list(specs)
+    selected: list[tuple[str, Version]] = []
+    for name in PACKAGE_MANAGERS:
+        requirements = [r for r in specs if canonicalize_name(r.name) == name]
+        if specs and not requirements:
+            continue
+        for installation in core.get_installations(name):
+            if not requirements or any(
+                r.specifier.contains(installation.version, prereleases=True)
+                for r in requirements
+            ):
+                selected.append((name, installation.version))
+    return selected
+
+
+def export_bundle(
+    core: OneManager, specs: Iterable[Requirement], output: Path
+) -> list[ToolLock]:
+    """Pack the installations matching any of the specs, or all if none is
+    given, into the bundle.
+    """
+    from onepm.core import PACKAGE_MANAGERS
+
+    specs = list(specs)
+    for spec in specs:
+        if canonicalize_name(spec.name) not in PACKAGE_MANAGERS:
+            raise ValueError(f"Not supported package-manager: {spec}")
+    locks: list[ToolLock] = []
+    for name, version in _selected(core, specs):
+        lock = core.find_tool_lock(name, version)
+        if lock is None:
+            # Installed before the locks were recorded
+            installation = next(
+                i for i in core.get_installations(name) if i.version == version
+            )
+            lock = core.lock_tool(name, version, installation.venv)
+        lock.packages = core._fetch_packages(lock)
+        locks.append(lock)
+    if not locks:
+        raise Exception("No installations to export")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for lock in locks:
+            LockFile(root / "locks" / f"{lock.name}.lock").add(lock)
+        manifest = {
+            "version": BUNDLE_FORMAT_VERSION,
+            "environment": current_environment(),
+            "tools": [{"name": lock.name, "version": lock.version} for lock in locks],
+        }
+        root.joinpath(MANIFEST).write_text(json.dumps(manifest, indent=2))
+        files = {MANIFEST: root / MANIFEST, "locks": root / "locks"}
+        for lock in locks:
+            for package in lock.packages:
+                path = core.wheel_cache.path(package)
+                files[_wheel_member(path, core.wheel_cache.root)] = path
+            index_page = core._tool_dir / "cache" / "index" / f"{lock.name}.json"
+            if index_page.exists():
+                files[f"index/{lock.name}.json"] = index_page
+        with tarfile.open(output, "w:gz") as tar:
+            for name, path in files.items():
+                tar.add(path, name)
+    return locks
+
+
+def _wheel_member(path: Path, root: Path) -> str:
+    return str(PurePosixPath("wheels", *path.relative_to(root).parts))
+
+
+def _safe_members(tar: tarfile.TarFile) -> list[tarfile.TarInfo]:
+    members = tar.getmembers()
+    for member in members:
+        path = PurePosixPath(member.name)
+        if (
+            path.is_absolute()
+            or ".." in path.parts
+            or not (member.isfile() or member.isdir())
+        ):
+            raise Exception(f"Unsafe member in the bundle: {member.name}")
+    return members
+
+
+def import_bundle(core: OneManager, archive: Path) -> list[Installation]:
+    """Install the tools in the bundle without accessing the network."""
+    with tempfile.TemporaryDirectory() as tmp, tarfile.open(archive, "r:*") as tar:
+        root = Path(tmp)
+        # The members are checked beforehand on the versions without filters
+        kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        tar.extractall(root, members=_safe_members(tar), **kwargs)
+        manifest = json.loads(root.joinpath(MANIFEST).read_text())
+        if manifest.get("version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format: {archive}")
+        environment = current_environment()
+        if manifest["environment"] != environment:
+            raise Exception(
+                f"The bundle is made for {manifest['environment']}, "
+                f"not for this machine ({environment})"
+            )
+
+        wheels = root / "wheels"
+        if wheels.exists():
+            for path in wheels.rglob("*"):
+                target = core.wheel_cache.root / path.relative_to(wheels)
+                if path.is_file() and not target.exists():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(path, target)
+        index_dir = core._tool_dir / "cache" / "index"
+        for page in root.glob("index/*.json"):
+            if not index_dir.joinpath(page.name).exists():
+                index_dir.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(page, index_dir / page.name)
+
+        locks = [
+            lock
+            for lockfile in root.glob("locks/*.lock")
+            for lock in LockFile(lockfile).load()
+        ]
+    offline, core.offline = core.offline, True
+    try:
+        installations: list[Installation] = []
+        for lock in locks:
+            with core._tool_lock(lock.name):
+                core.tool_lockfile(lock.name).add(lock)
+            installations.append(
+                core.install_tool_version(lock.name, Version(lock.version))
+            )
+    finally:
+        core.offline = offline
+    return installations
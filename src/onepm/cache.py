@@ -0,0 +1,163 @@
+"""On-disk cache of resolved package managers.
+
+Resolving the package manager requires parsing pyproject.toml, running the
+detection and scanning the installed venvs. The result only changes when one of
+the project files or the installations change, so it is stored under
+``~/.onepm/cache/resolutions`` and reused until any of the inputs differ.
+
+This module is imported on the hot path of every shortcut and shim, keep it
+free of third-party imports.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from onepm.locking import FileLock
+
+# The files that may affect the detection result
+TRACKED_FILES = (
+    "pyproject.toml",
+    "pdm.lock",
+    "poetry.lock",
+    "uv.lock",
+    "Pipfile",
+    "Pipfile.lock",
+    "onepm.lock",
+)
+
+
+# Touched whenever an installation is used, independent of the atime of the mount.
+# Processes using the installation hold a shared lock on it.
+LAST_USED_STAMP = ".onepm-last-used"
+
+_used_installations: list[FileLock] = []
+
+
+def use_installation(venv: str | Path) -> bool:
+    """Record the use of the installation and protect it from eviction.
+
+    The shared lock is held until this process, or the tool replacing it by
+    exec, exits. Return False if the installation has been removed.
+    """
+    stamp = os.path.join(venv, LAST_USED_STAMP)
+    lock = FileLock(stamp)
+    try:
+        lock.acquire(shared=True)
+    except OSError:
+        return False
+    if not os.path.exists(stamp):
+        # Evicted while waiting for the lock
+        lock.release()
+        return False
+    lock.keep_on_exec()
+    _used_installations.append(lock)
+    try:
+        os.utime(stamp)
+    except OSError:
+        pass
+    return True
+
+
+def absolute_executable(executable: str) -> str:
+    """Make a relative path absolute, leaving the names searched in PATH as is."""
+    if os.sep in executable or "/" in executable:
+        return os.path.abspath(executable)
+    return executable
+
+
+def installation_venv(executable: str, tool_dir: Path) -> str | None:
+    """Return the venv of the executable if it is a managed installation."""
+    # <tool_dir>/<venv>/bin/<executable>
+    candidate = Path(executable).parent.parent
+    return str(candidate) if candidate.parent == tool_dir else None
+
+
+class Resolution(NamedTuple):
+    name: str
+    executable: str
+    # The venv of the managed installation, if any
+    venv: str | None = None
+
+
+def stat_key(path: str | Path) -> list[int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def project_stats(project: Path) -> dict[str, list[int] | None]:
+    return {name: stat_key(project / name) for name in TRACKED_FILES}
+
+
+class ResolutionCache:
+    def __init__(self, tool_dir: Path) -> None:
+        self.root = tool_dir / "cache" / "resolutions"
+
+    def _entry_file(self, project: Path, specified: str | None) -> Path:
+        key = f"{project}\0{specified or ''}".encode("utf-8", "surrogateescape")
+        return self.root / f"{zlib.crc32(key):08x}.json"
+
+    @staticmethod
+    def fingerprint(project: Path, specified: str | None) -> dict[str, Any]:
+        return {
+            "project": str(project),
+            "specified": specified,
+            "virtual_env": os.getenv("VIRTUAL_ENV"),
+            "files": project_stats(project),
+        }
+
+    def get(self, project: Path, specified: str | None = None) -> Resolution | None:
+        """Return the cached resolution if it is still valid."""
+        try:
+            with open(self._entry_file(project, specified), "rb") as f:
+                entry = json.load(f)
+            resolved = entry.pop("resolved")
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+        if entry != self.fingerprint(project, specified):
+            return None
+        # Installing or removing a version changes the mtime of the tool dir
+        if resolved["tool_dir"] is not None and (
+            stat_key(resolved["tool_dir"]) != resolved["tool_dir_stat"]
+        ):
+            return None
+        if not os.path.exists(resolved["executable"]):
+            return None
+        return Resolution(resolved["name"], resolved["executable"], resolved["venv"])
+
+    def set(
+        self,
+        project: Path,
+        specified: str | None,
+        name: str,
+        executable: str,
+        tool_dir: Path | None = None,
+    ) -> None:
+        # The entry is shared by the subdirectories of the project
+        executable = absolute_executable(executable)
+        venv = installation_venv(executable, tool_dir) if tool_dir else None
+        entry = self.fingerprint(project, specified)
+        entry["resolved"] = {
+            "name": name,
+            "executable": executable,
+            "venv": venv,
+            "tool_dir": str(tool_dir) if tool_dir is not None else None,
+            "tool_dir_stat": stat_key(tool_dir) if tool_dir is not None else None,
+        }
+        entry_file = self._entry_file(project, specified)
+        try:
+            entry_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_file, entry_file)
+        except OSError:
+            # The cache is an optimization, never fail the command because of it
+            pass
@@ -1,14 +1,35 @@
+from __future__ import annotations
+
 import argparse
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from onepm.core import OneManager
+    from onepm.installations import Installation
 
 
 def parse_args() -> argparse.Namespace:
-    from onepm.core import PACKAGE_MANAGERS
+    from onepm.batch import SHORTCUTS
+    from onepm.pm import PACKAGE_MANAGER_CLASSES
 
     parser = argparse.ArgumentParser("onepm")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=None,
+        help="Only use local installations, never query the index",
+    )
     commands = parser.add_subparsers(dest="command", title="Command")
     commands.add_parser(
         "install", help="Install the package manager configured in project file"
     )
+    commands.add_parser(
+        "lock",
+        help="Lock the package manager of the project and its dependencies "
+        "in onepm.lock",
+    )
     use_cmd = commands.add_parser(
         "use", help="Use the package manager given by the requirement spec"
     )
@@ -19,7 +40,7 @@ def parse_args() -> argparse.Namespace:
     update_cmd.add_argument(
         "name",
         help="The name of package manager",
-        choices=PACKAGE_MANAGERS,
+        choices=list(PACKAGE_MANAGER_CLASSES),
         nargs=argparse.OPTIONAL,
     )
     cleanup_cmd = commands.add_parser(
@@ -28,7 +49,7 @@ def parse_args() -> argparse.Namespace:
     cleanup_cmd.add_argument(
         "name",
         nargs=argparse.OPTIONAL,
-        choices=list(PACKAGE_MANAGERS),
+        choices=list(PACKAGE_MANAGER_CLASSES),
         help="The name of package manager",
     )
     cleanup_cmd.add_argument(
@@ -36,31 +57,273 @@ def parse_args() -> argparse.Namespace:
         nargs=argparse.OPTIONAL,
         help="The version of the package to remove",
     )
+    cleanup_cmd.add_argument(
+        "--evict",
+        action="store_true",
+        help="Only remove the installations selected by the eviction policy",
+    )
+    cleanup_cmd.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the installations to remove and the reclaimable space",
+    )
     list_cmd = commands.add_parser(
         "list",
         aliases=["ls"],
         help="List all installed versions of the given package manager",
     )
     list_cmd.add_argument(
-        "name", help="The name of package manager", choices=list(PACKAGE_MANAGERS)
+        "name",
+        help="The name of package manager",
+        choices=list(PACKAGE_MANAGER_CLASSES),
+    )
+    prefetch_cmd = commands.add_parser(
+        "prefetch", help="Install many package manager versions concurrently"
+    )
+    prefetch_cmd.add_argument(
+        "specs", nargs="*", help="package manager requirement specs"
+    )
+    prefetch_cmd.add_argument(
+        "-r",
+        "--requirements",
+        action="append",
+        default=[],
+        help="Read requirement specs from the given file, one per line",
+    )
+    prefetch_cmd.add_argument(
+        "-p",
+        "--project",
+        action="append",
+        default=[],
+        help="Read the package manager spec from the project's [tool.onepm] table",
+    )
+    prefetch_cmd.add_argument(
+        "-j", "--jobs", type=int, help="The number of concurrent installations"
+    )
+    each_cmd = commands.add_parser(
+        "each",
+        aliases=["batch"],
+        help="Run a shortcut in all projects under a directory",
+    )
+    each_cmd.add_argument(
+        "action",
+        choices=list(SHORTCUTS),
+        help="The shortcut to run: pi, pu, pun, pr or pa respectively",
+    )
+    each_cmd.add_argument(
+        "args",
+        nargs=argparse.REMAINDER,
+        help="Arguments passed to the shortcut, the options of each go before ACTION",
+    )
+    each_cmd.add_argument(
+        "--root", default=".", help="The directory to search for projects"
+    )
+    each_cmd.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        help="Skip the projects whose relative path matches the glob pattern",
+    )
+    each_cmd.add_argument(
+        "-j", "--jobs", type=int, help="The number of projects to run concurrently"
+    )
+    each_cmd.add_argument(
+        "--timeout",
+        type=float,
+        help="Stop the projects not finished within the seconds",
+    )
+    export_cmd = commands.add_parser(
+        "export", help="Pack installed package managers into a bundle"
+    )
+    export_cmd.add_argument(
+        "specs",
+        nargs="*",
+        metavar="SPEC",
+        help="The installations to export, all if not given",
+    )
+    export_cmd.add_argument(
+        "-o", "--output", required=True, help="The path of the bundle to write"
+    )
+    import_cmd = commands.add_parser(
+        "import", help="Install the package managers in a bundle without network"
+    )
+    import_cmd.add_argument("bundle", help="The path of the bundle")
+    daemon_cmd = commands.add_parser(
+        "daemon", help="Serve the resolutions over a Unix socket to speed up the shims"
+    )
+    daemon_cmd.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between the checks for changed project files and installations",
     )
     return parser.parse_args()
 
 
-def main():
+def collect_prefetch_specs(args: argparse.Namespace) -> list[str]:
+    from onepm.core import OneManager
+
+    specs = list(args.specs)
+    for filename in args.requirements:
+        with open(filename) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    specs.append(line)
+    for project in args.project:
+        core = OneManager(Path(project))
+        spec = core.pyproject.get("tool", {}).get("onepm", {}).get("package-manager")
+        if spec is None:
+            print(f"No package-manager is configured in {project}", file=sys.stderr)
+        else:
+            specs.append(spec)
+    return specs
+
+
+def prefetch(core: OneManager, args: argparse.Namespace) -> int:
+    from packaging.requirements import InvalidRequirement, Requirement
+
+    specs = collect_prefetch_specs(args)
+    if not specs:
+        print("No requirement specs are given", file=sys.stderr)
+        return 1
+    print(f"Prefetching {len(specs)} package manager(s)")
+    requirements: list[Requirement] = []
+    failed = 0
+    for spec in specs:
+        try:
+            requirements.append(Requirement(spec))
+        except InvalidRequirement as e:
+            failed += 1
+            print(f"  failed {spec}: {format_error(e)}", file=sys.stderr)
+    for req, result in core.prefetch(requirements, args.jobs):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"  failed {req}: {format_error(result)}", file=sys.stderr)
+        else:
+            print(f"  ok     {req}: {result.version} ({result.venv})")
+    print(f"{len(specs) - failed} succeeded, {failed} failed")
+    return 1 if failed else 0
+
+
+def each(core: OneManager, args: argparse.Namespace) -> int:
+    import os
+
+    from onepm.batch import run_batch
+
+    if core.offline:
+        os.environ["ONEPM_OFFLINE"] = "1"
+    root = Path(args.root).absolute()
+    results = run_batch(
+        core,
+        root,
+        args.action,
+        args.args,
+        jobs=args.jobs,
+        exclude=args.exclude,
+        timeout=args.timeout,
+    )
+    if not results:
+        print(f"No projects are found under {root}", file=sys.stderr)
+        return 1
+    print("\nSummary:")
+    for result in results:
+        status = "ok    " if result.ok else "failed"
+        detail = result.error or f"{result.duration:.1f}s"
+        print(f"  {status} {os.path.relpath(result.project, root)} ({detail})")
+    failed = sum(not result.ok for result in results)
+    print(f"{len(results) - failed} succeeded, {failed} failed")
+    return 1 if failed else 0
+
+
+def format_size(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} GiB"
+
+
+def report_cleanup(removed: list[tuple[Installation, int]], dry_run: bool) -> None:
+    action = "Would remove" if dry_run else "Removed"
+    for installation, size in removed:
+        print(
+            f"{action} {installation.name} {installation.version} "
+            f"({format_size(size)}) {installation.venv}"
+        )
+    total = format_size(sum(size for _, size in removed))
+    if dry_run:
+        print(f"Reclaimable space: {total}")
+    else:
+        print(f"Freed space: {total}")
+
+
+def format_error(error: Exception) -> str:
+    stderr = getattr(error, "stderr", None)
+    if stderr:
+        lines = [line for line in stderr.splitlines() if line.strip()]
+        if lines:
+            return lines[-1].strip()
+    return str(error) or type(error).__name__
+
+
+def main() -> int | None:
     from onepm.core import OneManager
 
     args = parse_args()
-    core = OneManager()
+    core = OneManager(offline=args.offline)
     match args.command:
         case "install":
-            core.get_package_manager()
+            core.update_launchers(core.get_package_manager())
+        case "lock":
+            lock = core.lock_project()
+            print(
+                f"Locked {lock.name} {lock.version} with {len(lock.packages)} "
+                f"package(s) for {lock.environment}"
+            )
         case "update" | "up ":
             core.update_package_manager(args.name)
         case "use":
             core.use_package_manager(args.spec)
+            core.update_launchers(core.get_package_manager())
         case "cleanup":
-            core.cleanup(args.name, args.version)
+            if args.evict:
+                removed = core.evict(args.name, dry_run=args.dry_run)
+            else:
+                removed = core.cleanup(args.name, args.version, dry_run=args.dry_run)
+            report_cleanup(removed, args.dry_run)
         case "list" | "ls":
             for installation in core.get_installations(args.name):
                 print(f"- {installation.version} ({installation.venv})")
+        case "prefetch":
+            return prefetch(core, args)
+        case "each" | "batch":
+            return each(core, args)
+        case "export":
+            from packaging.requirements import Requirement
+
+            from onepm.bundle import export_bundle
+
+            locks = export_bundle(
+                core, [Requirement(spec) for spec in args.specs], Path(args.output)
+            )
+            for lock in locks:
+                print(f"Exported {lock.name} {lock.version}")
+        case "import":
+            from onepm.bundle import import_bundle
+
+            for installation in import_bundle(core, Path(args.bundle)):
+                print(f"Installed {installation.name} {installation.version}")
+        case "daemon":
+            from onepm.daemon import Daemon, socket_path
+
+            tool_dir = Path.home() / ".onepm"
+            daemon = Daemon(tool_dir, offline=args.offline, interval=args.interval)
+            print(f"Listening on {socket_path(tool_dir)}")
+            try:
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    return None
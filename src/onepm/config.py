@@ -0,0 +1,91 @@
+"""The user configuration of onepm.
+
+Settings are read from ``~/.onepm/config.toml`` and can be overridden by
+``ONEPM_*`` environment variables:
+
+```toml
+offline = false
+index-cache-ttl = 600  # seconds to reuse the project pages fetched from the index
+index-urls = ["https://mirror.example.org/simple", "https://pypi.org/simple"]
+shared-store = true  # share identical files of tool venvs via hard links
+installer = "auto"  # install the tools with uv if available, or "uv", "pip"
+compile-bytecode = true  # compile the tool venvs when they are installed
+compile-jobs = 0  # processes to compile with, 0 for all cores
+warmup = false  # import the tool once after installing it
+
+[eviction]  # see onepm.eviction
+max-versions = 5
+```
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomlkit as tomllib
+
+
+SCALAR_TYPES = ("bool", "int", "str")
+# Set by environment variables as whitespace-separated values
+LIST_TYPES = ("list[str]",)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _convert(value: Any, type_: str) -> Any:
+    if type_ == "bool":
+        return _to_bool(value)
+    if type_ == "int":
+        return int(value)
+    if type_ in LIST_TYPES:
+        return value.split() if isinstance(value, str) else list(value)
+    return value
+
+
+@dataclass
+class Config:
+    """Each field is read from the key with dashes in the config file, scalar
+    and list fields can also be set by the ``ONEPM_<NAME>`` environment variable.
+    """
+
+    offline: bool = False
+    index_cache_ttl: int = 600
+    # Queried concurrently with the fastest first, see onepm.indexes
+    index_urls: list[str] = field(default_factory=list)
+    shared_store: bool = True
+    installer: str = "auto"
+    compile_bytecode: bool = True
+    compile_jobs: int = 0
+    warmup: bool = False
+    eviction: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, tool_dir: Path) -> Config:
+        try:
+            with open(tool_dir / "config.toml", "rb") as f:
+                data: dict[str, Any] = tomllib.load(f)
+        except FileNotFoundError:
+            data = {}
+        config = cls()
+        for f in fields(cls):
+            key = f.name.replace("_", "-")
+            env_var = f"ONEPM_{f.name.upper()}"
+            if env_var in os.environ and f.type in (*SCALAR_TYPES, *LIST_TYPES):
+                value = os.environ[env_var]
+            elif key in data:
+                value = data[key]
+            else:
+                continue
+            setattr(config, f.name, _convert(value, str(f.type)))
+        return config
@@ -1,55 +1,80 @@
 from __future__ import annotations
 
+import json
 import os
 import shutil
 import subprocess
 import sys
-import uuid
-from dataclasses import dataclass
+import threading
 from functools import cached_property
-from importlib.metadata import Distribution
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
 
-import tomlkit
-from packaging.requirements import Requirement
+from packaging.requirements import InvalidRequirement, Requirement
 from packaging.utils import canonicalize_name
 from packaging.version import Version
 
+from onepm.cache import LAST_USED_STAMP, use_installation
+from onepm.config import Config
+from onepm.eviction import EvictionPolicy, disk_usage, select_evictions
+from onepm.installations import INCOMPLETE_MARKER, Installation, InstallationIndex
+from onepm.lockfile import (
+    LOCK_FILENAME,
+    LockedPackage,
+    LockFile,
+    ToolLock,
+    WheelCache,
+    current_environment,
+)
+from onepm.locking import FileLock, ReentrantFileLock
+from onepm.pm import PACKAGE_MANAGER_CLASSES, get_package_manager_class
 from onepm.pm.base import PackageManager
-from onepm.pm.pdm import PDM
-from onepm.pm.pip import Pip
-from onepm.pm.pipenv import Pipenv
-from onepm.pm.poetry import Poetry
-from onepm.pm.uv import Uv
+from onepm.project import get_project
+from onepm.store import SharedStore
+from onepm.tracing import span, traced
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomlkit as tomllib
 
 if TYPE_CHECKING:
-    from unearth import PackageFinder
+    from unearth import Package, PackageFinder
+
+    from onepm.httpcache import CachingClient
+    from onepm.indexes import IndexHealth
 
 
 PACKAGE_MANAGERS: dict[str, type[PackageManager]] = {
-    p.name: p  # type: ignore[type-abstract]
-    for p in [Pipenv, PDM, Poetry, Uv, Pip]
+    name: get_package_manager_class(name) for name in PACKAGE_MANAGER_CLASSES
 }
 
-MAX_VERSION_NUMBER = 5  # keep 5 versions of each package at most
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
 
 
 class OneManager:
     pyproject: dict[str, Any]
 
+    @traced("OneManager.__init__")
     def __init__(
-        self, path: Path | None = None, *, index_url: str | None = None
+        self,
+        path: Path | None = None,
+        *,
+        index_url: str | None = None,
+        offline: bool | None = None,
     ) -> None:
-        self.path = path or Path.cwd()
+        self.context = get_project(path)
+        self.path = self.context.root
         self.index_url = index_url
-        try:
-            with open(self.path / "pyproject.toml", "rb") as f:
-                self.pyproject = tomlkit.load(f)
-        except FileNotFoundError:
-            self.pyproject = {}
+        self.pyproject = self.context.pyproject
 
         self._tool_dir = Path.home() / ".onepm"
+        self._locks: dict[str, ReentrantFileLock] = {}
+        self._index_finders: dict[str, PackageFinder] = {}
+        self._finders_lock = threading.Lock()
+        with span("Config.load"):
+            self.config = Config.load(self._tool_dir)
+        self.offline = self.config.offline if offline is None else offline
 
     def shim_enabled(self) -> bool:
         try:
@@ -67,18 +92,141 @@ class OneManager:
 
         import unearth
 
-        index_urls = [self.index_url] if self.index_url else []
-        return unearth.PackageFinder(index_urls=index_urls)
+        return unearth.PackageFinder(self.http_session, index_urls=self.index_urls)
+
+    @property
+    def http_session(self) -> CachingClient:
+        """The client shared by the finders of the process, see onepm.httpcache."""
+        from onepm.httpcache import get_session
+
+        return get_session(self._tool_dir, self.index_urls)
+
+    @property
+    def index_urls(self) -> list[str]:
+        """The indexes given explicitly, or configured, PyPI if empty."""
+        return [self.index_url] if self.index_url else self.config.index_urls
+
+    @cached_property
+    def index_health(self) -> IndexHealth:
+        from onepm.indexes import IndexHealth
+
+        return IndexHealth(self._tool_dir / "cache" / "index-health.json")
+
+    def _index_finder(self, url: str) -> PackageFinder:
+        """The finder of the single index, each used by one thread at a time."""
+        import unearth
+
+        with self._finders_lock:
+            if url not in self._index_finders:
+                self._index_finders[url] = unearth.PackageFinder(
+                    self.http_session, index_urls=[url]
+                )
+            return self._index_finders[url]
+
+    def _find_on_indexes(self, name: str) -> list[Package]:
+        if len(self.index_urls) < 2:
+            return list(self.package_finder.find_all_packages(name, allow_yanked=True))
+
+        from onepm.indexes import query_fastest
+
+        def query(url: str) -> list[Package]:
+            packages = list(
+                self._index_finder(url).find_all_packages(name, allow_yanked=True)
+            )
+            if not packages:
+                # Wait for a mirror having the project
+                raise LookupError(f"{name} is not found on {url}")
+            return packages
+
+        try:
+            return query_fastest(self.index_urls, query, self.index_health)
+        except LookupError:
+            return []
+
+    def find_packages(self, name: str) -> list[Package]:
+        """Find all packages of the given name on the index, best match first.
+
+        The project pages are cached on disk and reused for
+        ``index-cache-ttl`` seconds.
+        """
+        import time
+
+        from unearth import Link, Package
+
+        if self.offline:
+            raise Exception(
+                f"Cannot query the index for {name}, onepm is running in offline mode"
+            )
+        name = canonicalize_name(name)
+        cache_file = self._tool_dir / "cache" / "index" / f"{name}.json"
+        try:
+            with open(cache_file, "rb") as f:
+                cached = json.load(f)
+            if (
+                cached["index_urls"] == self.index_urls
+                and time.time() - cached["fetched"] < self.config.index_cache_ttl
+            ):
+                return [
+                    Package(item["name"], item["version"], Link(**item["link"]))
+                    for item in cached["packages"]
+                ]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        with span("PackageFinder.find_all_packages", name=name):
+            packages = self._find_on_indexes(name)
+        data = {
+            "index_urls": self.index_urls,
+            "fetched": time.time(),
+            "packages": [
+                {
+                    "name": p.name,
+                    "version": p.version,
+                    "link": {
+                        "url": p.link.url,
+                        "comes_from": p.link.comes_from,
+                        "yank_reason": p.link.yank_reason,
+                        "requires_python": p.link.requires_python,
+                        "hashes": p.link.hashes,
+                    },
+                }
+                for p in packages
+            ],
+        }
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{threading.get_ident()}")
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, cache_file)
+        return packages
 
+    def find_best_match(self, requirement: Requirement) -> Package | None:
+        packages = self.find_packages(requirement.name)
+        # Yanked versions are only allowed when pinned, per PEP 592
+        allow_yanked = any(
+            spec.operator in ("==", "===") and not spec.version.endswith("*")
+            for spec in requirement.specifier
+        )
+        candidates = [p for p in packages if allow_yanked or not p.link.yank_reason]
+        allowed = set(
+            requirement.specifier.filter(p.version for p in candidates if p.version)
+        )
+        return next((p for p in candidates if p.version in allowed), None)
+
+    @traced("OneManager.detect_package_manager")
     def detect_package_manager(
-        self, specified: str | None = None
+        self, specified: str | None = None, *, use_lock: bool = True
     ) -> tuple[type[PackageManager], Requirement]:
+        """Return the package manager of the project and its requirement, pinned
+        to the version in onepm.lock if any matches unless ``use_lock`` is false.
+        """
         requested: str | None = (
             self.pyproject.get("tool", {}).get("onepm", {}).get("package-manager")
         )
         package_manager: type[PackageManager] | None = None
         requirement: Requirement | None = None
         if requested:
+            self.register_project()
             requirement = Requirement(requested)
             name = canonicalize_name(requirement.name)
             if specified and specified != name:
@@ -92,41 +240,59 @@ class OneManager:
             package_manager = PACKAGE_MANAGERS[specified]
         else:
             for pm in PACKAGE_MANAGERS.values():
-                if pm.matches(self.pyproject):
+                if pm.matches(self.context):
                     package_manager = pm
                     break
         assert package_manager is not None
         if requirement is None:
             requirement = Requirement(package_manager.name)
+        if use_lock and (
+            locked := self.locked_version(package_manager.name, requirement)
+        ):
+            requirement = Requirement(f"{package_manager.name}=={locked}")
         return package_manager, requirement
 
+    @traced("OneManager.get_package_manager")
     def get_package_manager(self, specified: str | None = None) -> PackageManager:
         package_manager, requirement = self.detect_package_manager(specified)
         executable = str(package_manager.ensure_executable(self, requirement))
-        return package_manager(executable)
+        return package_manager(executable, self.context)
 
     def package_dir(self, name: str) -> Path:
         return self._tool_dir / "venvs" / name
 
+    def installation_index(self, name: str) -> InstallationIndex:
+        return InstallationIndex(
+            name,
+            self.package_dir(name),
+            PACKAGE_MANAGERS[name].get_executable_name(),
+            lock=self._tool_lock(name),
+        )
+
+    @traced("OneManager.get_installations")
     def get_installations(self, name: str) -> list[Installation]:
-        venvs = self.package_dir(name)
-        if not venvs.exists():
-            return []
-        versions: list[Installation] = []
-        for venv in venvs.iterdir():
-            candidate = next(
-                venv.glob(f"lib/**/site-packages/{name}-*.dist-info"), None
-            )
-            if candidate is None:
-                continue
-            versions.append(Installation(name, Distribution.at(candidate), venv))
-        return sorted(versions, key=lambda i: i.version, reverse=True)
+        """The installations of the tool, except those whose interpreter has
+        changed, which are removed by the next eviction.
+        """
+        return [
+            i
+            for i in self.installation_index(name).load()
+            if not i.interpreter_changed()
+        ]
+
+    @cached_property
+    def shared_store(self) -> SharedStore:
+        return SharedStore(self._tool_dir / "shared" / "objects")
 
-    def cleanup(self, name: str | None, version: str | None) -> None:
+    def cleanup(
+        self, name: str | None, version: str | None, *, dry_run: bool = False
+    ) -> list[tuple[Installation, int]]:
+        """Remove the installations, return them with their sizes in bytes."""
         if name is None:
-            shutil.rmtree(self._tool_dir / "venvs", ignore_errors=True)
-            return
-        if version is not None:
+            installations = [
+                i for tool in PACKAGE_MANAGERS for i in self.get_installations(tool)
+            ]
+        elif version is not None:
             matched = next(
                 (
                     i
@@ -137,55 +303,484 @@ class OneManager:
             )
             if matched is None:
                 raise ValueError(f"No installation of {name}=={version} is found")
-            shutil.rmtree(matched.venv)
-            return
+            installations = [matched]
+        else:
+            installations = self.get_installations(name)
+        removed = [(i, disk_usage(i.venv)) for i in installations]
+        if dry_run:
+            return removed
+        if name is None:
+            shutil.rmtree(self._tool_dir / "venvs", ignore_errors=True)
+        elif version is not None:
+            shutil.rmtree(installations[0].venv)
+            self.installation_index(name).remove(installations[0].venv)
+        else:
+            package_dir = self.package_dir(name)
+            if package_dir.exists():
+                shutil.rmtree(package_dir)
+            self.installation_index(name).delete()
+        self.shared_store.prune()
+        return removed
+
+    def registered_projects(self) -> list[Path]:
+        try:
+            with open(self._tool_dir / "projects.json", "rb") as f:
+                return [Path(p) for p in json.load(f)["projects"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def _save_projects(self, projects: list[Path]) -> None:
+        projects_file = self._tool_dir / "projects.json"
+        projects_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = projects_file.with_name(f"{projects_file.name}.{os.getpid()}")
+        with open(tmp_file, "w") as f:
+            json.dump({"projects": [str(p) for p in projects]}, f, indent=2)
+        os.replace(tmp_file, projects_file)
+
+    def register_project(self) -> None:
+        """Remember the project, the versions it requests are never evicted."""
+        projects = self.registered_projects()
+        if self.path not in projects:
+            self._save_projects([*projects, self.path])
+
+    def pinned_venvs(self) -> set[Path]:
+        """The installations that the registered projects would use."""
+        pinned: set[Path] = set()
+        projects = self.registered_projects()
+        alive: list[Path] = []
+        for project in projects:
+            try:
+                with open(project / "pyproject.toml", "rb") as f:
+                    spec = tomllib.load(f)["tool"]["onepm"]["package-manager"]
+                requirement = Requirement(spec)
+            except (OSError, ValueError, KeyError, TypeError, InvalidRequirement):
+                continue
+            alive.append(project)
+            name = canonicalize_name(requirement.name)
+            if name not in PACKAGE_MANAGERS:
+                continue
+            matched = next(
+                (
+                    i
+                    for i in self.get_installations(name)
+                    if requirement.specifier.contains(i.version)
+                ),
+                None,
+            )
+            if matched is not None:
+                pinned.add(matched.venv)
+        if len(alive) < len(projects):
+            self._save_projects(alive)
+        return pinned
+
+    @traced("OneManager.evict")
+    def evict(
+        self,
+        name: str | None = None,
+        *,
+        dry_run: bool = False,
+        reserve: int = 0,
+        total: bool = True,
+    ) -> list[tuple[Installation, int]]:
+        """Remove the installations selected by the eviction policy.
+
+        The per-tool limits are applied to the given tool or all tools, and the
+        global ``total-max-bytes`` limit to all installations unless ``total`` is
+        false. ``reserve`` slots are left for the given tool. Return the evicted
+        installations with their sizes in bytes.
+
+        The tool locks are acquired one at a time, so this must not be called
+        with the lock of a tool held unless ``total`` is false and ``name`` is
+        that tool.
+        """
+        table = self.config.eviction
+        total_max_bytes = int(table.get("total-max-bytes", 0)) if total else 0
+        pinned = self.pinned_venvs()
+        sizes: dict[Path, int] = {}
+        evicted: list[Installation] = []
+        remaining: list[Installation] = []
+        for tool in PACKAGE_MANAGERS:
+            installations = self.installation_index(tool).load()
+            if name is None or tool == name:
+                # The venvs are broken by the change of their interpreter
+                broken = [i for i in installations if i.interpreter_changed()]
+                evicted.extend(broken)
+                installations = [i for i in installations if i not in broken]
+                policy = EvictionPolicy.for_tool(table, tool)
+                if policy.max_bytes > 0 or total_max_bytes > 0:
+                    sizes.update((i.venv, disk_usage(i.venv)) for i in installations)
+                selected = select_evictions(
+                    installations,
+                    policy,
+                    pinned,
+                    reserve=reserve if tool == name else 0,
+                    sizes=sizes,
+                )
+                evicted.extend(selected)
+                installations = [i for i in installations if i not in selected]
+            elif total_max_bytes > 0:
+                sizes.update((i.venv, disk_usage(i.venv)) for i in installations)
+            remaining.extend(installations)
+        if total_max_bytes > 0:
+            evicted.extend(
+                select_evictions(
+                    remaining,
+                    EvictionPolicy(max_versions=0, max_bytes=total_max_bytes),
+                    pinned,
+                    sizes=sizes,
+                )
+            )
+
+        result = [(i, sizes.get(i.venv) or disk_usage(i.venv)) for i in evicted]
+        if dry_run:
+            return result
+        removed: list[tuple[Installation, int]] = []
+        for installation, size in result:
+            with self._tool_lock(installation.name):
+                if self._remove_unused(installation.venv):
+                    self.installation_index(installation.name).remove(installation.venv)
+                    removed.append((installation, size))
+        for tool in [name] if name else PACKAGE_MANAGERS:
+            self._remove_stale_installs(tool)
+        if removed:
+            self.shared_store.prune()
+        return removed
+
+    def _remove_unused(self, venv: Path) -> bool:
+        """Remove the venv unless another process is using it."""
+        lock = FileLock(venv / LAST_USED_STAMP)
+        try:
+            if not lock.acquire(blocking=False):
+                return False
+        except OSError:
+            # Already removed
+            return True
+        try:
+            shutil.rmtree(venv, ignore_errors=True)
+        finally:
+            lock.release()
+        if venv.exists():  # Open files can't be removed on Windows
+            shutil.rmtree(venv, ignore_errors=True)
+        return True
+
+    def _remove_stale_installs(self, name: str) -> None:
+        """Remove the venvs left behind by interrupted installations."""
         package_dir = self.package_dir(name)
-        if package_dir.exists():
-            shutil.rmtree(package_dir)
+        if not package_dir.exists():
+            return
+        for venv in package_dir.iterdir():
+            try:
+                version = venv.joinpath(INCOMPLETE_MARKER).read_text().strip()
+            except OSError:
+                continue
+            if not version:
+                # The marker is being written
+                continue
+            lock = FileLock(self._lock(f"{name}-{version}").path)
+            if lock.acquire(blocking=False):
+                try:
+                    shutil.rmtree(venv, ignore_errors=True)
+                finally:
+                    lock.release()
 
-    def install_tool(self, name: str, requirement: Requirement) -> Installation:
-        best_match = self.package_finder.find_best_match(requirement).best
+    def _lock(self, key: str) -> ReentrantFileLock:
+        if key not in self._locks:
+            lock_dir = self._tool_dir / "locks"
+            lock_dir.mkdir(parents=True, exist_ok=True)
+            self._locks.setdefault(key, ReentrantFileLock(lock_dir / f"{key}.lock"))
+        return self._locks[key]
+
+    def _tool_lock(self, name: str) -> ReentrantFileLock:
+        """Guard the index and the eviction of the tool across processes."""
+        return self._lock(name)
+
+    @traced("OneManager.resolve_tool")
+    def resolve_tool(self, requirement: Requirement) -> Version:
+        """Find the best version of the tool on the index.
+
+        In offline mode, only the installed versions are considered.
+        """
+        if self.offline:
+            name = canonicalize_name(requirement.name)
+            installed = next(
+                (
+                    i
+                    for i in self.get_installations(name)
+                    if requirement.specifier.contains(i.version, prereleases=True)
+                ),
+                None,
+            )
+            if installed is None:
+                raise Exception(
+                    f"No installation matches requirement {requirement} "
+                    "and onepm is running in offline mode"
+                )
+            return installed.version
+        best_match = self.find_best_match(requirement)
         if best_match is None:
             raise Exception(f"Cannot find package matching requirement {requirement}")
-        version = Version(best_match.version or "")
-        installed_versions = self.get_installations(name)
-        if (
-            installed := next(
-                (i for i in installed_versions if i.version == version), None
+        return Version(best_match.version or "")
+
+    def install_tool(self, name: str, requirement: Requirement) -> Installation:
+        version = self.locked_version(name, requirement) or self.resolve_tool(
+            requirement
+        )
+        return self.install_tool_version(name, version)
+
+    @property
+    def project_lockfile(self) -> LockFile | None:
+        if not self.context.exists(LOCK_FILENAME):
+            return None
+        return LockFile(self.path / LOCK_FILENAME)
+
+    def locked_version(self, name: str, requirement: Requirement) -> Version | None:
+        """The version of the tool matching the requirement in onepm.lock."""
+        lockfile = self.project_lockfile
+        return lockfile.find_version(name, requirement) if lockfile else None
+
+    def tool_lockfile(self, name: str) -> LockFile:
+        return LockFile(self._tool_dir / "tool-locks" / f"{name}.lock")
+
+    @cached_property
+    def wheel_cache(self) -> WheelCache:
+        session = self.http_session if self.shim_enabled() else None
+        return WheelCache(self._tool_dir / "cache" / "wheels", session)
+
+    def find_tool_lock(self, name: str, version: Version) -> ToolLock | None:
+        """Find the lock of the tool version for the current environment, in
+        onepm.lock first and then in the locks of the user.
+        """
+        environment = current_environment()
+        for lockfile in (self.project_lockfile, self.tool_lockfile(name)):
+            if lockfile is not None and (
+                lock := lockfile.get(name, str(version), environment)
+            ):
+                return lock
+        return None
+
+    @traced("OneManager.lock_tool")
+    def lock_tool(self, name: str, version: Version, venv: Path) -> ToolLock:
+        """Resolve the dependencies of the tool version with the python of the
+        venv, and record the lock in the locks of the user.
+        """
+        report = venv / ".onepm-report.json"
+        self._run_pip(
+            "install",
+            "--dry-run",
+            "--ignore-installed",
+            "--report",
+            str(report),
+            f"{name}=={version}",
+            venv=venv,
+            use_uv=False,
+        )
+        try:
+            with open(report, "rb") as f:
+                data = json.load(f)
+        finally:
+            report.unlink(missing_ok=True)
+        lock = ToolLock.from_report(name, str(version), current_environment(), data)
+        # The index may not tell the hashes, take them from the files
+        lock.packages = self._fetch_packages(lock)
+        with self._tool_lock(name):
+            self.tool_lockfile(name).add(lock)
+        return lock
+
+    def _fetch_packages(self, lock: ToolLock) -> list[LockedPackage]:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=DEFAULT_JOBS) as executor:
+            return list(
+                executor.map(
+                    lambda p: self.wheel_cache.fetch(p, offline=self.offline),
+                    lock.packages,
+                )
             )
-        ) is not None:
-            return installed
 
-        installed_versions.sort(key=Installation.get_access_time)
+    def _install_locked(self, lock: ToolLock, venv: Path) -> None:
+        """Install the locked files without resolving the dependencies."""
+        packages = self._fetch_packages(lock)
+        files = [str(self.wheel_cache.path(p)) for p in packages]
+        if self.offline:
+            files.insert(0, "--no-index")
+        self._run_pip("install", "--no-deps", *files, venv=venv)
+        self._precompile(lock.name, venv)
 
-        if len(installed_versions) >= MAX_VERSION_NUMBER:
-            to_remove = installed_versions[
-                : len(installed_versions) - MAX_VERSION_NUMBER + 1
-            ]
-            for v in to_remove:
-                shutil.rmtree(v.venv)
-        venv_dir = self.package_dir(name) / str(uuid.uuid4())
-        self._run_pip("install", f"{name}=={version}", venv=venv_dir)
-        dist = Distribution.at(
-            next(venv_dir.glob(f"lib/**/site-packages/{name}-*.dist-info"))
+    def _precompile(self, name: str, venv: Path) -> None:
+        """Compile the venv and warm up the tool as configured, so that its
+        first run doesn't pay for it, or every run on a read-only file system.
+        """
+        from onepm.venvs import compile_bytecode, warmup
+
+        if self.config.compile_bytecode:
+            compile_bytecode(venv, self.config.compile_jobs)
+        module = PACKAGE_MANAGERS[name].warmup_module
+        if self.config.warmup and module is not None:
+            warmup(venv, module)
+
+    @traced("OneManager.install_tool_version")
+    def install_tool_version(self, name: str, version: Version) -> Installation:
+        import uuid
+
+        index = self.installation_index(name)
+        # Concurrent installations of the same version wait for the first one
+        with self._lock(f"{name}-{version}"):
+            with self._tool_lock(name):
+                installed_versions = index.load()
+                if (
+                    installed := next(
+                        (i for i in installed_versions if i.version == version), None
+                    )
+                ) is not None:
+                    return installed
+
+                # Only this tool, the others' locks can't be taken while holding it
+                self.evict(name, reserve=1, total=False)
+            venv_dir = self.package_dir(name) / str(uuid.uuid4())
+            marker = venv_dir / INCOMPLETE_MARKER
+            try:
+                venv_dir.mkdir(parents=True)
+                marker.write_text(str(version))
+                lock = self.find_tool_lock(name, version)
+                if lock is None:
+                    lock = self.lock_tool(name, version, venv_dir)
+                self._install_locked(lock, venv_dir)
+            except BaseException:
+                # Don't leave a half-built venv behind
+                shutil.rmtree(venv_dir, ignore_errors=True)
+                raise
+            if self.config.shared_store:
+                lib_dir = "Lib" if sys.platform == "win32" else "lib"
+                self.shared_store.link_tree(venv_dir / lib_dir)
+            marker.unlink()
+            # Publish the installation
+            installation = index.make_installation(
+                version, venv_dir, python=sys.executable
+            )
+            index.add(installation)
+        if self.config.eviction.get("total-max-bytes"):
+            self.evict()
+        return installation
+
+    def prefetch(
+        self, requirements: Iterable[Requirement], jobs: int | None = None
+    ) -> Iterator[tuple[Requirement, Installation | Exception]]:
+        """Install the given tools concurrently, yielding the results as they finish.
+
+        All requirements are resolved first, so that the same version requested
+        by several specs is only installed once.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        with ThreadPoolExecutor(max_workers=jobs or DEFAULT_JOBS) as executor:
+            resolving = {
+                executor.submit(self.resolve_tool, req): req for req in requirements
+            }
+            to_install: dict[tuple[str, Version], list[Requirement]] = {}
+            for future in as_completed(resolving):
+                req = resolving[future]
+                name = canonicalize_name(req.name)
+                try:
+                    if name not in PACKAGE_MANAGERS:
+                        raise ValueError(f"Not supported package-manager: {req}")
+                    version = future.result()
+                except Exception as e:
+                    yield req, e
+                else:
+                    to_install.setdefault((name, version), []).append(req)
+
+            installing = {
+                executor.submit(self.install_tool_version, *key): key
+                for key in to_install
+            }
+            for future in as_completed(installing):
+                try:
+                    result: Installation | Exception = future.result()
+                except Exception as e:
+                    result = e
+                for req in to_install[installing[future]]:
+                    yield req, result
+
+    def make_venv(
+        self, venv: Path, with_pip: bool = True, python: str | None = None
+    ) -> Path:
+        """Create the venv of the interpreter, the running one by default, unless
+        it exists, with pip linked from the shared copy.
+        """
+        if venv.joinpath("pyvenv.cfg").exists():
+            return venv
+        from onepm.venvs import create_venv
+
+        pip_site: Path | None = None
+        if with_pip:
+            try:
+                pip_site = self._pip_location.parent
+            except ImportError:
+                # Neither pip nor the shims are installed
+                pass
+        create_venv(
+            venv,
+            self._tool_dir / "shared" / "venv-templates",
+            python=python,
+            pip_site=pip_site,
         )
-        return Installation(name, dist, venv_dir)
+        if with_pip and pip_site is None:
+            bin_dir = "Scripts" if sys.platform == "win32" else "bin"
+            subprocess.run(
+                [str(venv / bin_dir / "python"), "-Im", "ensurepip", "--default-pip"],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+        return venv
+
+    def find_python(self) -> str:
+        """The interpreter to create the project venv with, satisfying the
+        requires-python of the project.
+        """
+        from onepm.interpreters import InterpreterCache
+
+        requires_python = self.pyproject.get("project", {}).get("requires-python")
+        return InterpreterCache(self._tool_dir).find(requires_python)
 
-    def _run_pip(self, *args: str, venv: Path) -> None:
-        venv = PackageManager.make_venv(venv, with_pip=False)
+    @cached_property
+    def _uv_executable(self) -> str | None:
+        """The uv installing the tools, or None to use pip."""
+        installer = self.config.installer
+        if installer == "pip":
+            return None
+        if installer not in ("auto", "uv"):
+            raise ValueError(f"Unknown installer: {installer}")
+        # Prefer the uv installed by onepm
+        executable = next(
+            (
+                str(i.executable)
+                for i in self.get_installations("uv")
+                if use_installation(i.venv)
+            ),
+            None,
+        ) or shutil.which("uv")
+        if executable is None and installer == "uv":
+            raise Exception(
+                "uv is not found, install it by 'onepm use uv' or add it to PATH"
+            )
+        return executable
+
+    def _run_pip(self, *args: str, venv: Path, use_uv: bool = True) -> None:
+        """Run pip, or uv pip if available, in the venv."""
+        venv = self.make_venv(venv, with_pip=False)
         bin_dir = "Scripts" if sys.platform == "win32" else "bin"
-        pip_command = [
-            str(venv / bin_dir / "python"),
-            "-I",
-            str(self._pip_location),
-            *args,
-        ]
-        subprocess.run(
-            pip_command,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
+        python = str(venv / bin_dir / "python")
+        uv = self._uv_executable if use_uv else None
+        if uv is not None:
+            try:
+                with span("uv pip", args=" ".join(args)):
+                    _run_installer([uv, "pip", *args, "--python", python], _uv_env())
+                return
+            except (OSError, subprocess.CalledProcessError):
+                if self.config.installer == "uv":
+                    raise
+        with span("pip", args=" ".join(args)):
+            _run_installer([python, "-I", str(self._pip_location), *args])
 
     @cached_property
     def _pip_location(self) -> Path:
@@ -194,15 +789,15 @@ class OneManager:
         except ImportError:
             pass
         else:
-            # copy to the shared location and use it from that
-            shared_pip = self._tool_dir / "shared" / "pip"
-            if not shared_pip.exists():
-                shutil.copytree(Path(pip_file).parent, shared_pip)
-            return shared_pip
+            # copy to the shared location with its metadata and use it from that
+            shared_site = self._tool_dir / "shared" / "pip-site"
+            if not shared_site.exists():
+                _copy_pip(Path(pip_file).parent, shared_site)
+            return shared_site / "pip"
         # pip is not installed, download the wheel from PyPI
         shared_pip = self._tool_dir / "shared" / "pip.whl"
         if not shared_pip.exists():
-            best_pip = self.package_finder.find_best_match("pip").best
+            best_pip = self.find_best_match(Requirement("pip"))
             assert best_pip is not None and best_pip.link.is_wheel
             shared_pip.parent.mkdir(parents=True, exist_ok=True)
             wheel = self.package_finder.download_and_unpack(
@@ -212,32 +807,104 @@ class OneManager:
         return shared_pip / "pip"
 
     def update_package_manager(self, name: str | None = None) -> None:
-        pm, requirement = self.detect_package_manager(name)
-        self.install_tool(pm.name, requirement)
+        pm, requirement = self.detect_package_manager(name, use_lock=False)
+        if pm.name == "pip":
+            return
+        installation = self.install_tool_version(
+            pm.name, self.resolve_tool(requirement)
+        )
+        if self.project_lockfile is not None:
+            self._write_project_lock(installation)
+
+    def lock_project(self) -> ToolLock:
+        """Write the lock of the project's package manager to onepm.lock."""
+        pm, requirement = self.detect_package_manager(use_lock=False)
+        if pm.name == "pip":
+            raise Exception("pip is not installed by onepm, there is nothing to lock")
+        return self._write_project_lock(pm.get_installation(self, requirement))
+
+    def _write_project_lock(self, installation: Installation) -> ToolLock:
+        name, version = installation.name, installation.version
+        lock = self.tool_lockfile(name).get(
+            name, str(version), current_environment()
+        ) or self.lock_tool(name, version, installation.venv)
+        LockFile(self.path / LOCK_FILENAME).add(lock)
+        self.context = get_project(self.path)
+        return lock
 
     def use_package_manager(self, spec: str) -> None:
+        import tomlkit
+
         req = Requirement(spec)
         name = canonicalize_name(req.name)
-        self.pyproject.setdefault("tool", {}).setdefault("onepm", {})[
-            "package-manager"
-        ] = str(req)
-        with open(self.path / "pyproject.toml", "w") as f:
-            tomlkit.dump(self.pyproject, f)
+        pyproject_file = self.path / "pyproject.toml"
+        # Re-parse with tomlkit to preserve the style of the file
+        try:
+            with open(pyproject_file, "rb") as f:
+                pyproject = tomlkit.load(f)
+        except FileNotFoundError:
+            pyproject = tomlkit.document()
+        pyproject.setdefault("tool", {}).setdefault("onepm", {})["package-manager"] = (
+            str(req)
+        )
+        with open(pyproject_file, "w") as f:
+            tomlkit.dump(pyproject, f)
+        self.context = get_project(self.path)
+        self.pyproject = pyproject
         for installation in self.get_installations(name):
             if installation.version in req.specifier:
                 return
         self.install_tool(canonicalize_name(req.name), req)
 
+    def update_launchers(self, package_manager: PackageManager) -> None:
+        """Regenerate the launchers and record the resolution of the project."""
+        if not self.shim_enabled():
+            # The launchers would find themselves in PATH
+            return
+        from onepm import launchers
+
+        launchers.write_launchers(self._tool_dir)
+        launchers.write_resolution(
+            self._tool_dir,
+            launchers.shell_path(Path.cwd()),
+            self.path,
+            package_manager,
+            self.package_dir(package_manager.name),
+        )
 
-@dataclass(frozen=True)
-class Installation:
-    name: str
-    distribution: Distribution
-    venv: Path
 
-    @property
-    def version(self) -> Version:
-        return Version(self.distribution.version)
+def _copy_pip(package_dir: Path, site: Path) -> None:
+    """Copy the pip package and its metadata into a directory for sys.path."""
+    import uuid
+
+    tmp = site.with_name(f"{site.name}.{uuid.uuid4().hex}")
+    shutil.copytree(package_dir, tmp / "pip")
+    dist_info = next(package_dir.parent.glob("pip-*.dist-info"), None)
+    if dist_info is not None:
+        shutil.copytree(dist_info, tmp / dist_info.name)
+    try:
+        os.replace(tmp, site)
+    except OSError:
+        # Copied by another process in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _run_installer(command: list[str], env: dict[str, str] | None = None) -> None:
+    subprocess.run(
+        command,
+        check=True,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
 
-    def get_access_time(self) -> float:
-        return self.venv.stat().st_atime
+def _uv_env() -> dict[str, str] | None:
+    """Pass the index settings of pip on to uv."""
+    env = {
+        f"UV_{key}": os.environ[f"PIP_{key}"]
+        for key in ("INDEX_URL", "EXTRA_INDEX_URL")
+        if f"PIP_{key}" in os.environ and f"UV_{key}" not in os.environ
+    }
+    return {**os.environ, **env} if env else None
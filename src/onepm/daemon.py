@@ -0,0 +1,236 @@
+"""A resident resolver keeping the state of onepm warm.
+
+``onepm daemon`` serves the resolutions of package managers over the Unix
+socket ``~/.onepm/daemon.sock``. The shortcuts and shims ask it when the
+resolution cache misses and resolve by themselves when no daemon is running.
+The daemon keeps the parsed projects and their managers in memory, and polls
+the project files and ``~/.onepm/venvs`` to drop the stale state.
+
+The client side is imported by the shortcuts, keep it free of third-party
+imports.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from onepm.cache import Resolution, project_stats, stat_key
+
+if TYPE_CHECKING:
+    from onepm.core import OneManager
+
+SOCKET_NAME = "daemon.sock"
+CONNECT_TIMEOUT = 0.5  # seconds
+# A wedged daemon must not hold up the client, which then resolves by itself
+RESPONSE_TIMEOUT = 5.0  # seconds
+WATCH_INTERVAL = 1.0  # seconds
+
+
+def socket_path(tool_dir: Path) -> Path:
+    return tool_dir / SOCKET_NAME
+
+
+def _connect(path: Path) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(str(path))
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def is_running(tool_dir: Path) -> bool:
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    try:
+        _connect(socket_path(tool_dir)).close()
+    except OSError:
+        return False
+    return True
+
+
+def query(
+    tool_dir: Path, project: Path, specified: str | None = None
+) -> Resolution | None:
+    """Ask the daemon to resolve the package manager of the project.
+
+    Return None if no daemon is running, it can't resolve the project or it
+    doesn't answer in time.
+    """
+    path = socket_path(tool_dir)
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        return None
+    request = {"project": str(project), "specified": specified}
+    try:
+        with _connect(path) as sock:
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+        return Resolution(response["name"], response["executable"], response["venv"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class _Entry(NamedTuple):
+    project_stats: dict[str, list[int] | None]
+    package_dir: str
+    package_dir_stat: list[int] | None
+    resolution: Resolution
+
+    def is_valid(self, project: Path) -> bool:
+        return (
+            project_stats(project) == self.project_stats
+            and stat_key(self.package_dir) == self.package_dir_stat
+            and os.path.exists(self.resolution.executable)
+        )
+
+
+class Resolver:
+    """Resolve the package managers, reusing the state across requests."""
+
+    def __init__(self, offline: bool | None = None) -> None:
+        self.offline = offline
+        self._managers: dict[Path, tuple[dict[str, Any], OneManager]] = {}
+        self._entries: dict[tuple[Path, str | None], _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _get_manager(self, project: Path, stats: dict[str, Any]) -> OneManager:
+        with self._lock:
+            cached = self._managers.get(project)
+        if cached is not None and cached[0] == stats:
+            return cached[1]
+        from onepm.core import OneManager
+
+        core = OneManager(project, offline=self.offline)
+        with self._lock:
+            self._managers[project] = (stats, core)
+        return core
+
+    def resolve(self, project: Path, specified: str | None = None) -> Resolution | None:
+        """Return the resolution, or None if it depends on the environment of
+        the client or the package manager isn't installed.
+
+        The installations are left to the client, so that the daemon always
+        answers quickly.
+        """
+        with self._lock:
+            entry = self._entries.get((project, specified))
+        if entry is not None and entry.is_valid(project):
+            return entry.resolution
+        stats = project_stats(project)
+        core = self._get_manager(project, stats)
+        package_manager, requirement = core.detect_package_manager(specified)
+        if package_manager.name == "pip" or not core.shim_enabled():
+            # Resolved from the VIRTUAL_ENV or PATH of the client
+            return None
+        installation = next(
+            (
+                i
+                for i in core.get_installations(package_manager.name)
+                if requirement.specifier.contains(i.version)
+            ),
+            None,
+        )
+        if installation is None:
+            return None
+        package_dir = core.package_dir(package_manager.name)
+        resolution = Resolution(
+            package_manager.name, str(installation.executable), str(installation.venv)
+        )
+        with self._lock:
+            self._entries[(project, specified)] = _Entry(
+                stats, str(package_dir), stat_key(package_dir), resolution
+            )
+        return resolution
+
+    def invalidate(self) -> int:
+        """Drop the stale state, return the number of dropped resolutions."""
+        with self._lock:
+            entries = list(self._entries.items())
+            managers = list(self._managers.items())
+        stale = [key for key, entry in entries if not entry.is_valid(key[0])]
+        stale_projects = [
+            project
+            for project, (stats, _) in managers
+            if project_stats(project) != stats
+        ]
+        with self._lock:
+            for key in stale:
+                self._entries.pop(key, None)
+            for project in stale_projects:
+                self._managers.pop(project, None)
+        return len(stale)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        resolver: Resolver = self.server.resolver  # type: ignore[attr-defined]
+        try:
+            request = json.loads(self.rfile.readline())
+            resolution = resolver.resolve(
+                Path(request["project"]), request.get("specified")
+            )
+        except Exception as e:
+            response: dict[str, Any] = {"error": str(e)}
+        else:
+            if resolution is None:
+                response = {"error": "Not resolvable by the daemon"}
+            else:
+                response = resolution._asdict()
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class Daemon:
+    def __init__(
+        self,
+        tool_dir: Path,
+        *,
+        offline: bool | None = None,
+        interval: float = WATCH_INTERVAL,
+    ) -> None:
+        self.tool_dir = tool_dir
+        self.resolver = Resolver(offline)
+        self.interval = interval
+        self.ready = threading.Event()
+        self._stopped = threading.Event()
+        self._server: socketserver.BaseServer | None = None
+
+    def serve_forever(self) -> None:
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise Exception("The daemon requires Unix domain sockets")
+        path = socket_path(self.tool_dir)
+        if is_running(self.tool_dir):
+            raise Exception(f"The daemon is already listening on {path}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(str(path), _RequestHandler)
+        os.chmod(path, 0o600)
+        server.daemon_threads = True
+        server.resolver = self.resolver  # type: ignore[attr-defined]
+        self._server = server
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        self.ready.set()
+        try:
+            server.serve_forever()
+        finally:
+            self._stopped.set()
+            server.server_close()
+            path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.resolver.invalidate()
@@ -0,0 +1,167 @@
+"""Running `pr` commands directly in the project venv.
+
+`pr` runs the commands through the package manager, which has to start up
+before the command does. The console scripts of the project venv, including
+python, are executed directly instead, with the venv activated by
+``VIRTUAL_ENV`` and ``PATH``. The venv is discovered by the package manager
+class, see ``PackageManager.find_environment``, and cached under
+``~/.onepm/cache/environments`` along with the scripts defined in the project
+files, until any of the project files or the discovery settings change.
+
+The package manager still runs its own scripts, the commands not installed in
+the venv, and all commands if the venv is not found or has been removed.
+
+This module is imported on the hot path of `pr`, keep it free of third-party
+imports.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NoReturn
+
+from onepm.cache import TRACKED_FILES, stat_key
+
+if TYPE_CHECKING:
+    from onepm.pm.base import PackageManager
+
+# The project files affecting the discovery besides the tracked files
+DISCOVERY_FILES = (".pdm-python", "poetry.toml", ".env")
+# The environment variables affecting the discovery
+DISCOVERY_VARIABLES = (
+    "VIRTUAL_ENV",
+    "WORKON_HOME",
+    "XDG_DATA_HOME",
+    "XDG_CACHE_HOME",
+    "PIPENV_IGNORE_VIRTUALENVS",
+    "PIPENV_DONT_LOAD_ENV",
+    "POETRY_VIRTUALENVS_PATH",
+    "POETRY_CACHE_DIR",
+)
+
+
+class ProjectEnvironment:
+    def __init__(self, venv: Path, scripts: list[str]) -> None:
+        self.venv = venv
+        # The scripts run by the package manager
+        self.scripts = scripts
+
+    @property
+    def bin_dir(self) -> Path:
+        return self.venv / ("Scripts" if sys.platform == "win32" else "bin")
+
+    def find_command(self, command: str) -> str | None:
+        """The executable of the command in the venv, if it can run directly."""
+        if command in self.scripts or os.sep in command or "/" in command:
+            return None
+        return shutil.which(command, path=str(self.bin_dir))
+
+    def activated_env(self) -> dict[str, str]:
+        paths = [str(self.bin_dir)]
+        if os.getenv("PATH"):
+            paths.append(os.environ["PATH"])
+        return {"VIRTUAL_ENV": str(self.venv), "PATH": os.pathsep.join(paths)}
+
+
+class EnvironmentCache:
+    def __init__(self, tool_dir: Path) -> None:
+        self.root = tool_dir / "cache" / "environments"
+
+    def _entry_file(self, project: Path, name: str) -> Path:
+        key = f"{project}\0{name}".encode("utf-8", "surrogateescape")
+        return self.root / f"{zlib.crc32(key):08x}.json"
+
+    @staticmethod
+    def fingerprint(project: Path, name: str) -> dict[str, Any]:
+        return {
+            "project": str(project),
+            "package_manager": name,
+            "variables": {var: os.getenv(var) for var in DISCOVERY_VARIABLES},
+            "files": {
+                filename: stat_key(project / filename)
+                for filename in (*TRACKED_FILES, *DISCOVERY_FILES)
+            },
+        }
+
+    def get(self, project: Path, name: str) -> ProjectEnvironment | None:
+        """Return the cached environment if it is still valid."""
+        try:
+            with open(self._entry_file(project, name), "rb") as f:
+                entry = json.load(f)
+            found = entry.pop("found")
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+        if entry != self.fingerprint(project, name):
+            return None
+        venv = Path(found["venv"])
+        if not venv.joinpath("pyvenv.cfg").exists():
+            return None
+        if found["siblings"] != _siblings_key(venv):
+            return None
+        return ProjectEnvironment(venv, found["scripts"])
+
+    def set(self, project: Path, name: str, environment: ProjectEnvironment) -> None:
+        entry = self.fingerprint(project, name)
+        entry["found"] = {
+            "venv": str(environment.venv),
+            "siblings": _siblings_key(environment.venv),
+            "scripts": environment.scripts,
+        }
+        entry_file = self._entry_file(project, name)
+        try:
+            entry_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_file, entry_file)
+        except OSError:
+            # The cache is an optimization, never fail the command because of it
+            pass
+
+
+def _siblings_key(venv: Path) -> list[list[int] | None]:
+    # Another venv of the project may be created and selected in the directory
+    # of the venvs, as in the envs.toml file of poetry
+    return [stat_key(venv.parent), stat_key(venv.parent / "envs.toml")]
+
+
+def find_environment(
+    package_manager: PackageManager, tool_dir: Path
+) -> ProjectEnvironment | None:
+    """The project environment to run the commands in directly, if any."""
+    project = package_manager.context.root
+    cache = EnvironmentCache(tool_dir)
+    environment = cache.get(project, package_manager.name)
+    if environment is not None:
+        return environment
+    # Not found is not cached, the venv may be created any time
+    scripts = package_manager.get_project_scripts()
+    if scripts is None:
+        return None
+    venv = package_manager.find_environment()
+    if venv is None:
+        return None
+    environment = ProjectEnvironment(venv.absolute(), scripts)
+    cache.set(project, package_manager.name, environment)
+    return environment
+
+
+def run(package_manager: PackageManager, args: list[str], tool_dir: Path) -> NoReturn:
+    """Run the command in the project environment directly if possible, or by
+    the package manager otherwise.
+    """
+    environment = None
+    if package_manager.run_directly and args and not args[0].startswith("-"):
+        environment = find_environment(package_manager, tool_dir)
+    executable = environment.find_command(args[0]) if environment else None
+    if environment is not None and executable is not None:
+        package_manager._execute_command(
+            [executable, *args[1:]], environment.activated_env()
+        )
+    else:
+        package_manager.run(*args)
@@ -0,0 +1,107 @@
+"""The eviction policy of installed tool versions.
+
+The limits are configured in the ``[eviction]`` table of ``~/.onepm/config.toml``
+and can be overridden per tool, a limit of 0 means unlimited:
+
+```toml
+[eviction]
+max-versions = 5
+max-bytes = 0
+max-age-days = 0
+total-max-bytes = 0  # across all tools
+
+[eviction.poetry]
+max-versions = 3
+```
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Collection, Iterable
+
+from onepm.installations import Installation
+
+MAX_VERSION_NUMBER = 5  # keep 5 versions of each package at most by default
+
+
+@dataclass
+class EvictionPolicy:
+    max_versions: int = MAX_VERSION_NUMBER
+    max_bytes: int = 0
+    max_age_days: float = 0
+
+    @classmethod
+    def for_tool(cls, table: dict[str, Any], name: str) -> EvictionPolicy:
+        policy = cls()
+        for source in (table, table.get(name, {})):
+            if "max-versions" in source:
+                policy.max_versions = int(source["max-versions"])
+            if "max-bytes" in source:
+                policy.max_bytes = int(source["max-bytes"])
+            if "max-age-days" in source:
+                policy.max_age_days = float(source["max-age-days"])
+        return policy
+
+
+def disk_usage(venv: Path) -> int:
+    """The bytes of the venv, with files shared via hard links counted in
+    proportion, so that the sum over all venvs is the real disk usage.
+    """
+    total = 0
+    for root, _, files in os.walk(venv):
+        for filename in files:
+            try:
+                st = os.lstat(os.path.join(root, filename))
+            except OSError:
+                continue
+            # One of the links is held by the shared store
+            total += st.st_size // max(1, st.st_nlink - 1)
+    return total
+
+
+def select_evictions(
+    installations: Iterable[Installation],
+    policy: EvictionPolicy,
+    pinned: Collection[Path] = (),
+    reserve: int = 0,
+    sizes: dict[Path, int] | None = None,
+) -> list[Installation]:
+    """Select the installations to evict, least recently used first.
+
+    ``reserve`` is the number of slots to leave for new installations and the
+    pinned installations are never selected.
+    """
+    by_recency = sorted(installations, key=Installation.get_access_time, reverse=True)
+    kept = list(by_recency)
+    evicted: list[Installation] = []
+
+    def evict_one() -> bool:
+        for installation in reversed(kept):
+            if installation.venv not in pinned:
+                kept.remove(installation)
+                evicted.append(installation)
+                return True
+        return False
+
+    if policy.max_age_days > 0:
+        deadline = time.time() - policy.max_age_days * 86400
+        for installation in list(kept):
+            if (
+                installation.venv not in pinned
+                and installation.get_access_time() < deadline
+            ):
+                kept.remove(installation)
+                evicted.append(installation)
+    if policy.max_versions > 0:
+        while len(kept) + reserve > policy.max_versions and evict_one():
+            pass
+    if policy.max_bytes > 0:
+        if sizes is None:
+            sizes = {i.venv: disk_usage(i.venv) for i in kept}
+        while sum(sizes[i.venv] for i in kept) > policy.max_bytes and evict_one():
+            pass
+    return evicted
@@ -0,0 +1,170 @@
+"""Fingerprints of the project installs, to skip `pi` when nothing changed.
+
+After `pi` without arguments succeeds, the fingerprint of its inputs is stored
+under ``~/.onepm/cache/installs``: the hashes of the project files the package
+manager installs from, the package manager and its executable, and the
+identity of the venv installed into, that is its interpreter and the
+distributions in its site-packages. The next `pi` exits immediately if the
+fingerprint is unchanged, unless it is run with ``--force``.
+
+Installing, upgrading or removing a package in the venv out of band changes
+the distributions and so invalidates the fingerprint, as does recreating the
+venv or upgrading its interpreter.
+
+This module is imported on the hot path of `pi`, keep it free of third-party
+imports.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NoReturn
+
+from onepm.cache import stat_key
+
+if TYPE_CHECKING:
+    from onepm.pm.base import PackageManager
+
+# The entries of site-packages that tell which distributions are installed
+DISTRIBUTION_SUFFIXES = (".dist-info", ".egg-info", ".egg-link", ".pth")
+
+
+def file_hash(path: Path) -> str | None:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def environment_identity(venv: Path) -> dict[str, Any] | None:
+    """The interpreter of the venv and the distributions installed in it."""
+    bin_dir = "Scripts" if sys.platform == "win32" else "bin"
+    python = os.path.realpath(venv / bin_dir / "python")
+    if sys.platform == "win32":
+        site_dirs = [venv / "Lib" / "site-packages"]
+    else:
+        site_dirs = sorted(venv.glob("lib/python*/site-packages"))
+    distributions: list[str] = []
+    for site_dir in site_dirs:
+        try:
+            with os.scandir(site_dir) as entries:
+                distributions.extend(
+                    entry.name
+                    for entry in entries
+                    if entry.name.endswith(DISTRIBUTION_SUFFIXES)
+                )
+        except OSError:
+            return None
+    h = hashlib.sha256("\n".join(sorted(distributions)).encode())
+    return {
+        "venv": str(venv.absolute()),
+        "config": stat_key(venv / "pyvenv.cfg"),
+        "python": [python, stat_key(python)],
+        "distributions": h.hexdigest(),
+    }
+
+
+def compute(package_manager: PackageManager) -> dict[str, Any] | None:
+    """The fingerprint of `pi` without arguments, or None if it can't be
+    skipped by any fingerprint.
+    """
+    inputs = package_manager.get_install_inputs()
+    venv = package_manager.find_environment()
+    if not inputs or venv is None:
+        return None
+    environment = environment_identity(venv)
+    if environment is None:
+        return None
+    executable = os.path.realpath(package_manager.get_command()[0])
+    root = package_manager.context.root
+    return {
+        "project": str(root),
+        "package_manager": package_manager.name,
+        "executable": [executable, stat_key(executable)],
+        "inputs": {name: file_hash(root / name) for name in inputs},
+        "environment": environment,
+    }
+
+
+class InstallFingerprints:
+    def __init__(self, tool_dir: Path) -> None:
+        self.root = tool_dir / "cache" / "installs"
+
+    def _entry_file(self, project: Path) -> Path:
+        key = str(project).encode("utf-8", "surrogateescape")
+        return self.root / f"{zlib.crc32(key):08x}.json"
+
+    def get(self, project: Path) -> dict[str, Any] | None:
+        try:
+            with open(self._entry_file(project), "rb") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, project: Path, fingerprint: dict[str, Any]) -> None:
+        entry_file = self._entry_file(project)
+        try:
+            entry_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(fingerprint, f)
+            os.replace(tmp_file, entry_file)
+        except OSError:
+            # The fingerprint is an optimization, never fail the command for it
+            pass
+
+    def remove(self, project: Path) -> None:
+        try:
+            self._entry_file(project).unlink()
+        except OSError:
+            pass
+
+
+def install(
+    package_manager: PackageManager, tool_dir: Path, force: bool = False
+) -> NoReturn:
+    """Run `pi` without arguments, unless the project is already in sync with
+    the recorded fingerprint.
+    """
+    fingerprint = compute(package_manager)
+    if fingerprint is None:
+        package_manager.install()
+    else:
+        _install_in_sync(package_manager, fingerprint, tool_dir, force)
+
+
+def _install_in_sync(
+    package_manager: PackageManager,
+    fingerprint: dict[str, Any],
+    tool_dir: Path,
+    force: bool,
+) -> NoReturn:
+    fingerprints = InstallFingerprints(tool_dir)
+    project = package_manager.context.root
+    if not force and fingerprints.get(project) == fingerprint:
+        print(
+            "The environment is up to date, run `pi --force` to install anyway",
+            file=sys.stderr,
+        )
+        sys.exit(0)
+    # A failed or interrupted install leaves no fingerprint behind
+    fingerprints.remove(project)
+    package_manager.replace_process = False
+    try:
+        package_manager.install()
+    except SystemExit as e:
+        if not e.code:
+            # Taken after the install, which may write the lock file
+            fingerprint = compute(package_manager)
+            if fingerprint is not None:
+                fingerprints.set(project, fingerprint)
+        raise
@@ -0,0 +1,125 @@
+"""The HTTP sessions of the package finders.
+
+The finders of a process share one client per set of indexes, so that the
+connections to the indexes are kept alive and reused by all lookups. The
+responses carrying an ``ETag`` or a ``Last-Modified`` header are stored in
+``~/.onepm/cache/http`` and revalidated with a conditional request the next
+time they are needed, an index answering 304 Not Modified sends no body and the
+stored one is used.
+
+The freshness of the project pages is decided by ``index-cache-ttl`` before any
+request is made, so the responses are always revalidated here.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import httpx
+from unearth.auth import MultiDomainBasicAuth
+from unearth.fetchers import PyPIClient
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple/"
+# Describing the stored body, not the one sent by the index
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+_sessions: dict[tuple[str, ...], CachingClient] = {}
+_sessions_lock = threading.Lock()
+
+
+class HTTPCache:
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def _path(self, request: httpx.Request) -> Path:
+        # The simple API serves JSON or HTML depending on the Accept header
+        key = f"{request.url}\n{request.headers.get('Accept', '')}"
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def load(self, request: httpx.Request) -> tuple[dict[str, str], bytes] | None:
+        try:
+            with open(self._path(request), "rb") as f:
+                headers = json.loads(f.readline())
+                return headers, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def store(self, request: httpx.Request, response: httpx.Response) -> None:
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in SKIPPED_HEADERS
+        }
+        path = self._path(request)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_name(
+                f"{path.name}.{os.getpid()}.{threading.get_ident()}"
+            )
+            with open(tmp_file, "wb") as f:
+                f.write(json.dumps(headers).encode() + b"\n")
+                f.write(response.content)
+            os.replace(tmp_file, path)
+        except OSError:
+            # The cache is an optimization, never fail the command because of it
+            pass
+
+
+class CachingClient(PyPIClient):
+    """A client revalidating the stored responses of the GET requests.
+
+    The streamed responses, like the downloads of the distributions, are
+    neither stored nor revalidated.
+    """
+
+    def __init__(self, cache: HTTPCache, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(
+        self, request: httpx.Request, *, stream: bool = False, **kwargs: Any
+    ) -> httpx.Response:
+        if stream or request.method != "GET" or request.url.scheme == "file":
+            return super().send(request, stream=stream, **kwargs)
+        cached = self.cache.load(request)
+        if cached is not None:
+            headers, content = cached
+            if etag := headers.get("etag"):
+                request.headers["If-None-Match"] = etag
+            if last_modified := headers.get("last-modified"):
+                request.headers["If-Modified-Since"] = last_modified
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            return httpx.Response(
+                200,
+                headers=headers,
+                content=content,
+                request=request,
+                extensions={"from_cache": True},
+            )
+        if response.status_code == 200 and (
+            "etag" in response.headers or "last-modified" in response.headers
+        ):
+            self.cache.store(request, response)
+        return response
+
+
+def get_session(tool_dir: Path, index_urls: list[str]) -> CachingClient:
+    """The client shared by the finders of the process querying these indexes."""
+    key = (str(tool_dir), *index_urls)
+    with _sessions_lock:
+        if key not in _sessions:
+            session = CachingClient(HTTPCache(tool_dir / "cache" / "http"))
+            session.auth = MultiDomainBasicAuth(
+                index_urls=index_urls or [DEFAULT_INDEX_URL]
+            )
+            atexit.register(session.close)
+            _sessions[key] = session
+        return _sessions[key]
@@ -0,0 +1,175 @@
+"""Querying several package indexes and mirrors at once.
+
+With more than one index configured, the project pages are requested from
+several of them concurrently and the first successful answer is used. The
+latency and the failures of each index are tracked in
+``~/.onepm/cache/index-health.json``:
+
+- the indexes are ranked by the moving average of their latencies, the slower
+  ones are only queried when the faster ones fail or are late;
+- an index failing is skipped for a backoff period doubling with each
+  consecutive failure, unless all indexes are backing off, while an index
+  not carrying a project is not failing;
+- an index still running when another one answers is recorded with the time
+  it has taken so far, as the lower bound of its latency.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# The weight of the latest latency in the moving average
+LATENCY_WEIGHT = 0.3
+BACKOFF_BASE = 30.0  # seconds
+BACKOFF_MAX = 3600.0  # seconds
+# Query the next index when the fastest takes this times longer than usual
+HEDGE_FACTOR = 2.0
+
+
+@dataclass
+class IndexStats:
+    latency: float = 0.0  # seconds, 0 if never measured
+    failures: int = 0  # consecutive
+    failed_at: float = 0.0
+
+    def backoff_until(self) -> float:
+        if not self.failures:
+            return 0.0
+        backoff = min(BACKOFF_BASE * 2 ** (self.failures - 1), BACKOFF_MAX)
+        return self.failed_at + backoff
+
+
+class IndexHealth:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = self._load()
+
+    def _load(self) -> dict[str, IndexStats]:
+        try:
+            with open(self.path, "rb") as f:
+                return {url: IndexStats(**item) for url, item in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+    def save(self) -> None:
+        with self._lock:
+            data = {url: asdict(stats) for url, stats in self.stats.items()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_name(
+                f"{self.path.name}.{os.getpid()}.{threading.get_ident()}"
+            )
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            # The health is an optimization, never fail the command because of it
+            pass
+
+    def rank(self, urls: list[str]) -> list[str]:
+        """The indexes to query, fastest first, without the ones backing off
+        unless all of them are.
+        """
+        now = time.time()
+        stats = {url: self.stats.get(url, IndexStats()) for url in urls}
+        available = [url for url in urls if stats[url].backoff_until() <= now]
+        if not available:
+            available = sorted(urls, key=lambda url: stats[url].backoff_until())
+        return sorted(available, key=lambda url: stats[url].latency)
+
+    def record_latency(
+        self, url: str, seconds: float, *, lower_bound: bool = False
+    ) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(url, IndexStats())
+            if lower_bound and seconds <= stats.latency:
+                return
+            if stats.latency:
+                seconds = (
+                    LATENCY_WEIGHT * seconds + (1 - LATENCY_WEIGHT) * stats.latency
+                )
+            stats.latency = seconds
+            if not lower_bound:
+                stats.failures = 0
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(url, IndexStats())
+            stats.failures += 1
+            stats.failed_at = time.time()
+
+
+def query_fastest(urls: list[str], query: Callable[[str], T], health: IndexHealth) -> T:
+    """Call ``query`` with the indexes concurrently and return the first result,
+    raising the last error if all of them fail.
+
+    The fastest index is queried first, and the next one is started when it
+    fails or takes longer than ``HEDGE_FACTOR`` times its usual latency. The
+    queries still running are left behind in daemon threads, so that a hanging
+    mirror never holds up the exit.
+
+    ``query`` raises ``LookupError`` when the index answers without the result,
+    the next index is queried without counting it as a failure.
+    """
+    ranked = health.rank(urls)
+    leader = health.stats.get(ranked[0])
+    hedge_delay = leader.latency * HEDGE_FACTOR if leader else 0.0
+    results: queue.Queue[tuple[str, T | None, Exception | None]] = queue.Queue()
+    started: dict[str, float] = {}
+
+    def worker(url: str) -> None:
+        try:
+            result = query(url)
+        except Exception as e:
+            results.put((url, None, e))
+        else:
+            results.put((url, result, None))
+
+    def start_next() -> None:
+        url = ranked.pop(0)
+        started[url] = time.monotonic()
+        threading.Thread(target=worker, args=(url,), daemon=True).start()
+
+    start_next()
+    while ranked and not hedge_delay:
+        # Nothing is known about the leader, race all of them
+        start_next()
+    error: Exception | None = None
+    try:
+        while started:
+            try:
+                url, result, error = results.get(
+                    timeout=hedge_delay if ranked else None
+                )
+            except queue.Empty:
+                start_next()
+                continue
+            elapsed = time.monotonic() - started.pop(url)
+            if error is not None:
+                if isinstance(error, LookupError):
+                    # Answered, without the project
+                    health.record_latency(url, elapsed)
+                else:
+                    health.record_failure(url)
+                if ranked:
+                    start_next()
+                continue
+            health.record_latency(url, elapsed)
+            now = time.monotonic()
+            for loser, loser_start in started.items():
+                health.record_latency(loser, now - loser_start, lower_bound=True)
+            return result  # type: ignore[return-value]
+    finally:
+        health.save()
+    assert error is not None
+    raise error
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from packaging.version import InvalidVersion, Version
+
+from onepm.cache import LAST_USED_STAMP
+from onepm.venvs import interpreter_key
+
+INDEX_FORMAT_VERSION = 1
+# Present in a venv until its installation is complete, containing the version
+INCOMPLETE_MARKER = ".onepm-incomplete"
+
+
+@dataclass(frozen=True)
+class Installation:
+    name: str
+    version: Version
+    venv: Path
+    executable: Path
+    last_used: float = 0.0
+    # The interpreter the venv is created with and its key, empty if unknown
+    python: str = ""
+    python_key: str = ""
+
+    def get_access_time(self) -> float:
+        """The last time the installation was used, from the explicit stamp."""
+        try:
+            stamp_time = (self.venv / LAST_USED_STAMP).stat().st_mtime
+        except OSError:
+            stamp_time = 0.0
+        return max(stamp_time, self.last_used) or self.venv.stat().st_atime
+
+    def interpreter_changed(self) -> bool:
+        """Whether the interpreter of the venv has been upgraded or removed
+        since the installation, told without running it.
+        """
+        if not self.python:
+            return False
+        try:
+            return interpreter_key(self.python) != self.python_key
+        except OSError:
+            return True
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "version": str(self.version),
+            "venv": str(self.venv),
+            "executable": str(self.executable),
+            "last_used": self.last_used,
+            "python": self.python,
+            "python_key": self.python_key,
+        }
+
+
+class InstallationIndex:
+    """The index of installed versions of a tool, stored next to its venvs.
+
+    The index is the source of truth for the installations, the venvs are only
+    scanned when the index file is missing or corrupt. An installation is
+    published by adding it to the index, all writes are made under ``lock``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        package_dir: Path,
+        executable_name: str,
+        lock: contextlib.AbstractContextManager[Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.package_dir = package_dir
+        self.executable_name = executable_name
+        self.path = package_dir.with_name(f"{package_dir.name}.json")
+        self.lock = lock or contextlib.nullcontext()
+
+    def _executable(self, venv: Path) -> Path:
+        bin_dir = "Scripts" if sys.platform == "win32" else "bin"
+        return venv / bin_dir / self.executable_name
+
+    def load(self) -> list[Installation]:
+        try:
+            with open(self.path, "rb") as f:
+                data = json.load(f)
+            if data["version"] != INDEX_FORMAT_VERSION:
+                raise ValueError("Unsupported index format")
+            installations = [
+                Installation(
+                    self.name,
+                    Version(item["version"]),
+                    Path(item["venv"]),
+                    Path(item["executable"]),
+                    item["last_used"],
+                    item.get("python", ""),
+                    item.get("python_key", ""),
+                )
+                for item in data["installations"]
+            ]
+        except FileNotFoundError:
+            if not self.package_dir.exists():
+                return []
+            installations = self.rebuild()
+        except (OSError, ValueError, KeyError, TypeError, InvalidVersion):
+            installations = self.rebuild()
+        else:
+            # Skip the entries whose venv has been removed out of band
+            installations = [i for i in installations if i.venv.is_dir()]
+        return sorted(installations, key=lambda i: i.version, reverse=True)
+
+    def rebuild(self) -> list[Installation]:
+        """Scan the venvs on disk and write a fresh index."""
+        from importlib.metadata import Distribution
+
+        installations: list[Installation] = []
+        if self.package_dir.exists():
+            for venv in self.package_dir.iterdir():
+                if venv.joinpath(INCOMPLETE_MARKER).exists():
+                    continue
+                candidate = next(
+                    venv.glob(f"lib/**/site-packages/{self.name}-*.dist-info"), None
+                )
+                if candidate is None:
+                    continue
+                version = Version(Distribution.at(candidate).version)
+                installations.append(self.make_installation(version, venv, 0.0))
+        with self.lock:
+            self.save(installations)
+        return installations
+
+    def make_installation(
+        self,
+        version: Version,
+        venv: Path,
+        last_used: float | None = None,
+        python: str | None = None,
+    ) -> Installation:
+        if last_used is None:
+            last_used = time.time()
+        executable = self._executable(venv)
+        if python is None:
+            return Installation(self.name, version, venv, executable, last_used)
+        python = os.path.realpath(python)
+        return Installation(
+            self.name,
+            version,
+            venv,
+            executable,
+            last_used,
+            python,
+            interpreter_key(python),
+        )
+
+    def save(self, installations: list[Installation]) -> None:
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "installations": [i.as_json() for i in installations],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.path)
+
+    def add(self, installation: Installation) -> None:
+        with self.lock:
+            installations = [i for i in self.load() if i.venv != installation.venv]
+            installations.append(installation)
+            self.save(installations)
+
+    def remove(self, *venvs: Path) -> None:
+        with self.lock:
+            self.save([i for i in self.load() if i.venv not in venvs])
+
+    def delete(self) -> None:
+        with self.lock:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,166 @@
+"""Discovery of the Python interpreters to create the project venvs with.
+
+The interpreters are searched in PATH and in the directories of the versions
+managed by pyenv, uv and asdf. Their versions are cached in
+``~/.onepm/cache/interpreters.json``, keyed by the path and the size and mtime
+of the binary, so that only the interpreters new or upgraded since the last
+search are run to get their versions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from onepm.tracing import traced
+from onepm.venvs import interpreter_key
+
+EXECUTABLE_PATTERN = re.compile(r"python(3(\.\d+)?)?(\.exe)?", re.IGNORECASE)
+VERSION_SCRIPT = "import platform; print(platform.python_version())"
+
+
+@dataclass(frozen=True)
+class Interpreter:
+    executable: str
+    version: Version
+
+
+def _managed_dirs() -> Iterator[Path]:
+    """The directories of the Python versions installed by the version managers."""
+    home = Path.home()
+    pyenv_root = os.getenv("PYENV_ROOT")
+    yield Path(pyenv_root) / "versions" if pyenv_root else home / ".pyenv" / "versions"
+    if uv_dir := os.getenv("UV_PYTHON_INSTALL_DIR"):
+        yield Path(uv_dir)
+    elif sys.platform == "win32":
+        yield Path(os.getenv("APPDATA", home), "uv", "python")
+    else:
+        data_home = os.getenv("XDG_DATA_HOME") or home / ".local" / "share"
+        yield Path(data_home, "uv", "python")
+    yield home / ".asdf" / "installs" / "python"
+
+
+def candidates() -> Iterator[str]:
+    """The paths of the interpreters, the running one first."""
+    yield sys.executable
+    for directory in os.getenv("PATH", "").split(os.pathsep):
+        if os.path.basename(directory) == "shims":
+            # The scripts of pyenv and asdf dispatching to their versions
+            continue
+        try:
+            with os.scandir(directory or ".") as entries:
+                names = sorted(
+                    entry.name
+                    for entry in entries
+                    if EXECUTABLE_PATTERN.fullmatch(entry.name)
+                )
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.access(path, os.X_OK):
+                yield path
+    for managed_dir in _managed_dirs():
+        pattern = "*/python.exe" if sys.platform == "win32" else "*/bin/python3"
+        for path in sorted(managed_dir.glob(pattern)):
+            yield str(path)
+
+
+def _query_version(executable: str) -> Version | None:
+    try:
+        output = subprocess.run(
+            [executable, "-I", "-c", VERSION_SCRIPT],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=10,
+        ).stdout
+        return Version(output.strip())
+    except (OSError, subprocess.SubprocessError, InvalidVersion):
+        return None
+
+
+class InterpreterCache:
+    def __init__(self, tool_dir: Path) -> None:
+        self.path = tool_dir / "cache" / "interpreters.json"
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        try:
+            with open(self.path, "rb") as f:
+                return json.load(f)["interpreters"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save(self, entries: dict[str, dict[str, str]]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump({"interpreters": entries}, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            # The cache is an optimization, never fail the command because of it
+            pass
+
+    @traced("InterpreterCache.find_all")
+    def find_all(self) -> list[Interpreter]:
+        """All interpreters found, the highest versions first, and the running
+        interpreter first among the same versions.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        cached = self._load()
+        found: dict[str, dict[str, str]] = {}
+        unknown: dict[str, str] = {}
+        for path in candidates():
+            real = os.path.realpath(path)
+            if real in found or real in unknown:
+                continue
+            try:
+                key = interpreter_key(real)
+            except OSError:
+                continue
+            entry = cached.get(real)
+            if entry is not None and entry.get("key") == key:
+                found[real] = entry
+            else:
+                # Keep the order of the candidates
+                found[real] = {}
+                unknown[real] = key
+        if unknown:
+            with ThreadPoolExecutor() as executor:
+                versions = executor.map(_query_version, unknown)
+                for (real, key), version in zip(unknown.items(), versions, strict=True):
+                    if version is not None:
+                        found[real] = {"key": key, "version": str(version)}
+        entries = {real: entry for real, entry in found.items() if entry}
+        if entries != cached:
+            self._save(entries)
+        interpreters = [
+            Interpreter(path, Version(entry["version"]))
+            for path, entry in entries.items()
+        ]
+        # Stable, so the order of the candidates is kept for the same versions
+        return sorted(interpreters, key=lambda i: i.version, reverse=True)
+
+    def find(self, requires_python: str | None) -> str:
+        """Find the interpreter satisfying the requires-python specifier,
+        preferring the running interpreter. Raise if none is found.
+        """
+        specifier = SpecifierSet(requires_python or "")
+        current = Version(".".join(map(str, sys.version_info[:3])))
+        if specifier.contains(current, prereleases=True):
+            return sys.executable
+        for interpreter in self.find_all():
+            if specifier.contains(interpreter.version, prereleases=True):
+                return interpreter.executable
+        raise Exception(f"No Python interpreter is found for {specifier}")
@@ -0,0 +1,204 @@
+"""POSIX shell launchers of the package managers.
+
+The shims of ``onepm-shims`` start a Python interpreter and import onepm before
+the tool itself is started. The launchers written to ``~/.onepm/shims`` are
+shell scripts reading the resolution recorded for the current directory under
+``~/.onepm/shims/resolutions`` and exec the tool directly. When the resolution
+is missing or stale they fall back to ``python -m onepm.launchers``, which
+resolves the package manager, records the resolution and runs the tool.
+
+Put ``~/.onepm/shims`` in front of ``PATH`` to use them. The launchers are not
+available on Windows.
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, NoReturn
+
+from onepm.cache import (
+    LAST_USED_STAMP,
+    TRACKED_FILES,
+    absolute_executable,
+    installation_venv,
+)
+
+if TYPE_CHECKING:
+    from onepm.pm.base import PackageManager
+
+LAUNCHER_NAMES = ("pdm", "pipenv", "poetry", "uv")
+
+# The key of the resolution is the working directory with "/" replaced by "%",
+# computed without spawning any process. It is not unique, so the directory is
+# recorded in the resolution as well.
+LAUNCHER_TEMPLATE = """\
+#!/bin/sh
+# Generated by onepm, do not edit
+resolve() {
+    exec @PYTHON@ -m onepm.launchers @NAME@ "$@"
+}
+rest=$PWD key=
+while :; do
+    case $rest in
+        */*) key=$key${rest%%/*}%; rest=${rest#*/} ;;
+        *) key=$key$rest; break ;;
+    esac
+done
+res=@RESOLUTIONS@/$key.@NAME@
+[ -f "$res" ] && . "$res" || resolve "$@"
+# Directories containing "%" may share the key
+[ "$onepm_pwd" = "$PWD" ] || resolve "$@"
+[ "${VIRTUAL_ENV-}" = "$onepm_virtual_env" ] || resolve "$@"
+files=
+for f in @TRACKED_FILES@; do
+    if [ -e "$onepm_project/$f" ]; then
+        [ "$onepm_project/$f" -nt "$res" ] && resolve "$@"
+        files="$files $f"
+    fi
+done
+[ "$files" = "$onepm_files" ] || resolve "$@"
+# Versions have been installed or removed since the resolution
+[ -n "$onepm_tool_dir" ] && [ "$onepm_tool_dir" -nt "$res" ] && resolve "$@"
+[ -x "$onepm_executable" ] || resolve "$@"
+if [ -n "$onepm_venv" ]; then
+    stamp=$onepm_venv/@STAMP@
+    # Hold the shared lock of onepm.cache.use_installation across exec, so that
+    # the venv isn't evicted while the tool runs. Without flock, it is only
+    # marked as used.
+    if command -v flock >/dev/null 2>&1; then
+        command exec 9>>"$stamp" 2>/dev/null || resolve "$@"
+        flock -s 9 || resolve "$@"
+        # Evicted while waiting for the lock
+        [ -e "$stamp" ] || resolve "$@"
+    fi
+    : 2>/dev/null >"$stamp"
+fi
+onepm_exec "$@"
+"""
+
+
+def launcher_dir(tool_dir: Path) -> Path:
+    return tool_dir / "shims"
+
+
+def resolution_file(tool_dir: Path, project: str, name: str) -> Path:
+    key = project.replace("/", "%")
+    return launcher_dir(tool_dir) / "resolutions" / f"{key}.{name}"
+
+
+def shell_path(path: Path) -> str:
+    """The path as seen by the shell, which may differ from the resolved one
+    by symlinks.
+    """
+    pwd = os.getenv("PWD")
+    try:
+        if pwd and os.path.samefile(pwd, path):
+            return pwd
+    except OSError:
+        pass
+    return str(path)
+
+
+def _write_file(path: Path, content: str, mode: int = 0o644) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "w") as f:
+        f.write(content)
+    os.chmod(tmp_file, mode)
+    os.replace(tmp_file, path)
+
+
+def write_launchers(tool_dir: Path, python: str | None = None) -> list[Path]:
+    """Write the launchers that differ from the current ones, return the paths."""
+    if sys.platform == "win32":
+        return []
+    replacements = {
+        "@PYTHON@": shlex.quote(python or sys.executable),
+        "@RESOLUTIONS@": shlex.quote(str(launcher_dir(tool_dir) / "resolutions")),
+        "@TRACKED_FILES@": " ".join(TRACKED_FILES),
+        "@STAMP@": LAST_USED_STAMP,
+    }
+    written: list[Path] = []
+    for name in LAUNCHER_NAMES:
+        content = LAUNCHER_TEMPLATE.replace("@NAME@", name)
+        for placeholder, value in replacements.items():
+            content = content.replace(placeholder, value)
+        path = launcher_dir(tool_dir) / name
+        try:
+            if path.read_text() == content:
+                continue
+        except OSError:
+            pass
+        _write_file(path, content, 0o755)
+        written.append(path)
+    return written
+
+
+def write_resolution(
+    tool_dir: Path,
+    directory: str,
+    project: Path,
+    package_manager: PackageManager,
+    package_dir: Path,
+) -> None:
+    """Record the package manager resolved for the project, read by the
+    launchers of the tool run in the directory.
+    """
+    if sys.platform == "win32":
+        return
+    executable = absolute_executable(package_manager.executable)
+    venv = installation_venv(executable, package_dir)
+    files = "".join(
+        f" {name}" for name in TRACKED_FILES if os.path.exists(project / name)
+    )
+    command = " ".join(
+        shlex.quote(arg) for arg in [executable, *package_manager.get_command()[1:]]
+    )
+    variables = {
+        "pwd": directory,
+        "project": str(project),
+        "files": files,
+        "virtual_env": os.getenv("VIRTUAL_ENV", ""),
+        "tool_dir": str(package_dir) if venv else "",
+        "venv": venv or "",
+        "executable": executable,
+    }
+    lines = ["# Generated by onepm, do not edit"]
+    lines.extend(
+        f"onepm_{key}={shlex.quote(value)}" for key, value in variables.items()
+    )
+    lines.append(f'onepm_exec() {{ exec {command} "$@"; }}')
+    try:
+        _write_file(
+            resolution_file(tool_dir, directory, package_manager.name),
+            "\n".join(lines) + "\n",
+        )
+    except OSError:
+        # The launcher keeps falling back to the resolver
+        pass
+
+
+def main(args: list[str] | None = None) -> NoReturn:
+    from onepm import resolve_package_manager
+    from onepm.project import get_project
+
+    if args is None:
+        args = sys.argv[1:]
+    name, *tool_args = args
+    package_manager = resolve_package_manager(name)
+    tool_dir = Path.home() / ".onepm"
+    write_resolution(
+        tool_dir,
+        shell_path(Path.cwd()),
+        get_project().root,
+        package_manager,
+        tool_dir / "venvs" / package_manager.name,
+    )
+    package_manager.execute(*tool_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Locks of the dependencies of the package managers.
+
+The first installation of a package manager version resolves its dependencies
+once and records each of them with the URL and the sha256 hash of its file.
+The installations of a locked version skip the resolution and install the
+recorded files without dependencies, fetched into a local wheel cache and
+verified against the hashes.
+
+Locks are per environment, since the files of the dependencies may differ
+by interpreter and platform. The locks of the user are kept under
+``~/.onepm/tool-locks``, while ``onepm lock`` writes the lock of the project's
+package manager to ``onepm.lock`` next to pyproject.toml, to be committed:
+
+```toml
+version = 1
+
+[[tools]]
+name = "poetry"
+version = "1.8.0"
+environment = "cpython-311-linux-x86_64"
+packages = [
+    { name = "poetry", version = "1.8.0", url = "https://...", sha256 = "..." },
+]
+```
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple
+from urllib.parse import unquote, urlsplit
+
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomlkit as tomllib
+
+if TYPE_CHECKING:
+    from unearth.fetchers import Fetcher
+
+CHUNK_SIZE = 1024 * 1024
+
+LOCK_FILENAME = "onepm.lock"
+LOCK_FORMAT_VERSION = 1
+
+
+def current_environment() -> str:
+    """The environment the tool venvs are created for."""
+    import sysconfig
+
+    tag = sys.implementation.cache_tag or sys.implementation.name
+    return f"{tag}-{sysconfig.get_platform()}"
+
+
+class LockedPackage(NamedTuple):
+    name: str
+    version: str
+    url: str
+    sha256: str = ""
+
+    @property
+    def filename(self) -> str:
+        return unquote(posixpath.basename(urlsplit(self.url).path))
+
+
+@dataclass
+class ToolLock:
+    name: str
+    version: str
+    environment: str
+    packages: list[LockedPackage] = field(default_factory=list)
+
+    @classmethod
+    def from_report(
+        cls, name: str, version: str, environment: str, report: dict[str, Any]
+    ) -> ToolLock:
+        """Create the lock from the installation report of pip."""
+        packages: list[LockedPackage] = []
+        for item in report["install"]:
+            info = item["download_info"]
+            archive_info = info.get("archive_info", {})
+            sha256 = archive_info.get("hashes", {}).get("sha256", "")
+            if not sha256 and archive_info.get("hash", "").startswith("sha256="):
+                sha256 = archive_info["hash"][len("sha256=") :]
+            metadata = item["metadata"]
+            packages.append(
+                LockedPackage(
+                    metadata["name"], metadata["version"], info["url"], sha256
+                )
+            )
+        return cls(name, version, environment, packages)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "environment": self.environment,
+            "packages": [p._asdict() for p in self.packages],
+        }
+
+
+class LockFile:
+    """A file of tool locks, guarded by the caller when written concurrently."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def load(self) -> list[ToolLock]:
+        try:
+            with open(self.path, "rb") as f:
+                data = tomllib.load(f)
+        except FileNotFoundError:
+            return []
+        if data.get("version") != LOCK_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lock file format: {self.path}")
+        return [
+            ToolLock(
+                item["name"],
+                item["version"],
+                item["environment"],
+                [LockedPackage(**p) for p in item["packages"]],
+            )
+            for item in data.get("tools", [])
+        ]
+
+    def get(self, name: str, version: str, environment: str) -> ToolLock | None:
+        return next(
+            (
+                lock
+                for lock in self.load()
+                if (lock.name, lock.version, lock.environment)
+                == (name, version, environment)
+            ),
+            None,
+        )
+
+    def find_version(self, name: str, requirement: Requirement) -> Version | None:
+        """The best locked version of the tool matching the requirement, in any
+        environment.
+        """
+        versions = {Version(lock.version) for lock in self.load() if lock.name == name}
+        return max(
+            requirement.specifier.filter(versions, prereleases=True), default=None
+        )
+
+    def add(self, lock: ToolLock) -> None:
+        """Add the lock, replacing the lock of the same tool version and
+        environment.
+        """
+        import tomlkit
+
+        locks = [
+            existing
+            for existing in self.load()
+            if (existing.name, existing.version, existing.environment)
+            != (lock.name, lock.version, lock.environment)
+        ]
+        locks.append(lock)
+        locks.sort(
+            key=lambda lock: (lock.name, Version(lock.version), lock.environment)
+        )
+        document = tomlkit.document()
+        document["version"] = LOCK_FORMAT_VERSION
+        tools = tomlkit.aot()
+        for item in locks:
+            table = tomlkit.table()
+            data = item.to_dict()
+            packages = tomlkit.array()
+            packages.multiline(True)
+            for package in data.pop("packages"):
+                inline = tomlkit.inline_table()
+                inline.update(package)
+                packages.append(inline)
+            table.update(data)
+            table["packages"] = packages
+            tools.append(table)
+        document["tools"] = tools
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{_tmp_suffix()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            tomlkit.dump(document, f)
+        os.replace(tmp_path, self.path)
+
+
+class WheelCache:
+    """Files of the locked packages, stored by their hashes.
+
+    The files are downloaded with the session of the package finder if given,
+    so that the credentials and the settings of the indexes apply.
+    """
+
+    def __init__(self, root: Path, session: Fetcher | None = None) -> None:
+        self.root = root
+        self.session = session
+
+    def fetch(self, package: LockedPackage, offline: bool = False) -> LockedPackage:
+        """Make sure the file of the package is in the cache, downloading it
+        if missing, and verify its hash.
+
+        Return the package with the hash filled in if it was unknown.
+        """
+        if package.sha256:
+            path = self.path(package)
+            if path.exists():
+                if _file_hash(path) == package.sha256:
+                    return package
+                path.unlink()
+        if offline:
+            raise Exception(
+                f"{package.filename} is not cached and onepm is running in offline mode"
+            )
+        return self._download(package)
+
+    def path(self, package: LockedPackage) -> Path:
+        return self.root / package.sha256[:2] / package.sha256[2:] / package.filename
+
+    def _iter_content(self, url: str) -> Iterator[bytes]:
+        if self.session is None:
+            import urllib.request
+
+            with urllib.request.urlopen(url) as response:
+                yield from iter(lambda: response.read(CHUNK_SIZE), b"")
+            return
+        with self.session.get_stream(url) as response:
+            response.raise_for_status()
+            yield from response.iter_bytes(CHUNK_SIZE)
+
+    def _download(self, package: LockedPackage) -> LockedPackage:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f"{package.filename}.{_tmp_suffix()}.part"
+        h = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in self._iter_content(package.url):
+                    h.update(chunk)
+                    f.write(chunk)
+            digest = h.hexdigest()
+            if package.sha256 and digest != package.sha256:
+                raise Exception(
+                    f"The hash of {package.url} doesn't match the lock, "
+                    f"expected {package.sha256}, got {digest}"
+                )
+            package = package._replace(sha256=digest)
+            path = self.path(package)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return package
+
+
+def _tmp_suffix() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,129 @@
+"""Cross-process file locks guarding the installations under ``~/.onepm``.
+
+This module is imported on the hot path of the shims, keep it free of
+third-party imports.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+
+class FileLock:
+    """An advisory lock on a file, held by the open file.
+
+    Shared locks are not supported on Windows, where they always succeed
+    without locking.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = path
+        self._fd: int | None = None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        if self._fd is not None:
+            raise RuntimeError(f"Lock {self.path} is already acquired")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            locked = _lock(fd, shared, blocking)
+        except BaseException:
+            os.close(fd)
+            raise
+        if not locked:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        _unlock(fd)
+        os.close(fd)
+
+    def keep_on_exec(self) -> None:
+        """Let the process replacing this one by exec keep holding the lock."""
+        if self._fd is not None:
+            os.set_inheritable(self._fd, True)
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+class ReentrantFileLock:
+    """An exclusive file lock that can be re-entered by the thread holding it,
+    and excludes the other threads of the process as well.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._file_lock = FileLock(path)
+        self._depth = 0
+
+    def __enter__(self) -> ReentrantFileLock:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file_lock.acquire()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._file_lock.release()
+        self._thread_lock.release()
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(fd: int, shared: bool, blocking: bool) -> bool:
+        if shared:
+            return True
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.1)
+            else:
+                return True
+
+    def _unlock(fd: int) -> None:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+
+else:
+    import fcntl
+
+    def _lock(fd: int, shared: bool, blocking: bool) -> bool:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
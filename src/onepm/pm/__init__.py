@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from onepm.pm.base import PackageManager
+
+# Ordered by detection priority, pip is the fallback and must come last.
+PACKAGE_MANAGER_CLASSES = {
+    "pipenv": "onepm.pm.pipenv:Pipenv",
+    "pdm": "onepm.pm.pdm:PDM",
+    "poetry": "onepm.pm.poetry:Poetry",
+    "uv": "onepm.pm.uv:Uv",
+    "pip": "onepm.pm.pip:Pip",
+}
+
+
+def get_package_manager_class(name: str) -> type[PackageManager]:
+    """Import the package manager class by name, without importing the others."""
+    module, _, attr = PACKAGE_MANAGER_CLASSES[name].partition(":")
+    return getattr(import_module(module), attr)
@@ -3,21 +3,37 @@ from __future__ import annotations
 import abc
 import os
 import shutil
-import subprocess
 import sys
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Iterable, Mapping, overload
 
-from packaging.requirements import Requirement
+from onepm import tracing
+from onepm.cache import use_installation
+from onepm.project import ProjectContext, get_project
+from onepm.tracing import span, traced
 
 if TYPE_CHECKING:
     from typing import Literal, NoReturn
 
+    from packaging.requirements import Requirement
+
     from onepm.core import OneManager
+    from onepm.installations import Installation
+    from onepm.process import CommandResult
 
 
 class PackageManager(metaclass=abc.ABCMeta):
     name: str
+    # The module imported on the start of the tool, to warm up after installing
+    warmup_module: str | None = None
+    # The project files that determine the result of `pi` without arguments
+    install_inputs: tuple[str, ...] = ()
+    # Whether `pr` may run the commands of the project venv without the package
+    # manager, see onepm.environments
+    run_directly = False
+    # Whether the commands run with exit=True replace the process, or exit with
+    # their status once they are done
+    replace_process = True
 
     @staticmethod
     def get_unknown_args(
@@ -49,8 +65,16 @@ class PackageManager(metaclass=abc.ABCMeta):
                 unknown_args.append(arg)
         return unknown_args
 
-    def __init__(self, executable: str) -> None:
+    def __init__(self, executable: str, context: ProjectContext | None = None) -> None:
         self.executable = executable
+        self._context = context
+
+    @property
+    def context(self) -> ProjectContext:
+        """The project the package manager works on."""
+        if self._context is None:
+            self._context = get_project()
+        return self._context
 
     @staticmethod
     def find_executable(name: str, path: str | Path | None = None) -> str:
@@ -77,8 +101,27 @@ class PackageManager(metaclass=abc.ABCMeta):
         self, *args: str, env: Mapping[str, str] | None = None, exit: bool = True
     ) -> Any:
         command_args = self.get_command() + list(args)
+        if exit and not self.replace_process:
+            import subprocess
+
+            try:
+                self._execute_command(command_args, env, exit=False)
+            except subprocess.CalledProcessError as e:
+                sys.exit(e.returncode)
+            sys.exit(0)
         self._execute_command(command_args, env, exit=exit)
 
+    async def execute_async(
+        self, *args: str, env: Mapping[str, str] | None = None, **kwargs: Any
+    ) -> CommandResult:
+        """Run the command without replacing the process, see
+        ``onepm.process.run_command`` for the keyword arguments.
+        """
+        from onepm.process import run_command
+
+        command_args = self.get_command() + list(args)
+        return await run_command(command_args, env=env, **kwargs)
+
     @overload
     @staticmethod
     def _execute_command(
@@ -95,13 +138,20 @@ class PackageManager(metaclass=abc.ABCMeta):
     def _execute_command(
         args: list[str], env: Mapping[str, str] | None = None, exit: bool = True
     ) -> Any:
+        import subprocess
+
         process_env = {**os.environ, **env} if env else None
         if not exit:
-            subprocess.run(args, env=process_env, check=True)
+            with span("PackageManager._execute_command", command=args[0]):
+                subprocess.run(args, env=process_env, check=True)
             return
         if sys.platform == "win32":
-            sys.exit(subprocess.run(args, env=process_env).returncode)
+            with span("PackageManager._execute_command", command=args[0]):
+                returncode = subprocess.run(args, env=process_env).returncode
+            sys.exit(returncode)
         else:
+            # The process is replaced, the spans are written beforehand
+            tracing.flush()
             if env:
                 os.execvpe(args[0], args, process_env)
             else:
@@ -110,6 +160,22 @@ class PackageManager(metaclass=abc.ABCMeta):
     def get_command(self) -> list[str]:
         return [self.executable]
 
+    def find_environment(self) -> Path | None:
+        """The venv the project dependencies are installed into, if known."""
+        return as_venv(self.context.root / ".venv")
+
+    def get_project_scripts(self) -> list[str] | None:
+        """The names of the scripts defined in the project files, which only the
+        package manager can run, or None if it must run every command.
+        """
+        return []
+
+    def get_install_inputs(self) -> list[str]:
+        """The project files that determine the result of `pi` without arguments,
+        empty if it depends on more than these files.
+        """
+        return list(self.install_inputs)
+
     @abc.abstractmethod
     def install(self, *args: str) -> NoReturn: ...
 
@@ -124,32 +190,41 @@ class PackageManager(metaclass=abc.ABCMeta):
 
     @classmethod
     @abc.abstractmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool: ...
+    def matches(cls, context: ProjectContext) -> bool: ...
 
     @classmethod
     def get_executable_name(cls) -> str:
         return cls.name
 
     @classmethod
+    @traced("PackageManager.ensure_executable")
     def ensure_executable(cls, core: OneManager, requirement: Requirement) -> str:
         name = cls.get_executable_name()
         if not core.shim_enabled():
             return cls.find_executable(name)
+        best_match = cls.get_installation(core, requirement)
+        if not use_installation(best_match.venv):
+            # Evicted in the meantime
+            best_match = core.install_tool(cls.name, requirement)
+            use_installation(best_match.venv)
+        return str(best_match.executable)
+
+    @classmethod
+    def get_installation(
+        cls, core: OneManager, requirement: Requirement
+    ) -> Installation:
+        """Return the best installed version matching the requirement, or
+        install it if none matches.
+        """
         versions = core.get_installations(cls.name)
         best_match = next(
             filter(lambda v: requirement.specifier.contains(v.version), versions), None
         )
-        bin_dir = "Scripts" if sys.platform == "win32" else "bin"
         if best_match is None:
             best_match = core.install_tool(cls.name, requirement)
-        return str(best_match.venv / bin_dir / name)
-
-    @staticmethod
-    def make_venv(venv_path: Path, with_pip: bool = True) -> Path:
-        if venv_path.exists() and venv_path.joinpath("pyvenv.cfg").exists():
-            return venv_path
+        return best_match
 
-        import venv
 
-        venv.create(venv_path, with_pip=with_pip, symlinks=True)
-        return venv_path
+def as_venv(path: Path) -> Path | None:
+    """Return the path if it is a venv."""
+    return path if path.joinpath("pyvenv.cfg").is_file() else None
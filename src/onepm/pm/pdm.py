@@ -1,18 +1,25 @@
 from __future__ import annotations
 
-import os
-from typing import Any, NoReturn
+from pathlib import Path
+from typing import TYPE_CHECKING, NoReturn
 
-from onepm.pm.base import PackageManager
+from onepm.pm.base import PackageManager, as_venv
+
+if TYPE_CHECKING:
+    from onepm.project import ProjectContext
 
 
 class PDM(PackageManager):
     name = "pdm"
+    warmup_module = "pdm.core"
+    install_inputs = ("pyproject.toml", "pdm.lock")
+    run_directly = True
 
     @classmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool:
-        if os.path.exists("pdm.lock"):
+    def matches(cls, context: ProjectContext) -> bool:
+        if context.exists("pdm.lock"):
             return True
+        pyproject = context.pyproject
         build_backend = pyproject.get("build-system", {}).get("build-backend", "")
         if "pdm" in build_backend:
             return True
@@ -33,3 +40,19 @@ class PDM(PackageManager):
 
     def run(self, *args: str) -> NoReturn:
         self.execute("run", *args)
+
+    def find_environment(self) -> Path | None:
+        # The interpreter selected by `pdm use`
+        try:
+            python = self.context.root.joinpath(".pdm-python").read_text().strip()
+        except OSError:
+            return super().find_environment()
+        # Otherwise the packages are installed in __pypackages__
+        return as_venv(Path(python).parent.parent)
+
+    def get_project_scripts(self) -> list[str] | None:
+        scripts = self.context.pyproject.get("tool", {}).get("pdm", {}).get("scripts")
+        if scripts and "_" in scripts:
+            # The shared settings, like env_file, apply to all commands
+            return None
+        return list(scripts or {})
@@ -1,42 +1,43 @@
 from __future__ import annotations
 
-import contextlib
 import os
-import subprocess
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, NoReturn
+from typing import TYPE_CHECKING, NoReturn
 
-from packaging.requirements import Requirement
-
-from onepm.pm.base import PackageManager
+from onepm.pm.base import PackageManager, as_venv
 
 if TYPE_CHECKING:
+    from packaging.requirements import Requirement
+
     from onepm.core import OneManager
+    from onepm.project import ProjectContext
 
 
 class Pip(PackageManager):
     name = "pip"
 
     @classmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool:
+    def matches(cls, context: ProjectContext) -> bool:
         """Fallback package manager, always matches."""
         return True
 
     @classmethod
     def ensure_executable(cls, core: OneManager, requirement: Requirement) -> str:
-        from importlib.metadata import Distribution
+        import subprocess
+
+        from onepm.venvs import pip_version
 
         if "VIRTUAL_ENV" in os.environ:
             venv = Path(os.environ["VIRTUAL_ENV"])
         else:
-            venv = cls.make_venv(Path(".venv"))
+            venv = Path(core.context.relative(".venv"))
+            if not venv.joinpath("pyvenv.cfg").exists():
+                core.make_venv(venv, python=core.find_python())
         bin_dir = "Scripts" if sys.platform == "win32" else "bin"
         executable = cls.find_executable("python", venv / bin_dir)
-        lib_dir = venv / "lib"
-        pip_dist = next(lib_dir.glob("**/site-packages/pip-*.dist-info"))
-        dist = Distribution.at(pip_dist)
-        if dist.version not in requirement.specifier:
+        version = pip_version(venv)
+        if version is None or version not in requirement.specifier:
             if not core.shim_enabled():
                 subprocess.run(
                     [executable, "-m", "pip", "install", "-U", str(requirement)],
@@ -50,23 +51,28 @@ class Pip(PackageManager):
 
     def _find_requirements_txt(self) -> str | None:
         for filename in ["requirements.txt", "requirements.in"]:
-            if os.path.exists(filename):
-                return filename
+            if self.context.exists(filename):
+                return self.context.relative(filename)
         return None
 
     def _find_pyproject(self) -> str | None:
-        if os.path.exists("setup.py"):
-            return "setup.py"
-        with contextlib.suppress(FileNotFoundError):
-            with open("pyproject.toml") as f:
-                pyproject = f.read().splitlines()
-            if "[project]" in pyproject:
-                return "pyproject.toml"
+        if self.context.exists("setup.py"):
+            return self.context.relative("setup.py")
+        if "project" in self.context.pyproject:
+            return self.context.relative("pyproject.toml")
         return None
 
     def get_command(self) -> list[str]:
         return [self.executable, "-m", "pip"]
 
+    def find_environment(self) -> Path | None:
+        return as_venv(Path(self.executable).parent.parent)
+
+    def get_install_inputs(self) -> list[str]:
+        # Installing the project itself depends on its sources
+        requirements = self._find_requirements_txt()
+        return [os.path.basename(requirements)] if requirements else []
+
     def install(self, *args: str) -> NoReturn:
         if not args:
             requirements = self._find_requirements_txt()
@@ -74,7 +80,7 @@ class Pip(PackageManager):
             if requirements:
                 expanded_args = ["install", "-r", requirements]
             elif pyproject:
-                expanded_args = ["install", "."]
+                expanded_args = ["install", self.context.relative()]
             else:
                 raise Exception(
                     "No requirements.txt or setup.py/pyproject.toml is found, "
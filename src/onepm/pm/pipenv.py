@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import os
-from typing import Any, NoReturn
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, NoReturn
 
-from onepm.pm.base import PackageManager
+from onepm.pm.base import PackageManager, as_venv
+
+if TYPE_CHECKING:
+    from onepm.project import ProjectContext
 
 
 class Pipenv(PackageManager):
     name = "pipenv"
+    warmup_module = "pipenv.cli"
+    install_inputs = ("Pipfile", "Pipfile.lock")
+    run_directly = True
 
     @classmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool:
-        return os.path.exists("Pipfile.lock") or os.path.exists("Pipfile")
+    def matches(cls, context: ProjectContext) -> bool:
+        return context.exists("Pipfile.lock") or context.exists("Pipfile")
 
     def install(self, *args: str) -> NoReturn:
         self.execute("install", *args)
@@ -24,3 +32,43 @@ class Pipenv(PackageManager):
 
     def run(self, *args: str) -> NoReturn:
         self.execute("run", *args)
+
+    def find_environment(self) -> Path | None:
+        if "VIRTUAL_ENV" in os.environ and not os.getenv("PIPENV_IGNORE_VIRTUALENVS"):
+            return as_venv(Path(os.environ["VIRTUAL_ENV"]))
+        if venv := super().find_environment():
+            return venv
+        if "WORKON_HOME" in os.environ:
+            workon_home = Path(os.environ["WORKON_HOME"]).expanduser()
+        elif sys.platform == "win32":
+            workon_home = Path.home() / ".virtualenvs"
+        else:
+            data_home = os.getenv("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+            workon_home = Path(data_home, "virtualenvs")
+        return as_venv(workon_home / _env_name(self.context.root))
+
+    def get_project_scripts(self) -> list[str] | None:
+        if self.context.exists(".env") and not os.getenv("PIPENV_DONT_LOAD_ENV"):
+            # Loaded into the environment of all commands
+            return None
+        if sys.version_info >= (3, 11):
+            import tomllib
+        else:
+            import tomlkit as tomllib
+
+        try:
+            with open(self.context.root / "Pipfile", "rb") as f:
+                return list(tomllib.load(f).get("scripts", {}))
+        except (OSError, ValueError):
+            return []
+
+
+def _env_name(root: Path) -> str:
+    """The name of the venv created by pipenv for the project."""
+    import base64
+    import hashlib
+    import re
+
+    sanitized_name = re.sub(r'[ &$`!*@"()\[\]\\\r\n\t]', "_", root.name)[:42]
+    digest = hashlib.sha256(str(root / "Pipfile").encode()).digest()[:6]
+    return f"{sanitized_name}-{base64.urlsafe_b64encode(digest).decode()[:8]}"
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 import os
-from typing import Any, NoReturn
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, NoReturn
 
-from onepm.pm.base import PackageManager
+from onepm.pm.base import PackageManager, as_venv
+
+if TYPE_CHECKING:
+    from typing import Any, BinaryIO
+
+    from onepm.project import ProjectContext
 
 
 class Poetry(PackageManager):
     name = "poetry"
+    warmup_module = "poetry.console.application"
+    install_inputs = ("pyproject.toml", "poetry.lock")
+    run_directly = True
 
     @classmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool:
-        if os.path.exists("poetry.lock"):
+    def matches(cls, context: ProjectContext) -> bool:
+        if context.exists("poetry.lock"):
             return True
+        pyproject = context.pyproject
         build_backend = pyproject.get("build-system", {}).get("build-backend", "")
         if "poetry" in build_backend:
             return True
@@ -33,3 +44,67 @@ class Poetry(PackageManager):
 
     def run(self, *args: str) -> NoReturn:
         self.execute("run", *args)
+
+    def find_environment(self) -> Path | None:
+        if "VIRTUAL_ENV" in os.environ:
+            return as_venv(Path(os.environ["VIRTUAL_ENV"]))
+        if venv := super().find_environment():
+            return venv
+        if self.context.exists("poetry.toml"):
+            # The virtualenvs settings of the project are up to poetry
+            return None
+        pyproject = self.context.pyproject
+        name = pyproject.get("tool", {}).get("poetry", {}).get("name")
+        name = name or pyproject.get("project", {}).get("name")
+        if not name:
+            return None
+        virtualenvs = _virtualenvs_path()
+        env_name = _env_name(name, self.context.root)
+        try:
+            with open(virtualenvs / "envs.toml", "rb") as f:
+                minor = _load_toml(f).get(env_name, {}).get("minor")
+        except (OSError, ValueError):
+            minor = None
+        if minor:
+            return as_venv(virtualenvs / f"{env_name}-py{minor}")
+        # The version of the interpreter is unknown, unless there is only one
+        candidates = list(virtualenvs.glob(f"{env_name}-py*"))
+        return as_venv(candidates[0]) if len(candidates) == 1 else None
+
+
+def _load_toml(f: BinaryIO) -> dict[str, Any]:
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomlkit as tomllib
+
+    return tomllib.load(f)
+
+
+def _virtualenvs_path() -> Path:
+    if "POETRY_VIRTUALENVS_PATH" in os.environ:
+        return Path(os.environ["POETRY_VIRTUALENVS_PATH"]).expanduser()
+    if "POETRY_CACHE_DIR" in os.environ:
+        cache_dir = Path(os.environ["POETRY_CACHE_DIR"]).expanduser()
+    elif sys.platform == "win32":
+        cache_dir = Path(os.environ["LOCALAPPDATA"], "pypoetry", "Cache")
+    elif sys.platform == "darwin":
+        cache_dir = Path.home() / "Library" / "Caches" / "pypoetry"
+    else:
+        xdg_cache = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+        cache_dir = Path(xdg_cache, "pypoetry")
+    return cache_dir / "virtualenvs"
+
+
+def _env_name(name: str, root: Path) -> str:
+    """The name of the venv created by poetry for the project, without the
+    Python version suffix.
+    """
+    import base64
+    import hashlib
+    import re
+
+    sanitized_name = re.sub(r'[ $`!*@"\\\r\n\t]', "_", name.lower())[:42]
+    cwd = os.path.normcase(os.path.realpath(root))
+    digest = hashlib.sha256(cwd.encode()).digest()
+    return f"{sanitized_name}-{base64.urlsafe_b64encode(digest).decode()[:8]}"
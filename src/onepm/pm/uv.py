@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-import os
-from typing import Any, NoReturn
+from typing import TYPE_CHECKING, NoReturn
 
 from onepm.pm.base import PackageManager
 
+if TYPE_CHECKING:
+    from onepm.project import ProjectContext
+
 UV_INDEX_FLAGS = ["--no-index"]
 UV_INSTALLER_FLAGS = ["--reinstall", "--compile-bytecode"]
 UV_RESOLVER_FLAGS = ["-U", "--upgrade", "--no-source"]
@@ -50,11 +52,12 @@ UV_SYNC_FLAGS = [
 
 class Uv(PackageManager):
     name = "uv"
+    install_inputs = ("pyproject.toml", "uv.lock")
     UV_LOCK_FILENAME = "uv.lock"
 
     @classmethod
-    def matches(cls, pyproject: dict[str, Any]) -> bool:
-        return os.path.exists(cls.UV_LOCK_FILENAME) or "project" in pyproject
+    def matches(cls, context: ProjectContext) -> bool:
+        return context.exists(cls.UV_LOCK_FILENAME) or "project" in context.pyproject
 
     def install(self, *args: str) -> NoReturn:
         if (
@@ -0,0 +1,158 @@
+"""Run commands concurrently on asyncio.
+
+The shortcuts replace the process with the package manager, while this is for
+the operations that run commands and carry on, so that several of them can
+overlap. The output is streamed line by line to a callback, and a command that
+is cancelled or times out has its process terminated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Mapping, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Called with the stream name("stdout" or "stderr") and the line
+OutputCallback = Callable[[str, str], None]
+
+# Seconds to wait for a terminated process to exit before killing it
+TERMINATE_TIMEOUT = 5.0
+# The longest line read from the output
+LINE_LIMIT = 1024 * 1024
+
+
+@dataclass
+class CommandResult:
+    args: list[str]
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+
+    def check_returncode(self) -> None:
+        if self.returncode:
+            raise subprocess.CalledProcessError(
+                self.returncode, self.args, self.stdout, self.stderr
+            )
+
+
+async def _terminate(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def run_command(
+    args: Sequence[str],
+    *,
+    env: Mapping[str, str] | None = None,
+    cwd: str | os.PathLike[str] | None = None,
+    on_output: OutputCallback | None = None,
+    timeout: float | None = None,
+    capture: bool = True,
+    merge_stderr: bool = False,
+    check: bool = False,
+) -> CommandResult:
+    """Run the command, streaming the output lines to ``on_output``.
+
+    The output is also kept in the result unless ``capture`` is false. With
+    ``merge_stderr``, stderr is read as part of stdout. The process is
+    terminated when the task is cancelled, and when it doesn't finish within
+    ``timeout`` seconds, raising subprocess.TimeoutExpired.
+    """
+    args = list(args)
+    process_env = {**os.environ, **env} if env else None
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+        env=process_env,
+        cwd=cwd,
+        limit=LINE_LIMIT,
+    )
+    output: dict[str, list[str]] = {"stdout": [], "stderr": []}
+
+    async def read(name: str, stream: asyncio.StreamReader | None) -> None:
+        if stream is None:
+            return
+        async for data in stream:
+            line = data.decode(errors="replace")
+            if capture:
+                output[name].append(line)
+            if on_output is not None:
+                on_output(name, line)
+
+    waiting = asyncio.gather(
+        read("stdout", process.stdout), read("stderr", process.stderr), process.wait()
+    )
+    try:
+        await asyncio.wait_for(waiting, timeout)
+    except asyncio.TimeoutError:
+        await _terminate(process)
+        raise subprocess.TimeoutExpired(
+            args, timeout or 0, "".join(output["stdout"]), "".join(output["stderr"])
+        ) from None
+    except BaseException:
+        # Cancelled
+        await _terminate(process)
+        raise
+    assert process.returncode is not None
+    result = CommandResult(
+        args,
+        process.returncode,
+        "".join(output["stdout"]),
+        "".join(output["stderr"]),
+        time.monotonic() - start,
+    )
+    if check:
+        result.check_returncode()
+    return result
+
+
+async def run_concurrently(
+    tasks: Iterable[Awaitable[T]], jobs: int | None = None
+) -> list[T | Exception]:
+    """Await the tasks with at most ``jobs`` of them running at a time.
+
+    Return the results in order, with the exceptions raised in place of the
+    results of the failed tasks.
+    """
+    semaphore = asyncio.Semaphore(jobs) if jobs else None
+
+    async def limited(task: Awaitable[T]) -> T:
+        if semaphore is None:
+            return await task
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            # Cancelled before it started
+            if asyncio.iscoroutine(task):
+                task.close()
+            raise
+        try:
+            return await task
+        finally:
+            semaphore.release()
+
+    results = await asyncio.gather(
+        *(limited(task) for task in tasks), return_exceptions=True
+    )
+    for result in results:
+        if not isinstance(result, Exception) and isinstance(result, BaseException):
+            raise result
+    return results  # type: ignore[return-value]
@@ -0,0 +1,112 @@
+"""The project onepm works on.
+
+The project root is the nearest directory from the working directory up that
+contains any of the project files, not crossing the root of a repository. It
+is scanned once and pyproject.toml is parsed on first use, and the result is
+reused within the process until the directories or pyproject.toml change.
+
+This module is imported on the hot path of every shortcut and shim, keep it
+free of third-party imports.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+from onepm.cache import stat_key
+
+PROJECT_FILES = frozenset(
+    {
+        "pyproject.toml",
+        "setup.py",
+        "pdm.lock",
+        "poetry.lock",
+        "uv.lock",
+        "Pipfile",
+        "Pipfile.lock",
+        "requirements.txt",
+        "requirements.in",
+    }
+)
+# The search for the project root stops at the root of a repository
+REPOSITORY_MARKERS = frozenset({".git", ".hg"})
+
+
+class ProjectContext:
+    def __init__(self, root: Path, files: frozenset[str]) -> None:
+        self.root = root
+        # The names of the entries in the root
+        self.files = files
+
+    def __repr__(self) -> str:
+        return f"<ProjectContext {self.root}>"
+
+    def exists(self, name: str) -> bool:
+        return name in self.files
+
+    def relative(self, name: str = "") -> str:
+        """The path of the file in the root relative to the working directory."""
+        return os.path.relpath(self.root / name)
+
+    @cached_property
+    def pyproject(self) -> dict[str, Any]:
+        if not self.exists("pyproject.toml"):
+            return {}
+        if sys.version_info >= (3, 11):
+            import tomllib
+        else:
+            import tomlkit as tomllib
+
+        from onepm.tracing import span
+
+        try:
+            with open(self.root / "pyproject.toml", "rb") as f, span("parse pyproject"):
+                return tomllib.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+def _scan(directory: Path) -> frozenset[str]:
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+def find_project_root(path: Path) -> tuple[Path, frozenset[str]]:
+    """Return the project root of the path and the names of its entries.
+
+    The path itself is the root if no project files are found.
+    """
+    start_files = files = _scan(path)
+    directory = path
+    while not files & PROJECT_FILES:
+        if files & REPOSITORY_MARKERS or directory.parent == directory:
+            return path, start_files
+        directory = directory.parent
+        files = _scan(directory)
+    return directory, files
+
+
+def _stamp(path: Path, root: Path) -> tuple[Any, ...]:
+    return stat_key(path), stat_key(root), stat_key(root / "pyproject.toml")
+
+
+_projects: dict[Path, tuple[tuple[Any, ...], ProjectContext]] = {}
+
+
+def get_project(path: Path | None = None) -> ProjectContext:
+    """Return the project containing the path, the working directory by default."""
+    path = (path or Path.cwd()).absolute()
+    cached = _projects.get(path)
+    if cached is not None and cached[0] == _stamp(path, cached[1].root):
+        return cached[1]
+    root, files = find_project_root(path)
+    context = ProjectContext(root, files)
+    _projects[path] = (_stamp(path, root), context)
+    return context
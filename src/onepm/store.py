@@ -0,0 +1,111 @@
+"""Content-addressed store of the files shared by tool venvs.
+
+Different versions of a tool mostly depend on the same packages, so after a
+venv is installed its library files are moved into the store and linked back,
+making identical files occupy the disk only once.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import stat
+import sys
+from pathlib import Path
+
+from onepm.tracing import traced
+
+# The FICLONE ioctl request on Linux, to create copy-on-write clones
+FICLONE = 0x40049409
+
+
+def _file_digest(path: str, mode: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    # Files with different permissions can't share an inode
+    return h.hexdigest() + ("x" if mode & stat.S_IXUSR else "")
+
+
+def _reflink(src: str, dst: str) -> None:
+    if sys.platform != "linux":
+        raise OSError("Reflink is not supported on this platform")
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+class SharedStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def _materialize(self, obj: Path, target: str) -> bool:
+        """Replace target with a link to the object, return False if impossible."""
+        tmp = f"{target}.onepm-link"
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            try:
+                _reflink(str(obj), tmp)
+            except OSError:
+                # Keep the copy that is already in place
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp)
+                return False
+        os.replace(tmp, target)
+        return True
+
+    @traced("SharedStore.link_tree")
+    def link_tree(self, directory: Path) -> int:
+        """Deduplicate the files under the directory against the store.
+
+        Returns the number of bytes that are now shared with other venvs.
+        """
+        saved = 0
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                st = os.lstat(path)
+                if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+                    continue
+                obj = self._object_path(_file_digest(path, st.st_mode))
+                if obj.exists():
+                    if os.path.samefile(obj, path):
+                        continue
+                    if self._materialize(obj, path):
+                        saved += st.st_size
+                    continue
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, obj)
+                except FileExistsError:
+                    # Added by another process in the meantime
+                    if self._materialize(obj, path):
+                        saved += st.st_size
+                except OSError:
+                    # Hard links are not supported by the file system
+                    return saved
+        return saved
+
+    @traced("SharedStore.prune")
+    def prune(self) -> int:
+        """Remove the objects that are no longer linked by any venv.
+
+        Returns the number of bytes freed.
+        """
+        freed = 0
+        if not self.root.exists():
+            return freed
+        for bucket in self.root.iterdir():
+            for obj in bucket.iterdir():
+                st = obj.stat()
+                if st.st_nlink <= 1:
+                    obj.unlink()
+                    freed += st.st_size
+        return freed
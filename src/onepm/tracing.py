@@ -0,0 +1,149 @@
+"""Timing of the phases of onepm, enabled by the ``ONEPM_TRACE`` environment
+variable:
+
+- ``ONEPM_TRACE=1`` prints a summary of the spans to stderr,
+- ``ONEPM_TRACE=<path>`` writes the spans to the file in the Chrome trace
+  format, which can be loaded in ``chrome://tracing`` or Perfetto.
+
+The output is written when the process exits or right before it is replaced
+by the package manager. When the variable is unset, ``traced`` returns the
+functions undecorated and ``span`` returns a shared no-op context manager.
+
+This module is imported on the hot path of every shortcut and shim, keep it
+free of third-party imports.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, ContextManager, Iterator, NamedTuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+STDERR_VALUES = ("1", "true", "stderr")
+
+
+class Span(NamedTuple):
+    name: str
+    start: int  # nanoseconds since the tracer is created
+    duration: int  # nanoseconds
+    depth: int
+    thread: int
+    args: dict[str, Any]
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter_ns()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, name: str, args: dict[str, Any] | None = None) -> Iterator[None]:
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self._local.depth = depth
+            self.spans.append(
+                Span(
+                    name,
+                    start - self._origin,
+                    end - start,
+                    depth,
+                    threading.get_ident(),
+                    args or {},
+                )
+            )
+
+    def summary(self) -> str:
+        lines = [f"onepm trace (pid {os.getpid()}):"]
+        for span in sorted(self.spans, key=lambda s: (s.thread, s.start)):
+            detail = " ".join(f"{k}={v}" for k, v in span.args.items())
+            lines.append(
+                f"{span.duration / 1e6:10.2f} ms  {'  ' * span.depth}{span.name}"
+                + (f" ({detail})" if detail else "")
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": span.start / 1000,
+                    "dur": span.duration / 1000,
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": {k: str(v) for k, v in span.args.items()},
+                }
+                for span in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, destination: str) -> None:
+        if destination.lower() in STDERR_VALUES:
+            print(self.summary(), file=sys.stderr)
+            return
+        import json
+
+        with open(destination, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_destination = os.getenv("ONEPM_TRACE", "")
+tracer: Tracer | None = Tracer() if _destination else None
+_null_span = contextlib.nullcontext()
+
+
+def span(name: str, /, **args: Any) -> ContextManager[Any]:
+    """Time the block as a span with the given name and arguments."""
+    if tracer is None:
+        return _null_span
+    return tracer.span(name, args)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Time the calls of the decorated function as spans."""
+
+    def decorator(func: F) -> F:
+        if tracer is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def flush() -> None:
+    """Write the spans, called before the process is replaced by exec."""
+    global tracer
+
+    if tracer is None:
+        return
+    current, tracer = tracer, None
+    try:
+        current.write(_destination)
+    except OSError as e:
+        print(f"onepm: failed to write the trace: {e}", file=sys.stderr)
+
+
+if tracer is not None:
+    atexit.register(flush)
@@ -0,0 +1,167 @@
+"""Create virtualenvs from per-interpreter templates.
+
+The first venv of an interpreter is created by the venv module, without pip,
+and kept as a template. The later venvs are copies of the template with its
+path replaced, and get pip from a .pth file pointing to a shared copy of pip
+instead of running ensurepip.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from onepm.locking import FileLock
+from onepm.tracing import traced
+
+# Written into the template after it is complete
+TEMPLATE_MARKER = ".onepm-template"
+# The prompt of the template, replaced with the name of each venv
+TEMPLATE_PROMPT = "onepm-venv-template"
+PIP_PTH = "_onepm_pip.pth"
+
+
+def interpreter_key(python: str) -> str:
+    """Identify the interpreter, changing when it is upgraded in place."""
+    real = os.path.realpath(python)
+    st = os.stat(real)
+    return hashlib.sha256(
+        f"{real}\0{st.st_size}\0{st.st_mtime_ns}".encode()
+    ).hexdigest()[:16]
+
+
+def site_packages(venv: Path) -> Path:
+    if sys.platform == "win32":
+        return venv / "Lib" / "site-packages"
+    return next(venv.glob("lib/python*/site-packages"))
+
+
+def _build_template(template: Path, python: str) -> None:
+    symlinks = sys.platform != "win32"
+    if os.path.realpath(python) == os.path.realpath(sys.executable):
+        import venv
+
+        venv.EnvBuilder(symlinks=symlinks, prompt=TEMPLATE_PROMPT).create(template)
+    else:
+        command = [python, "-m", "venv", "--without-pip", "--prompt", TEMPLATE_PROMPT]
+        if symlinks:
+            command.append("--symlinks")
+        subprocess.run(
+            [*command, str(template)],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    template.joinpath(TEMPLATE_MARKER).touch()
+
+
+def get_template(templates_dir: Path, python: str) -> Path:
+    """Return the template of the interpreter, creating it at the first time."""
+    template = templates_dir / interpreter_key(python)
+    if template.joinpath(TEMPLATE_MARKER).exists():
+        return template
+    templates_dir.mkdir(parents=True, exist_ok=True)
+    with FileLock(templates_dir / f"{template.name}.lock"):
+        if not template.joinpath(TEMPLATE_MARKER).exists():
+            shutil.rmtree(template, ignore_errors=True)
+            _build_template(template, python)
+    return template
+
+
+def _replace_path(data: bytes, template: Path, venv: Path) -> bytes:
+    data = data.replace(os.fsencode(template), os.fsencode(venv))
+    return data.replace(TEMPLATE_PROMPT.encode(), os.fsencode(venv.name))
+
+
+def _copy_template(template: Path, venv: Path) -> None:
+    for dirpath, dirnames, filenames in os.walk(template):
+        source_dir = Path(dirpath)
+        target_dir = venv / source_dir.relative_to(template)
+        target_dir.mkdir(exist_ok=True)
+        for name in dirnames + filenames:
+            source = source_dir / name
+            target = target_dir / name
+            if source.is_symlink():
+                os.symlink(os.readlink(source), target)
+            elif name in filenames and name != TEMPLATE_MARKER:
+                data = source.read_bytes()
+                if name == "pyvenv.cfg":
+                    # The prompt of a venv defaults to the name of the directory
+                    data = b"".join(
+                        line
+                        for line in data.splitlines(keepends=True)
+                        if not line.startswith(b"prompt")
+                    )
+                target.write_bytes(_replace_path(data, template, venv))
+                shutil.copymode(source, target)
+
+
+@traced("create_venv")
+def create_venv(
+    venv: Path,
+    templates_dir: Path,
+    *,
+    python: str | None = None,
+    pip_site: Path | None = None,
+) -> Path:
+    """Create a venv of the interpreter, the current one by default, at the path.
+
+    The venv can import pip from ``pip_site`` if given.
+    """
+    venv = venv.absolute()
+    template = get_template(templates_dir, python or sys.executable)
+    venv.mkdir(parents=True, exist_ok=True)
+    _copy_template(template, venv)
+    if pip_site is not None:
+        site_packages(venv).joinpath(PIP_PTH).write_text(f"{pip_site}\n")
+    return venv
+
+
+def python_path(venv: Path) -> Path:
+    if sys.platform == "win32":
+        return venv / "Scripts" / "python.exe"
+    return venv / "bin" / "python"
+
+
+@traced("compile_bytecode")
+def compile_bytecode(venv: Path, jobs: int = 0) -> bool:
+    """Compile the modules installed in the venv ahead of their first import,
+    with the given number of processes, 0 for all cores.
+
+    Return False if some files couldn't be compiled, like the templates that
+    look like Python files shipped by some packages.
+    """
+    command = [str(python_path(venv)), "-I", "-m", "compileall", "-q"]
+    command += ["-j", str(jobs), str(site_packages(venv))]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+@traced("warmup")
+def warmup(venv: Path, module: str) -> bool:
+    """Import the module in the venv, so that everything imported on the start
+    of the tool is compiled and read once. Return whether it succeeded.
+    """
+    result = subprocess.run(
+        [str(python_path(venv)), "-c", f"import {module}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def pip_version(venv: Path) -> str | None:
+    """Return the version of pip in the venv, installed or linked by a .pth file."""
+    from importlib.metadata import distributions
+
+    site = site_packages(venv)
+    paths = [str(site)]
+    pth = site / PIP_PTH
+    if pth.exists():
+        paths.extend(line.strip() for line in pth.read_text().splitlines())
+    dist = next(distributions(name="pip", path=paths), None)
+    return dist.version if dist is not None else None
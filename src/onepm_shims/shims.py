@@ -4,13 +4,13 @@ import sys
 from functools import partial
 from typing import NoReturn
 
-from onepm.core import OneManager
+from onepm import resolve_package_manager
 
 
 def shim(package_manager: str, args: list[str] | None = None) -> NoReturn:
     if args is None:
         args = sys.argv[1:]
-    pm = OneManager().get_package_manager(package_manager)
+    pm = resolve_package_manager(package_manager)
     pm.execute(*args)
 
 
@@ -1,8 +1,20 @@
+import hashlib
+import json
 import os
 
 import pytest
+from packaging.version import Version
 
 from onepm.core import OneManager
+from onepm.lockfile import LockedPackage, ToolLock, current_environment
+
+
+@pytest.fixture(autouse=True)
+def onepm_home(tmp_path_factory, monkeypatch):
+    home = tmp_path_factory.mktemp("home")
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+    return home / ".onepm"
 
 
 @pytest.fixture()
@@ -10,6 +22,24 @@ def execute_command(mocker):
     return mocker.patch("onepm.pm.base.PackageManager._execute_command")
 
 
+@pytest.fixture()
+def lock_tool(mocker):
+    """Lock each tool to its own wheel without resolving the dependencies."""
+
+    def lock_tool(self, name, version, venv):
+        url = f"https://example.org/{name}-{version}-py3-none-any.whl"
+        return ToolLock(
+            name,
+            str(version),
+            current_environment(),
+            [LockedPackage(name, str(version), url)],
+        )
+
+    return mocker.patch.object(
+        OneManager, "lock_tool", autospec=True, side_effect=lock_tool
+    )
+
+
 @pytest.fixture()
 def project(tmp_path):
     cwd = os.getcwd()
@@ -58,3 +88,74 @@ def uv(mocker, project):
         f.write('[tool.onepm]\npackage-manager = "uv"')
     mocker.patch("onepm.pm.uv.Uv.ensure_executable", return_value="uv")
     assert OneManager().get_package_manager().name == "uv"
+
+
+@pytest.fixture()
+def core(project):
+    return OneManager()
+
+
+@pytest.fixture()
+def add_installation(core):
+    """Register a fake installation of the tool, whose executable runs ``script``."""
+
+    def add_installation(name, version, last_used=None, *, size=0, script=""):
+        venv = core.package_dir(name) / version
+        executable = venv / "bin" / name
+        executable.parent.mkdir(parents=True)
+        executable.write_text(script)
+        executable.chmod(0o755)
+        if size:
+            venv.joinpath("data").write_bytes(b"x" * size)
+        index = core.installation_index(name)
+        installation = index.make_installation(Version(version), venv, last_used)
+        index.add(installation)
+        return installation
+
+    return add_installation
+
+
+def sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.fixture()
+def wheels(tmp_path):
+    wheels = tmp_path / "wheels"
+    wheels.mkdir()
+    for name in ("poetry-1.8.0-py3-none-any.whl", "six-1.16.0-py2.py3-none-any.whl"):
+        wheels.joinpath(name).write_bytes(name.encode())
+    return wheels
+
+
+@pytest.fixture()
+def run_pip(mocker, wheels):
+    poetry_wheel = wheels / "poetry-1.8.0-py3-none-any.whl"
+    report = {
+        "install": [
+            {
+                "metadata": {"name": "poetry", "version": "1.8.0"},
+                "download_info": {
+                    "url": poetry_wheel.as_uri(),
+                    "archive_info": {"hashes": {"sha256": sha256(poetry_wheel)}},
+                },
+            },
+            {
+                "metadata": {"name": "six", "version": "1.16.0"},
+                "download_info": {
+                    "url": (wheels / "six-1.16.0-py2.py3-none-any.whl").as_uri(),
+                    "archive_info": {},
+                },
+            },
+        ]
+    }
+
+    def run_pip(*args, venv, use_uv=True):
+        venv.mkdir(parents=True, exist_ok=True)
+        if "--report" in args:
+            with open(args[args.index("--report") + 1], "w") as f:
+                json.dump(report, f)
+
+    # The fake venvs have no interpreter to compile them with
+    mocker.patch.object(OneManager, "_precompile")
+    return mocker.patch.object(OneManager, "_run_pip", side_effect=run_pip)
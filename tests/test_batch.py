@@ -0,0 +1,119 @@
+import io
+import os
+import sys
+
+import pytest
+from packaging.version import Version
+
+from onepm.batch import discover_projects, group_projects, provision, run_batch
+from onepm.cli import parse_args
+from onepm.core import OneManager
+
+AVAILABLE = {"poetry": ["1.7.0", "1.8.0"], "pdm": ["2.12.0"]}
+
+
+def make_project(root, name, filename="pyproject.toml", content=""):
+    project = root / name
+    project.mkdir(parents=True)
+    project.joinpath(filename).write_text(content)
+    return project
+
+
+def echo_script(name):
+    return f'#!/bin/sh\necho {name} "$@"\nif [ -f fail ]; then exit 1; fi\n'
+
+
+def test_discover_projects(tmp_path):
+    make_project(tmp_path, "a")
+    make_project(tmp_path, "a/nested", "poetry.lock")
+    make_project(tmp_path, "b", "requirements.txt")
+    make_project(tmp_path, "excluded/c")
+    make_project(tmp_path, ".hidden")
+    make_project(tmp_path, "node_modules/pkg")
+    make_project(tmp_path, "venv", "pyvenv.cfg")
+    tmp_path.joinpath("venv", "pyproject.toml").touch()
+    tmp_path.joinpath("docs").mkdir()
+
+    assert discover_projects(tmp_path, exclude=["excluded*"]) == [
+        tmp_path / "a",
+        tmp_path / "a/nested",
+        tmp_path / "b",
+    ]
+
+
+def test_provision_each_requirement_once(project, mocker, lock_tool):
+    def resolve_tool(requirement):
+        versions = [
+            v for v in AVAILABLE[requirement.name] if v in requirement.specifier
+        ]
+        return Version(max(versions, key=Version))
+
+    mocker.patch.object(OneManager, "resolve_tool", side_effect=resolve_tool)
+    install_locked = mocker.patch.object(
+        OneManager,
+        "_install_locked",
+        side_effect=lambda lock, venv: venv.mkdir(parents=True, exist_ok=True),
+    )
+    onepm_table = '[tool.onepm]\npackage-manager = "{}"\n'
+    projects = [
+        make_project(project, "a", content=onepm_table.format("poetry>=1.8")),
+        make_project(project, "b", content=onepm_table.format("poetry>=1.8")),
+        make_project(project, "c", content=onepm_table.format("poetry<1.8")),
+        make_project(project, "d", "pdm.lock"),
+        make_project(project, "e", "requirements.txt"),
+    ]
+    groups, failed = group_projects(projects)
+    assert failed == []
+    assert groups == {
+        ("poetry", "poetry>=1.8"): projects[:2],
+        ("poetry", "poetry<1.8"): [projects[2]],
+        ("pdm", "pdm"): [projects[3]],
+        ("pip", "pip"): [projects[4]],
+    }
+
+    core = OneManager()
+    assert provision(core, groups) == {}
+    assert sorted(
+        f"{call.args[0].name}=={call.args[0].version}"
+        for call in install_locked.call_args_list
+    ) == ["pdm==2.12.0", "poetry==1.7.0", "poetry==1.8.0"]
+    assert provision(core, groups) == {}
+    assert install_locked.call_count == 3
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake tools are shell scripts")
+def test_run_batch(project, core, add_installation, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+    add_installation("poetry", "1.8.0", script=echo_script("poetry"))
+    add_installation("pdm", "2.12.0", script=echo_script("pdm"))
+    root = project / "workspace"
+    make_project(root, "one", "poetry.lock")
+    make_project(root, "two", "poetry.lock")
+    root.joinpath("two", "fail").touch()
+    make_project(root, "three", "pdm.lock")
+
+    output = io.StringIO()
+    results = run_batch(core, root, "run", ["test"], jobs=2, stream=output)
+
+    assert [(r.project.name, r.returncode) for r in results] == [
+        ("one", 0),
+        ("three", 0),
+        ("two", 1),
+    ]
+    lines = output.getvalue().splitlines()
+    assert "poetry: 2 project(s)" in lines
+    assert "pdm: 1 project(s)" in lines
+    assert "[one] poetry run test" in lines
+    assert "[two] poetry run test" in lines
+    assert "[three] pdm run test" in lines
+
+
+def test_parse_each_options_before_action(monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["onepm", "each", "--root", "x", "-j", "2", "run", "pytest", "-j", "4"],
+    )
+    args = parse_args()
+    assert (args.root, args.jobs, args.action) == ("x", 2, "run")
+    assert args.args == ["pytest", "-j", "4"]
@@ -0,0 +1,61 @@
+import io
+import json
+import tarfile
+
+import pytest
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from onepm.bundle import MANIFEST, export_bundle, import_bundle
+from onepm.core import OneManager
+from onepm.lockfile import current_environment
+
+
+@pytest.fixture()
+def bundle(project, mocker, run_pip, tmp_path):
+    mocker.patch.object(OneManager, "resolve_tool", return_value=Version("1.8.0"))
+    core = OneManager()
+    core.install_tool("poetry", Requirement("poetry"))
+    output = tmp_path / "bundle.tar.gz"
+    (lock,) = export_bundle(core, [Requirement("poetry")], output)
+    assert (lock.name, lock.version) == ("poetry", "1.8.0")
+    return output
+
+
+def test_import_bundle_offline(bundle, tmp_path, monkeypatch, run_pip, wheels):
+    home = tmp_path / "other-home"
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+    # The wheels can only come from the bundle
+    for wheel in wheels.iterdir():
+        wheel.unlink()
+    run_pip.reset_mock()
+
+    core = OneManager()
+    (installation,) = import_bundle(core, bundle)
+    assert installation.version == Version("1.8.0")
+    assert core.get_installations("poetry") == [installation]
+    assert not core.offline
+    (call,) = run_pip.call_args_list
+    assert call.args[:3] == ("install", "--no-deps", "--no-index")
+    lock = core.tool_lockfile("poetry").get("poetry", "1.8.0", current_environment())
+    assert call.args[3:] == tuple(str(core.wheel_cache.path(p)) for p in lock.packages)
+
+
+def test_import_bundle_checks_environment(bundle, mocker):
+    mocker.patch("onepm.bundle.current_environment", return_value="cpython-0-other")
+    with pytest.raises(Exception, match="not for this machine"):
+        import_bundle(OneManager(), bundle)
+
+
+def test_import_bundle_rejects_unsafe_members(tmp_path):
+    archive = tmp_path / "evil.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        data = json.dumps({"version": 1}).encode()
+        for name in (MANIFEST, "../evil"):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with pytest.raises(Exception, match="Unsafe member"):
+        import_bundle(OneManager(), archive)
+    assert not tmp_path.parent.joinpath("evil").exists()
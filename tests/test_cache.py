@@ -0,0 +1,66 @@
+import pytest
+
+from onepm import pi, resolve_package_manager
+from onepm.cache import ResolutionCache
+
+
+@pytest.fixture()
+def pdm_executable(mocker, project):
+    executable = project / "bin" / "pdm"
+    executable.parent.mkdir()
+    executable.touch()
+    return mocker.patch(
+        "onepm.pm.base.PackageManager.ensure_executable",
+        return_value=str(executable),
+    )
+
+
+def test_resolution_cache_hit_skips_detection(
+    project, pdm_executable, execute_command, mocker
+):
+    project.joinpath("pdm.lock").touch()
+    pi([])
+    assert pdm_executable.call_count == 1
+
+    detect = mocker.patch("onepm.core.OneManager.detect_package_manager")
+    pi([])
+    detect.assert_not_called()
+    assert pdm_executable.call_count == 1
+    execute_command.assert_called_with(
+        [str(project / "bin" / "pdm"), "install"], None, exit=True
+    )
+
+
+def test_resolution_cache_invalidated_by_project_files(project, pdm_executable):
+    project.joinpath("pdm.lock").touch()
+    assert resolve_package_manager().name == "pdm"
+
+    project.joinpath("Pipfile").touch()
+    assert resolve_package_manager().name == "pipenv"
+    assert pdm_executable.call_count == 2
+
+
+def test_resolution_cache_keyed_by_specified_name(project, pdm_executable):
+    project.joinpath("pdm.lock").touch()
+    assert resolve_package_manager().name == "pdm"
+    assert resolve_package_manager("uv").name == "uv"
+    assert resolve_package_manager().name == "pdm"
+
+
+def test_resolution_cache_ignores_missing_executable(project, onepm_home):
+    cache = ResolutionCache(onepm_home)
+    cache.set(project, None, "pdm", str(project / "missing"))
+    assert cache.get(project) is None
+
+
+def test_resolution_cache_invalidated_by_new_installation(project, onepm_home):
+    cache = ResolutionCache(onepm_home)
+    tool_dir = onepm_home / "venvs" / "pdm"
+    tool_dir.mkdir(parents=True)
+    executable = project / "pdm"
+    executable.touch()
+    cache.set(project, None, "pdm", str(executable), tool_dir)
+    assert cache.get(project) == ("pdm", str(executable), None)
+
+    tool_dir.joinpath("new-venv").mkdir()
+    assert cache.get(project) is None
@@ -0,0 +1,95 @@
+import socket
+import threading
+
+import pytest
+
+from onepm import resolve_package_manager
+from onepm.core import OneManager
+from onepm.daemon import Daemon, Resolver, query
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="The daemon requires Unix domain sockets"
+)
+
+
+@pytest.fixture()
+def poetry_project(project, onepm_home):
+    project.joinpath("poetry.lock").touch()
+    return project
+
+
+@pytest.fixture()
+def daemon(onepm_home):
+    daemon = Daemon(onepm_home, interval=0.01)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    assert daemon.ready.wait(5)
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def test_resolver_reuses_state(poetry_project, add_installation, mocker):
+    venv = add_installation("poetry", "1.8.0").venv
+    resolver = Resolver()
+    detect = mocker.spy(OneManager, "detect_package_manager")
+
+    resolution = resolver.resolve(poetry_project)
+    assert resolution.name == "poetry"
+    assert resolution.venv == str(venv)
+    assert resolver.resolve(poetry_project) == resolution
+    assert detect.call_count == 1
+    assert resolver.invalidate() == 0
+
+    poetry_project.joinpath("pdm.lock").touch()
+    assert resolver.invalidate() == 1
+    add_installation("pdm", "2.12.0")
+    assert resolver.resolve(poetry_project).name == "pdm"
+    assert detect.call_count == 2
+
+
+def test_resolver_declines_pip(project):
+    assert Resolver().resolve(project) is None
+
+
+def test_shortcuts_query_daemon(
+    poetry_project, onepm_home, daemon, add_installation, mocker
+):
+    venv = add_installation("poetry", "1.8.0").venv
+    assert query(onepm_home, poetry_project).venv == str(venv)
+
+    core_init = mocker.patch.object(OneManager, "__init__")
+    package_manager = resolve_package_manager()
+    core_init.assert_not_called()
+    assert package_manager.name == "poetry"
+    assert package_manager.executable == str(venv / "bin" / "poetry")
+
+
+def test_query_without_daemon(poetry_project, onepm_home):
+    assert query(onepm_home, poetry_project) is None
+
+
+def test_only_one_daemon(onepm_home, daemon):
+    with pytest.raises(Exception, match="already listening"):
+        Daemon(onepm_home).serve_forever()
+
+
+def test_query_wedged_daemon(poetry_project, onepm_home, monkeypatch):
+    from onepm import daemon
+
+    monkeypatch.setattr(daemon, "RESPONSE_TIMEOUT", 0.1)
+    onepm_home.mkdir(parents=True, exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(daemon.socket_path(onepm_home)))
+    server.listen()
+    try:
+        # Accepted by the backlog, never answered
+        assert query(onepm_home, poetry_project) is None
+    finally:
+        server.close()
+
+
+def test_resolver_leaves_installs_to_client(poetry_project, mocker):
+    install_tool = mocker.patch.object(OneManager, "install_tool")
+    assert Resolver().resolve(poetry_project) is None
+    install_tool.assert_not_called()
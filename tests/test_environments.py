@@ -0,0 +1,128 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from onepm import pr
+from onepm.pm.pipenv import _env_name as pipenv_env_name
+from onepm.pm.poetry import _env_name as poetry_env_name
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The fake venvs have POSIX layouts"
+)
+
+
+def make_venv(path, *commands):
+    path.joinpath("bin").mkdir(parents=True)
+    path.joinpath("pyvenv.cfg").write_text("home = /usr/bin\n")
+    for command in ("python", *commands):
+        executable = path / "bin" / command
+        executable.write_text("#!/bin/sh\n")
+        executable.chmod(0o755)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_active_venv(monkeypatch):
+    monkeypatch.delenv("VIRTUAL_ENV", raising=False)
+
+
+def assert_direct(execute_command, venv, args):
+    command, *rest = args
+    execute_command.assert_called_with(
+        [str(venv / "bin" / command), *rest],
+        {"VIRTUAL_ENV": str(venv), "PATH": f"{venv / 'bin'}:{os.environ['PATH']}"},
+    )
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pdm_pr_runs_directly(project, execute_command, mocker):
+    with open("pyproject.toml", "a") as f:
+        f.write('\n[tool.pdm.scripts]\ntest = "pytest"\n')
+    venv = make_venv(project / ".venv", "pytest")
+
+    pr(["pytest", "-x"])
+    assert_direct(execute_command, venv, ["pytest", "-x"])
+    pr(["python", "-c", "pass"])
+    assert_direct(execute_command, venv, ["python", "-c", "pass"])
+    # Defined by the project, or not installed in the venv
+    pr(["test"])
+    execute_command.assert_called_with(["pdm", "run", "test"], None, exit=True)
+    pr(["ls", "-l"])
+    execute_command.assert_called_with(["pdm", "run", "ls", "-l"], None, exit=True)
+
+    # Cached
+    find_environment = mocker.patch("onepm.pm.pdm.PDM.find_environment")
+    pr(["pytest"])
+    assert_direct(execute_command, venv, ["pytest"])
+    find_environment.assert_not_called()
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pdm_pr_selected_interpreter(project, execute_command):
+    venv = make_venv(project / "envs" / "py311", "pytest")
+    make_venv(project / ".venv", "pytest")
+    project.joinpath(".pdm-python").write_text(str(venv / "bin" / "python"))
+    pr(["pytest"])
+    assert_direct(execute_command, venv, ["pytest"])
+
+    # The packages are in __pypackages__
+    project.joinpath(".pdm-python").write_text("/usr/bin/python3")
+    pr(["pytest"])
+    execute_command.assert_called_with(["pdm", "run", "pytest"], None, exit=True)
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pdm_pr_with_shared_settings(project, execute_command):
+    with open("pyproject.toml", "a") as f:
+        f.write('\n[tool.pdm.scripts]\n_.env_file = ".env"\n')
+    make_venv(project / ".venv", "pytest")
+    pr(["pytest"])
+    execute_command.assert_called_with(["pdm", "run", "pytest"], None, exit=True)
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pr_falls_back_when_venv_removed(project, execute_command):
+    venv = make_venv(project / ".venv", "pytest")
+    pr(["pytest"])
+    assert_direct(execute_command, venv, ["pytest"])
+    shutil.rmtree(venv)
+    pr(["pytest"])
+    execute_command.assert_called_with(["pdm", "run", "pytest"], None, exit=True)
+
+
+@pytest.mark.usefixtures("poetry")
+def test_poetry_pr_in_virtualenvs_path(project, execute_command, monkeypatch):
+    with open("pyproject.toml", "a") as f:
+        f.write('\n[tool.poetry]\nname = "My Demo"\n')
+    virtualenvs = project / "virtualenvs"
+    monkeypatch.setenv("POETRY_VIRTUALENVS_PATH", str(virtualenvs))
+    env_name = poetry_env_name("My Demo", project)
+    assert env_name.startswith("my_demo-")
+    venv = make_venv(virtualenvs / f"{env_name}-py3.11", "pytest")
+    pr(["pytest"])
+    assert_direct(execute_command, venv, ["pytest"])
+
+    # Ambiguous without envs.toml
+    other = make_venv(virtualenvs / f"{env_name}-py3.12", "pytest")
+    pr(["pytest"])
+    execute_command.assert_called_with(["poetry", "run", "pytest"], None, exit=True)
+    virtualenvs.joinpath("envs.toml").write_text(
+        f'[{env_name}]\nminor = "3.12"\npatch = "3.12.1"\n'
+    )
+    pr(["pytest"])
+    assert_direct(execute_command, other, ["pytest"])
+
+
+@pytest.mark.usefixtures("pipenv")
+def test_pipenv_pr_in_workon_home(project, execute_command, monkeypatch):
+    workon_home = project / "workon"
+    monkeypatch.setenv("WORKON_HOME", str(workon_home))
+    venv = make_venv(workon_home / pipenv_env_name(project), "pytest")
+    pr(["pytest"])
+    assert_direct(execute_command, venv, ["pytest"])
+
+    project.joinpath(".env").write_text("DEBUG=1\n")
+    pr(["pytest"])
+    execute_command.assert_called_with(["pipenv", "run", "pytest"], None, exit=True)
@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+from packaging.requirements import Requirement
+
+from onepm.cache import LAST_USED_STAMP
+from onepm.core import OneManager
+from onepm.eviction import EvictionPolicy, select_evictions
+from onepm.pm.poetry import Poetry
+
+
+def versions(installations):
+    return [str(i.version) for i in installations]
+
+
+def test_select_least_recently_used(add_installation):
+    now = time.time()
+    installations = [
+        add_installation("poetry", v, now - age)
+        for v, age in [("1.5.0", 10), ("1.6.0", 30), ("1.7.0", 20)]
+    ]
+    policy = EvictionPolicy(max_versions=2)
+    assert versions(select_evictions(installations, policy)) == ["1.6.0"]
+    assert versions(select_evictions(installations, policy, reserve=1)) == [
+        "1.6.0",
+        "1.7.0",
+    ]
+    pinned = {installations[1].venv}
+    assert versions(select_evictions(installations, policy, pinned)) == ["1.7.0"]
+
+
+def test_select_by_age_and_size(add_installation):
+    now = time.time()
+    installations = [
+        add_installation("poetry", "1.5.0", now - 3 * 86400, size=10),
+        add_installation("poetry", "1.6.0", now - 2 * 86400, size=20),
+        add_installation("poetry", "1.7.0", now, size=30),
+    ]
+    policy = EvictionPolicy(max_versions=0, max_age_days=2.5)
+    assert versions(select_evictions(installations, policy)) == ["1.5.0"]
+    policy = EvictionPolicy(max_versions=0, max_bytes=40)
+    assert versions(select_evictions(installations, policy)) == ["1.5.0", "1.6.0"]
+
+
+def test_last_used_stamp_wins_over_index(add_installation):
+    old = add_installation("poetry", "1.5.0", 1.0)
+    new = add_installation("poetry", "1.6.0", 2.0)
+    old.venv.joinpath(LAST_USED_STAMP).touch()
+    selected = select_evictions([old, new], EvictionPolicy(max_versions=1))
+    assert selected == [new]
+
+
+def test_ensure_executable_records_last_used(core, add_installation):
+    installation = add_installation("poetry", "1.8.0", 1.0)
+    assert Poetry.ensure_executable(core, Requirement("poetry")) == str(
+        installation.executable
+    )
+    stamp = installation.venv / LAST_USED_STAMP
+    assert stamp.exists()
+    assert installation.get_access_time() == pytest.approx(time.time(), abs=60)
+
+
+def test_eviction_config_per_tool(core, onepm_home):
+    onepm_home.mkdir(parents=True, exist_ok=True)
+    onepm_home.joinpath("config.toml").write_text(
+        "[eviction]\nmax-versions = 3\nmax-age-days = 7\n\n"
+        "[eviction.poetry]\nmax-versions = 1\n"
+    )
+    config = OneManager().config
+    assert EvictionPolicy.for_tool(config.eviction, "poetry") == EvictionPolicy(
+        max_versions=1, max_age_days=7
+    )
+    assert EvictionPolicy.for_tool(config.eviction, "pdm").max_versions == 3
+
+
+def test_evict_keeps_versions_pinned_by_projects(
+    core, add_installation, onepm_home, project
+):
+    now = time.time()
+    add_installation("poetry", "1.6.0", now - 30)
+    add_installation("poetry", "1.7.0", now - 20)
+    add_installation("poetry", "1.8.0", now - 10)
+    pinned_project = project / "pinned"
+    pinned_project.mkdir()
+    pinned_project.joinpath("pyproject.toml").write_text(
+        '[tool.onepm]\npackage-manager = "poetry<1.7"\n'
+    )
+    OneManager(pinned_project).detect_package_manager()
+    onepm_home.joinpath("config.toml").write_text("[eviction]\nmax-versions = 2\n")
+
+    core = OneManager()
+    assert versions(i for i, _ in core.evict(dry_run=True)) == ["1.7.0"]
+    assert len(core.get_installations("poetry")) == 3
+    core.evict()
+    assert versions(core.get_installations("poetry")) == ["1.8.0", "1.6.0"]
+
+
+def test_cleanup_dry_run_reports_reclaimable_space(core, add_installation):
+    add_installation("poetry", "1.7.0", 1.0, size=100)
+    add_installation("pdm", "2.12.0", 1.0, size=50)
+    removed = core.cleanup(None, None, dry_run=True)
+    assert sorted(size for _, size in removed) == [50, 100]
+    assert all(i.venv.exists() for i, _ in removed)
+
+    removed = core.cleanup("poetry", None)
+    assert [size for _, size in removed] == [100]
+    assert core.get_installations("poetry") == []
+    assert os.path.exists(core.package_dir("pdm"))
@@ -0,0 +1,81 @@
+import subprocess
+
+import pytest
+
+from onepm import pi
+from onepm.fingerprint import InstallFingerprints
+
+
+@pytest.fixture()
+def venv(project):
+    venv = project / ".venv"
+    venv.joinpath("lib", "python3.11", "site-packages").mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text("home = /usr/bin\n")
+    return venv
+
+
+def run_pi(*args):
+    with pytest.raises(SystemExit) as exc_info:
+        pi(list(args))
+    return exc_info.value.code
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pi_skipped_when_in_sync(project, venv, execute_command):
+    project.joinpath("pdm.lock").write_text("# v1\n")
+    assert run_pi() == 0
+    execute_command.assert_called_once_with(["pdm", "install"], None, exit=False)
+
+    assert run_pi() == 0
+    assert execute_command.call_count == 1
+
+    project.joinpath("pdm.lock").write_text("# v2\n")
+    assert run_pi() == 0
+    assert execute_command.call_count == 2
+    assert run_pi() == 0
+    assert execute_command.call_count == 2
+
+    assert run_pi("--force") == 0
+    assert execute_command.call_count == 3
+
+
+@pytest.mark.usefixtures("pdm")
+def test_pi_after_out_of_band_changes(project, venv, execute_command):
+    site_packages = venv / "lib" / "python3.11" / "site-packages"
+    assert run_pi() == 0
+    # pip install requests
+    site_packages.joinpath("requests-2.32.0.dist-info").mkdir()
+    assert run_pi() == 0
+    assert execute_command.call_count == 2
+    assert run_pi() == 0
+    assert execute_command.call_count == 2
+    # Packages are still imported from the venv
+    site_packages.joinpath("__pycache__").mkdir()
+    assert run_pi() == 0
+    assert execute_command.call_count == 2
+
+    # The venv is recreated
+    venv.joinpath("pyvenv.cfg").write_text("home = /usr/local/bin\n")
+    assert run_pi() == 0
+    assert execute_command.call_count == 3
+
+
+@pytest.mark.usefixtures("pdm")
+def test_failed_pi_leaves_no_fingerprint(project, venv, execute_command, onepm_home):
+    assert run_pi() == 0
+    execute_command.side_effect = subprocess.CalledProcessError(1, "pdm")
+    assert run_pi("--force") == 1
+    assert InstallFingerprints(onepm_home).get(project) is None
+
+    execute_command.side_effect = None
+    assert run_pi() == 0
+    assert execute_command.call_count == 3
+
+
+def test_pi_with_args_or_without_venv_is_not_skipped(project, execute_command, pdm):
+    pi(["requests"])
+    execute_command.assert_called_with(["pdm", "add", "requests"], None, exit=True)
+    pi([])
+    pi([])
+    execute_command.assert_called_with(["pdm", "install"], None, exit=True)
+    assert execute_command.call_count == 3
@@ -0,0 +1,98 @@
+import functools
+
+import httpx
+import pytest
+import unearth
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from onepm import httpcache
+from onepm.core import OneManager
+from onepm.httpcache import CachingClient, HTTPCache
+
+PYPI = "https://pypi.org/simple"
+PAGE = {
+    "meta": {"api-version": "1.1"},
+    "name": "poetry",
+    "files": [
+        {
+            "filename": "poetry-1.8.0-py3-none-any.whl",
+            "url": "https://files.example.org/poetry-1.8.0-py3-none-any.whl",
+            "hashes": {},
+        }
+    ],
+}
+
+
+class FakeIndex:
+    def __init__(self, **validators):
+        self.validators = validators
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        conditions = {
+            ("ETag", request.headers.get("If-None-Match")),
+            ("Last-Modified", request.headers.get("If-Modified-Since")),
+        }
+        if conditions & self.validators.items():
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            json=PAGE,
+            headers={
+                "Content-Type": "application/vnd.pypi.simple.v1+json",
+                **self.validators,
+            },
+        )
+
+
+def find_versions(client):
+    finder = unearth.PackageFinder(client, index_urls=[PYPI])
+    return [p.version for p in finder.find_all_packages("poetry")]
+
+
+@pytest.mark.parametrize(
+    "validators",
+    [{"ETag": '"abc"'}, {"Last-Modified": "Mon, 02 Sep 2024 10:00:00 GMT"}],
+)
+def test_revalidate_stored_page(tmp_path, validators):
+    index = FakeIndex(**validators)
+    cache = HTTPCache(tmp_path / "http")
+    assert find_versions(CachingClient(cache, transport=httpx.MockTransport(index)))
+    assert [r.headers.get("If-None-Match") for r in index.requests] == [None]
+
+    # In another process
+    client = CachingClient(cache, transport=httpx.MockTransport(index))
+    assert find_versions(client) == ["1.8.0"]
+    assert len(index.requests) == 2
+    name, value = next(iter(validators.items()))
+    conditional = "If-None-Match" if name == "ETag" else "If-Modified-Since"
+    assert index.requests[1].headers[conditional] == value
+
+
+def test_responses_without_validators_not_stored(tmp_path):
+    index = FakeIndex()
+    cache = HTTPCache(tmp_path / "http")
+    client = CachingClient(cache, transport=httpx.MockTransport(index))
+    assert find_versions(client) == find_versions(client) == ["1.8.0"]
+    assert not any("If-None-Match" in r.headers for r in index.requests)
+    assert not (tmp_path / "http").exists()
+
+
+def test_update_costs_one_not_modified(project, onepm_home, monkeypatch):
+    index = FakeIndex(ETag='"abc"')
+    monkeypatch.setattr(
+        httpcache,
+        "CachingClient",
+        functools.partial(CachingClient, transport=httpx.MockTransport(index)),
+    )
+    monkeypatch.setenv("ONEPM_INDEX_CACHE_TTL", "0")
+    core = OneManager()
+    assert core.package_finder.session is OneManager().http_session
+    assert core.resolve_tool(Requirement("poetry")) == Version("1.8.0")
+    assert OneManager().resolve_tool(Requirement("poetry")) == Version("1.8.0")
+    assert [r.headers.get("If-None-Match") for r in index.requests] == [None, '"abc"']
+    # Other indexes have their own session
+    monkeypatch.setenv("ONEPM_INDEX_URLS", "https://mirror.example.org/simple")
+    assert OneManager().http_session is not core.http_session
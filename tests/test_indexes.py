@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+from packaging.requirements import Requirement
+from packaging.version import Version
+from unearth import Link, Package
+
+from onepm.config import Config
+from onepm.core import OneManager
+from onepm.indexes import IndexHealth, query_fastest
+
+MIRROR = "https://mirror.example.org/simple"
+PYPI = "https://pypi.org/simple"
+BACKUP = "https://backup.example.org/simple"
+
+
+@pytest.fixture()
+def health(tmp_path):
+    return IndexHealth(tmp_path / "health.json")
+
+
+def test_rank_by_latency_and_backoff(health, tmp_path):
+    health.record_latency(MIRROR, 0.5)
+    health.record_latency(PYPI, 0.1)
+    assert health.rank([MIRROR, PYPI, BACKUP]) == [BACKUP, PYPI, MIRROR]
+
+    health.record_failure(BACKUP)
+    health.record_failure(PYPI)
+    health.record_failure(PYPI)
+    assert health.rank([MIRROR, PYPI, BACKUP]) == [MIRROR]
+    # Backing off for the shortest time first
+    assert health.rank([PYPI, BACKUP]) == [BACKUP, PYPI]
+
+    health.record_latency(PYPI, 0.3)
+    assert health.stats[PYPI].failures == 0
+    assert health.stats[PYPI].latency == pytest.approx(0.16)
+    health.record_latency(PYPI, 0.1, lower_bound=True)
+    assert health.stats[PYPI].latency == pytest.approx(0.16)
+    health.save()
+    assert IndexHealth(tmp_path / "health.json").stats == health.stats
+
+
+def test_first_answer_wins(health):
+    release = threading.Event()
+
+    def query(url):
+        if url == MIRROR:
+            release.wait()
+            return "mirror"
+        if url == BACKUP:
+            raise OSError("Connection refused")
+        return "pypi"
+
+    try:
+        assert query_fastest([MIRROR, PYPI, BACKUP], query, health) == "pypi"
+    finally:
+        release.set()
+    assert health.stats[PYPI].latency > 0
+    # Slower than PyPI, if it ever answers
+    assert health.stats[MIRROR].latency >= health.stats[PYPI].latency
+
+    with pytest.raises(OSError, match="Connection refused"):
+        query_fastest([BACKUP], query, health)
+    assert health.stats[BACKUP].failures == 1
+
+
+def test_slow_leader_is_hedged(health):
+    health.record_latency(MIRROR, 0.05)
+    health.record_latency(PYPI, 1.0)
+    started = []
+
+    def query(url):
+        started.append(url)
+        if url == MIRROR:
+            time.sleep(5)
+        return url
+
+    assert query_fastest([PYPI, MIRROR], query, health) == PYPI
+    assert started == [MIRROR, PYPI]
+    assert health.stats[MIRROR].latency > 0.05
+
+
+def test_index_urls_from_config(tmp_path, monkeypatch):
+    tmp_path.joinpath("config.toml").write_text(f'index-urls = ["{MIRROR}"]\n')
+    assert Config.load(tmp_path).index_urls == [MIRROR]
+    monkeypatch.setenv("ONEPM_INDEX_URLS", f"{MIRROR} {PYPI}")
+    assert Config.load(tmp_path).index_urls == [MIRROR, PYPI]
+
+
+def test_resolve_tool_from_mirrors(project, monkeypatch, mocker):
+    monkeypatch.setenv("ONEPM_INDEX_URLS", f"{MIRROR} {PYPI}")
+    packages = [Package("poetry", "1.8.0", Link(f"{PYPI}/poetry-1.8.0.whl"))]
+    finders = {MIRROR: mocker.Mock(), PYPI: mocker.Mock()}
+    finders[MIRROR].find_all_packages.side_effect = OSError("Mirror is down")
+    finders[PYPI].find_all_packages.return_value = packages
+    mocker.patch.object(OneManager, "_index_finder", side_effect=finders.get)
+
+    core = OneManager()
+    assert core.resolve_tool(Requirement("poetry")) == Version("1.8.0")
+    assert core.index_health.stats[MIRROR].failures == 1
+
+    # Not carried by the mirror, which is up again
+    core.index_health.path.unlink()
+    answered = threading.Event()
+    finders[MIRROR].find_all_packages.side_effect = lambda *args, **kwargs: (
+        answered.set() or []
+    )
+    finders[PYPI].find_all_packages.side_effect = lambda *args, **kwargs: (
+        answered.wait() and packages
+    )
+    core = OneManager()
+    assert core.resolve_tool(Requirement("pdm")) == Version("1.8.0")
+    assert core.index_health.stats[MIRROR].failures == 0
+
+    # Not found on any index
+    finders[PYPI].find_all_packages.side_effect = None
+    finders[PYPI].find_all_packages.return_value = []
+    with pytest.raises(Exception, match="Cannot find package"):
+        OneManager().resolve_tool(Requirement("uv"))
@@ -0,0 +1,80 @@
+import json
+
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from onepm.core import OneManager
+
+
+def make_venv(core: OneManager, name: str, version: str, venv_name: str):
+    venv = core.package_dir(name) / venv_name
+    dist_info = venv / "lib/python3.11/site-packages" / f"{name}-{version}.dist-info"
+    dist_info.mkdir(parents=True)
+    dist_info.joinpath("METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    )
+    return venv
+
+
+def test_index_rebuilt_from_disk(core):
+    make_venv(core, "poetry", "1.7.0", "a")
+    make_venv(core, "poetry", "1.8.0", "b")
+    index = core.installation_index("poetry")
+    assert not index.path.exists()
+
+    installations = core.get_installations("poetry")
+    assert [i.version for i in installations] == [Version("1.8.0"), Version("1.7.0")]
+    assert index.path.exists()
+    assert installations[0].executable.parent.parent == installations[0].venv
+
+
+def test_index_is_read_without_scanning_venvs(core, mocker):
+    make_venv(core, "poetry", "1.8.0", "a")
+    core.get_installations("poetry")
+
+    rebuild = mocker.patch("onepm.installations.InstallationIndex.rebuild")
+    assert [i.version for i in core.get_installations("poetry")] == [Version("1.8.0")]
+    rebuild.assert_not_called()
+
+
+def test_corrupt_index_is_rebuilt(core):
+    make_venv(core, "poetry", "1.8.0", "a")
+    index = core.installation_index("poetry")
+    index.path.parent.mkdir(parents=True, exist_ok=True)
+    index.path.write_text("{not json")
+
+    assert [i.version for i in core.get_installations("poetry")] == [Version("1.8.0")]
+    assert json.loads(index.path.read_text())["installations"][0]["version"] == "1.8.0"
+
+
+def test_index_drops_removed_venvs(core):
+    make_venv(core, "poetry", "1.7.0", "a")
+    venv = make_venv(core, "poetry", "1.8.0", "b")
+    core.get_installations("poetry")
+
+    core.cleanup("poetry", "1.8.0")
+    assert not venv.exists()
+    assert [i.version for i in core.get_installations("poetry")] == [Version("1.7.0")]
+
+    core.cleanup("poetry", None)
+    assert not core.installation_index("poetry").path.exists()
+    assert core.get_installations("poetry") == []
+
+
+def test_install_tool_updates_index(core, mocker, lock_tool):
+    mocker.patch.object(OneManager, "resolve_tool", return_value=Version("1.8.0"))
+    install_locked = mocker.patch.object(
+        OneManager,
+        "_install_locked",
+        side_effect=lambda lock, venv: venv.mkdir(parents=True, exist_ok=True),
+    )
+
+    installation = core.install_tool("poetry", Requirement("poetry"))
+    lock = install_locked.call_args.args[0]
+    assert (lock.name, lock.version) == ("poetry", "1.8.0")
+    assert install_locked.call_args.args[1] == installation.venv
+    assert core.get_installations("poetry") == [installation]
+    # The second call is served by the index
+    assert core.install_tool("poetry", Requirement("poetry")) == installation
+    install_locked.assert_called_once()
+    lock_tool.assert_called_once()
@@ -0,0 +1,81 @@
+import sys
+
+import pytest
+from packaging.version import Version
+
+from onepm.core import OneManager
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The fake installers are shell scripts"
+)
+
+
+def fake_installer(path, log, returncode=0, label=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        f'#!/bin/sh\necho "{label or path.name} $*" >> {log}\nexit {returncode}\n'
+    )
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture()
+def log(tmp_path):
+    return tmp_path / "calls.log"
+
+
+@pytest.fixture()
+def fake_pip_core(core, project, log, monkeypatch):
+    monkeypatch.setenv("PATH", str(project / "path"))
+    fake_pip = project / "pip.py"
+    fake_pip.write_text(
+        f"import sys\nwith open({str(log)!r}, 'a') as f:\n"
+        "    f.write('pip ' + ' '.join(sys.argv[1:]) + '\\n')\n"
+    )
+    core.__dict__["_pip_location"] = fake_pip
+    return core
+
+
+def calls(log):
+    return log.read_text().splitlines()
+
+
+def test_install_with_uv_in_path(fake_pip_core, project, log):
+    fake_installer(project / "path" / "uv", log)
+    venv = project / "venv"
+    fake_pip_core._run_pip("install", "poetry==1.8.0", venv=venv)
+    assert calls(log) == [
+        f"uv pip install poetry==1.8.0 --python {venv / 'bin' / 'python'}"
+    ]
+
+
+def test_prefer_uv_installed_by_onepm(fake_pip_core, project, log):
+    fake_installer(project / "path" / "uv", log)
+    venv = fake_pip_core.package_dir("uv") / "0.4.0"
+    fake_installer(venv / "bin" / "uv", log, label="managed-uv")
+    index = fake_pip_core.installation_index("uv")
+    index.add(index.make_installation(Version("0.4.0"), venv))
+
+    fake_pip_core._run_pip("install", "pdm==2.12.0", venv=project / "venv")
+    assert calls(log)[0].startswith("managed-uv pip install pdm==2.12.0")
+
+
+def test_fall_back_to_pip(fake_pip_core, project, log):
+    fake_installer(project / "path" / "uv", log, returncode=1)
+    fake_pip_core._run_pip("install", "poetry==1.8.0", venv=project / "venv")
+    assert [call.split()[0] for call in calls(log)] == ["uv", "pip"]
+    assert calls(log)[1] == "pip install poetry==1.8.0"
+
+
+def test_installer_configured(fake_pip_core, project, log, monkeypatch):
+    fake_installer(project / "path" / "uv", log, returncode=1)
+    monkeypatch.setenv("ONEPM_INSTALLER", "pip")
+    core = OneManager()
+    core.__dict__["_pip_location"] = project / "pip.py"
+    core._run_pip("install", "poetry==1.8.0", venv=project / "venv")
+    assert calls(log) == ["pip install poetry==1.8.0"]
+
+    monkeypatch.setenv("ONEPM_INSTALLER", "uv")
+    core = OneManager()
+    with pytest.raises(Exception, match="returned non-zero exit status 1"):
+        core._run_pip("install", "poetry==1.8.0", venv=project / "venv")
@@ -0,0 +1,103 @@
+import os
+import sys
+
+import pytest
+from packaging.version import Version
+
+from onepm.core import OneManager
+from onepm.interpreters import InterpreterCache
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The fake interpreters are shell scripts"
+)
+
+
+def fake_python(path, version):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"#!/bin/sh\necho {version}\n")
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture()
+def path_dir(tmp_path, monkeypatch):
+    path_dir = tmp_path / "path"
+    path_dir.mkdir()
+    monkeypatch.setenv("PATH", str(path_dir))
+    for var in ("PYENV_ROOT", "UV_PYTHON_INSTALL_DIR", "XDG_DATA_HOME"):
+        monkeypatch.delenv(var, raising=False)
+    return path_dir
+
+
+@pytest.fixture()
+def query_version(mocker):
+    from onepm import interpreters
+
+    return mocker.patch.object(
+        interpreters, "_query_version", side_effect=interpreters._query_version
+    )
+
+
+def test_find_interpreters(path_dir, tmp_path, onepm_home, query_version):
+    python39 = fake_python(path_dir / "python3.9", "3.9.18")
+    python312 = fake_python(path_dir / "python3.12", "3.12.1")
+    fake_python(path_dir.parent / "shims" / "python3", "3.13.0")
+    os.environ["PATH"] += os.pathsep + str(path_dir.parent / "shims")
+    managed = fake_python(
+        onepm_home.parent / ".pyenv" / "versions" / "3.10.4" / "bin" / "python3",
+        "3.10.4",
+    )
+    os.symlink(python312, path_dir / "python3")
+
+    cache = InterpreterCache(onepm_home)
+    found = {(i.executable, i.version) for i in cache.find_all()}
+    assert found == {
+        (os.path.realpath(sys.executable), Version(sys.version.split()[0])),
+        (str(python39), Version("3.9.18")),
+        (str(python312), Version("3.12.1")),
+        (str(managed), Version("3.10.4")),
+    }
+    assert cache.find(None) == sys.executable
+    assert cache.find(">=3.12") == str(python312)
+    assert cache.find("<3.10") == str(python39)
+    with pytest.raises(Exception, match="No Python interpreter is found"):
+        cache.find(">=4")
+
+    # Only the upgraded interpreter is run again
+    query_version.reset_mock()
+    cache.find_all()
+    query_version.assert_not_called()
+    fake_python(python39, "3.9.19")
+    assert Version("3.9.19") in {i.version for i in cache.find_all()}
+    query_version.assert_called_once_with(str(python39))
+
+
+def test_project_venv_honors_requires_python(path_dir, project, mocker):
+    python312 = fake_python(path_dir / "python3.12", "3.12.1")
+    project.joinpath("pyproject.toml").write_text(
+        '[project]\nname = "demo"\nrequires-python = ">=3.12"\n'
+    )
+    if sys.version_info >= (3, 12):
+        assert OneManager().find_python() == sys.executable
+    else:
+        assert OneManager().find_python() == str(python312)
+
+
+def test_installation_records_interpreter(path_dir, onepm_home):
+    python = fake_python(path_dir / "python3.11", "3.11.0")
+    core = OneManager()
+    index = core.installation_index("poetry")
+    venv = core.package_dir("poetry") / "venv"
+    venv.mkdir(parents=True)
+    installation = index.make_installation(Version("1.8.0"), venv, python=str(python))
+    index.add(installation)
+    assert installation.python == str(python)
+    assert core.get_installations("poetry") == [installation]
+
+    # Upgraded in place
+    fake_python(python, "3.11.10")
+    assert installation.interpreter_changed()
+    assert core.get_installations("poetry") == []
+    assert [i for i, _ in core.evict("poetry")] == [installation]
+    assert not venv.exists()
+    assert index.load() == []
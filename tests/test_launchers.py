@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+from onepm.launchers import (
+    launcher_dir,
+    resolution_file,
+    write_launchers,
+    write_resolution,
+)
+from onepm.pm.poetry import Poetry
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The launchers are POSIX shell scripts"
+)
+
+
+def make_script(path, output):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'#!/bin/sh\necho {output} "$@"\n')
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture()
+def launcher(project, onepm_home, monkeypatch):
+    monkeypatch.delenv("VIRTUAL_ENV", raising=False)
+    monkeypatch.setenv("PWD", str(project))
+    # Stands for the Python resolver
+    python = make_script(project / "fake-python", "resolve")
+    write_launchers(onepm_home, str(python))
+    return launcher_dir(onepm_home) / "poetry"
+
+
+def run(launcher, *args):
+    return subprocess.run(
+        [str(launcher), *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PWD": os.getcwd()},
+    ).stdout.strip()
+
+
+def test_launcher_execs_resolved_tool(project, onepm_home, launcher):
+    project.joinpath("poetry.lock").touch()
+    package_dir = onepm_home / "venvs" / "poetry"
+    executable = make_script(package_dir / "abc" / "bin" / "poetry", "poetry")
+    time.sleep(0.01)
+    write_resolution(
+        onepm_home, str(project), project, Poetry(str(executable)), package_dir
+    )
+
+    assert run(launcher, "install") == "poetry install"
+    assert package_dir.joinpath("abc", ".onepm-last-used").exists()
+    assert resolution_file(onepm_home, str(project), "poetry").exists()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda project, executable: project.joinpath("pdm.lock").touch(),
+        lambda project, executable: executable.unlink(),
+        lambda project, executable: executable.parent.parent.with_name("new").mkdir(),
+    ],
+)
+def test_launcher_falls_back_when_stale(project, onepm_home, launcher, change):
+    package_dir = onepm_home / "venvs" / "poetry"
+    executable = make_script(package_dir / "abc" / "bin" / "poetry", "poetry")
+    time.sleep(0.01)
+    write_resolution(
+        onepm_home, str(project), project, Poetry(str(executable)), package_dir
+    )
+    assert run(launcher, "lock") == "poetry lock"
+
+    time.sleep(0.01)
+    change(project, executable)
+    assert run(launcher, "lock") == "resolve -m onepm.launchers poetry lock"
+
+
+def test_launcher_without_resolution(project, launcher):
+    assert run(launcher) == "resolve -m onepm.launchers poetry"
+
+
+def test_launcher_ignores_colliding_directory(
+    project, onepm_home, launcher, monkeypatch
+):
+    package_dir = onepm_home / "venvs" / "poetry"
+    executable = make_script(package_dir / "abc" / "bin" / "poetry", "poetry")
+    resolved = project / "a" / "b"
+    resolved.mkdir(parents=True)
+    colliding = project / "a%b"
+    colliding.mkdir()
+    assert resolution_file(onepm_home, str(resolved), "poetry") == resolution_file(
+        onepm_home, str(colliding), "poetry"
+    )
+    time.sleep(0.01)
+    write_resolution(
+        onepm_home, str(resolved), project, Poetry(str(executable)), package_dir
+    )
+    monkeypatch.chdir(resolved)
+    assert run(launcher, "lock") == "poetry lock"
+    monkeypatch.chdir(colliding)
+    assert run(launcher, "lock") == "resolve -m onepm.launchers poetry lock"
+
+
+@pytest.mark.skipif(not shutil.which("flock"), reason="flock is not available")
+def test_launcher_holds_installation_lock(project, onepm_home, launcher):
+    package_dir = onepm_home / "venvs" / "poetry"
+    stamp = package_dir / "abc" / ".onepm-last-used"
+    executable = package_dir / "abc" / "bin" / "poetry"
+    executable.parent.mkdir(parents=True)
+    executable.write_text(
+        f"#!/bin/sh\nflock -xn {stamp} true && echo free || echo locked\n"
+    )
+    executable.chmod(0o755)
+    time.sleep(0.01)
+    write_resolution(
+        onepm_home, str(project), project, Poetry(str(executable)), package_dir
+    )
+    # Not removable by the eviction while the tool runs
+    assert run(launcher) == "locked"
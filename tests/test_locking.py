@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from packaging.version import Version
+
+from onepm import cache
+from onepm.core import OneManager
+from onepm.installations import INCOMPLETE_MARKER
+from onepm.locking import FileLock
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    path = tmp_path / "test.lock"
+    shared = FileLock(path)
+    other = FileLock(path)
+    assert shared.acquire(shared=True)
+    assert other.acquire(shared=True, blocking=False)
+    assert not FileLock(path).acquire(blocking=False)
+    shared.release()
+    other.release()
+    with FileLock(path):
+        assert not FileLock(path).acquire(shared=True, blocking=False)
+
+
+def test_evict_skips_installations_in_use(core, add_installation):
+    now = time.time()
+    old = add_installation("poetry", "1.5.0", now - 20)
+    add_installation("poetry", "1.6.0", now - 10)
+    add_installation("poetry", "1.7.0", now)
+    # Used by a long-running process
+    stamp = old.venv / cache.LAST_USED_STAMP
+    lock = FileLock(stamp)
+    lock.acquire(shared=True)
+    os.utime(stamp, (now - 20, now - 20))
+
+    core.config.eviction = {"max-versions": 2}
+    assert core.evict("poetry") == []
+    assert old.venv.exists()
+    assert len(core.get_installations("poetry")) == 3
+
+    lock.release()
+    assert [i.venv for i, _ in core.evict("poetry")] == [old.venv]
+    assert not old.venv.exists()
+    assert not cache.use_installation(old.venv)
+
+
+def test_concurrent_installs_of_same_version(core, mocker, lock_tool):
+    def install_locked(lock, venv):
+        time.sleep(0.2)
+        venv.mkdir(parents=True, exist_ok=True)
+
+    install_mock = mocker.patch.object(
+        OneManager, "_install_locked", side_effect=install_locked
+    )
+    barrier = threading.Barrier(3)
+
+    def install():
+        barrier.wait()
+        return core.install_tool_version("poetry", Version("1.8.0"))
+
+    with ThreadPoolExecutor(3) as executor:
+        results = list(executor.map(lambda _: install(), range(3)))
+
+    assert install_mock.call_count == 1
+    assert len({i.venv for i in results}) == 1
+    assert not results[0].venv.joinpath(INCOMPLETE_MARKER).exists()
+    assert len(core.get_installations("poetry")) == 1
+
+
+def test_incomplete_installations(core):
+    venv = core.package_dir("poetry") / "partial"
+    venv.mkdir(parents=True)
+    venv.joinpath(INCOMPLETE_MARKER).write_text("1.8.0")
+    assert core.get_installations("poetry") == []
+
+    # Still being installed by another process
+    lock = FileLock(core._tool_dir / "locks" / "poetry-1.8.0.lock")
+    with lock:
+        core.evict("poetry")
+        assert venv.exists()
+    core.evict("poetry")
+    assert not venv.exists()
+
+
+def test_marker_being_written(core):
+    venv = core.package_dir("poetry") / "partial"
+    venv.mkdir(parents=True)
+    # Created, the version not written yet
+    venv.joinpath(INCOMPLETE_MARKER).touch()
+    core.evict("poetry")
+    assert venv.exists()
+
+
+def test_total_eviction_runs_without_tool_lock(
+    core, add_installation, lock_tool, mocker
+):
+    add_installation("poetry", "1.5.0", 1.0, size=100)
+    core.config.eviction = {"total-max-bytes": 50}
+    core.config.shared_store = False
+    mocker.patch.object(OneManager, "_install_locked")
+    held = []
+
+    def remove_unused(self, venv):
+        # Taking poetry's lock while holding pdm's could deadlock
+        held.append(self._tool_lock("pdm")._depth)
+        return True
+
+    mocker.patch.object(
+        OneManager, "_remove_unused", autospec=True, side_effect=remove_unused
+    )
+    core.install_tool_version("pdm", Version("2.12.0"))
+    assert held == [0]
+    assert core.get_installations("poetry") == []
+    assert len(core.get_installations("pdm")) == 1
@@ -0,0 +1,79 @@
+import pytest
+from packaging.requirements import Requirement
+from packaging.version import Version
+from unearth import Link, Package
+
+from onepm.core import OneManager
+
+PACKAGES = [
+    Package("poetry", "2.0.0b1", Link("https://example.org/poetry-2.0.0b1.whl")),
+    Package(
+        "poetry",
+        "1.8.1",
+        Link("https://example.org/poetry-1.8.1.whl", yank_reason="broken"),
+    ),
+    Package("poetry", "1.8.0", Link("https://example.org/poetry-1.8.0.whl")),
+]
+
+
+@pytest.fixture()
+def finder(mocker):
+    finder = mocker.Mock()
+    finder.find_all_packages.return_value = PACKAGES
+    mocker.patch.object(OneManager, "package_finder", finder)
+    return finder
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("poetry", "1.8.0"),
+        ("poetry==1.8.1", "1.8.1"),
+        ("poetry>=2.0.0b1", "2.0.0b1"),
+    ],
+)
+def test_resolve_tool_from_project_page(project, finder, spec, expected):
+    assert OneManager().resolve_tool(Requirement(spec)) == Version(expected)
+
+
+def test_project_page_is_cached(project, finder, monkeypatch):
+    assert OneManager().resolve_tool(Requirement("poetry")) == Version("1.8.0")
+    assert OneManager().resolve_tool(Requirement("poetry>=2.0.0b1")) == Version(
+        "2.0.0b1"
+    )
+    finder.find_all_packages.assert_called_once()
+
+    monkeypatch.setenv("ONEPM_INDEX_CACHE_TTL", "0")
+    OneManager().resolve_tool(Requirement("poetry"))
+    assert finder.find_all_packages.call_count == 2
+
+
+def test_project_page_cache_respects_index_url(project, finder):
+    OneManager().resolve_tool(Requirement("poetry"))
+    OneManager(index_url="https://mirror.example.org/simple").resolve_tool(
+        Requirement("poetry")
+    )
+    assert finder.find_all_packages.call_count == 2
+
+
+def test_offline_resolves_local_installations(project, finder, monkeypatch, mocker):
+    monkeypatch.setenv("ONEPM_OFFLINE", "1")
+    core = OneManager()
+    index = core.installation_index("poetry")
+    for version in ["1.7.0", "1.8.0"]:
+        venv = core.package_dir("poetry") / version
+        venv.mkdir(parents=True, exist_ok=True)
+        index.add(index.make_installation(Version(version), venv))
+
+    assert core.resolve_tool(Requirement("poetry<1.8")) == Version("1.7.0")
+    assert core.update_package_manager("poetry") is None
+    with pytest.raises(Exception, match="offline mode"):
+        core.resolve_tool(Requirement("poetry>=2"))
+    finder.find_all_packages.assert_not_called()
+
+
+def test_offline_flag_overrides_config(project, onepm_home):
+    onepm_home.mkdir(parents=True, exist_ok=True)
+    onepm_home.joinpath("config.toml").write_text("offline = true\n")
+    assert OneManager().offline
+    assert not OneManager(offline=False).offline
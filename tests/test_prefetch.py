@@ -0,0 +1,85 @@
+import subprocess
+from argparse import Namespace
+
+import pytest
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from onepm.cli import prefetch
+from onepm.core import OneManager
+
+AVAILABLE = {"poetry": ["1.7.0", "1.8.0"], "pdm": ["2.12.0"], "uv": ["0.4.0"]}
+
+
+@pytest.fixture()
+def prefetch_core(core, mocker, lock_tool):
+    def resolve_tool(requirement):
+        versions = [
+            v for v in AVAILABLE.get(requirement.name, []) if v in requirement.specifier
+        ]
+        if not versions:
+            raise Exception(f"Cannot find package matching requirement {requirement}")
+        return Version(max(versions, key=Version))
+
+    def install_locked(lock, venv):
+        venv.mkdir(parents=True, exist_ok=True)
+        if lock.name == "uv":
+            raise subprocess.CalledProcessError(
+                1, "pip", stderr="ERROR: No matching distribution found for uv\n"
+            )
+
+    mocker.patch.object(OneManager, "resolve_tool", side_effect=resolve_tool)
+    mocker.patch.object(OneManager, "_install_locked", side_effect=install_locked)
+    return core
+
+
+def test_prefetch_installs_each_version_once(prefetch_core):
+    requirements = [
+        Requirement("poetry"),
+        Requirement("poetry>=1.8"),
+        Requirement("poetry<1.8"),
+        Requirement("pdm"),
+    ]
+    results = dict(prefetch_core.prefetch(requirements, jobs=2))
+    assert all(not isinstance(r, Exception) for r in results.values())
+    assert results[requirements[0]] is results[requirements[1]]
+    assert prefetch_core._install_locked.call_count == 3
+    assert [i.version for i in prefetch_core.get_installations("poetry")] == [
+        Version("1.8.0"),
+        Version("1.7.0"),
+    ]
+
+
+def test_prefetch_failures_keep_index_consistent(prefetch_core):
+    results = dict(
+        prefetch_core.prefetch(
+            [Requirement("uv"), Requirement("pdm"), Requirement("hatch")]
+        )
+    )
+    assert isinstance(results[Requirement("uv")], subprocess.CalledProcessError)
+    assert isinstance(results[Requirement("hatch")], Exception)
+    assert prefetch_core.get_installations("uv") == []
+    assert not any(prefetch_core.package_dir("uv").iterdir())
+    assert [i.version for i in prefetch_core.get_installations("pdm")] == [
+        Version("2.12.0")
+    ]
+
+
+def test_prefetch_command(prefetch_core, project, capsys):
+    project.joinpath("tools.txt").write_text("# tools\npoetry<1.8\nuv\n")
+    other = project / "other"
+    other.mkdir()
+    other.joinpath("pyproject.toml").write_text(
+        '[tool.onepm]\npackage-manager = "pdm"\n'
+    )
+    args = Namespace(
+        specs=["poetry", "pdm>=>2"],
+        requirements=["tools.txt"],
+        project=[str(other)],
+        jobs=None,
+    )
+    assert prefetch(prefetch_core, args) == 1
+    out, err = capsys.readouterr()
+    assert "3 succeeded, 2 failed" in out
+    assert "failed pdm>=>2: " in err
+    assert "failed uv: ERROR: No matching distribution found for uv" in err
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from onepm.pm.base import PackageManager
+from onepm.process import run_command, run_concurrently
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_run_command_streams_output():
+    lines = []
+    result = asyncio.run(
+        run_command(
+            python(
+                "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"
+            ),
+            on_output=lambda name, line: lines.append((name, line.strip())),
+        )
+    )
+    assert result.returncode == 3
+    assert (result.stdout.strip(), result.stderr.strip()) == ("out", "err")
+    assert sorted(lines) == [("stderr", "err"), ("stdout", "out")]
+    with pytest.raises(subprocess.CalledProcessError):
+        result.check_returncode()
+
+
+def test_execute_async(mocker):
+    class Fake(PackageManager):
+        name = "fake"
+
+        def get_command(self):
+            return [sys.executable, "-c", "import os, sys; print(*sys.argv[1:])"]
+
+    mocker.patch.object(Fake, "__abstractmethods__", frozenset())
+    result = asyncio.run(Fake("fake").execute_async("a", "b", check=True))
+    assert result.stdout.strip() == "a b"
+
+
+def test_run_command_timeout():
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as excinfo:
+        asyncio.run(
+            run_command(
+                python("import time; print('started', flush=True); time.sleep(30)"),
+                timeout=1,
+            )
+        )
+    assert time.monotonic() - start < 10
+    assert excinfo.value.output.strip() == "started"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Checks the pid with os.kill")
+def test_run_command_cancelled_terminates_process(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def main():
+        task = asyncio.create_task(
+            run_command(
+                [
+                    *python(
+                        "import os, sys, time; "
+                        "open(sys.argv[1], 'w').write(str(os.getpid())); time.sleep(30)"
+                    ),
+                    str(pid_file),
+                ]
+            )
+        )
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_run_concurrently_limits_jobs():
+    running = 0
+    peak = 0
+
+    async def job(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        if i == 2:
+            raise ValueError(i)
+        return i
+
+    results = asyncio.run(run_concurrently((job(i) for i in range(5)), jobs=2))
+    assert peak == 2
+    assert results[:2] + results[3:] == [0, 1, 3, 4]
+    assert isinstance(results[2], ValueError)
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from onepm import pi
+from onepm.core import OneManager
+from onepm.project import get_project
+
+
+@pytest.fixture()
+def subdir(project):
+    subdir = project / "src" / "pkg"
+    subdir.mkdir(parents=True)
+    os.chdir(subdir)
+    return subdir
+
+
+def test_project_root_found_from_subdirectory(project, subdir, mocker):
+    mocker.patch(
+        "onepm.pm.base.PackageManager.ensure_executable", return_value="python"
+    )
+    project.joinpath("pdm.lock").touch()
+    core = OneManager()
+    assert core.path == project
+    assert core.get_package_manager().name == "pdm"
+
+
+def test_project_root_stops_at_repository(project):
+    project.joinpath("pyproject.toml").write_text("[tool.pdm]\n")
+    repo = project / "repo"
+    repo.joinpath(".git").mkdir(parents=True)
+    subdir = repo / "sub"
+    subdir.mkdir()
+    assert get_project(subdir).root == subdir
+    assert get_project(subdir).pyproject == {}
+
+
+def test_project_memoized_until_changed(project):
+    context = get_project()
+    assert get_project() is context
+    assert not context.exists("poetry.lock")
+
+    project.joinpath("poetry.lock").touch()
+    context = get_project()
+    assert context.exists("poetry.lock")
+    assert get_project() is context
+
+    project.joinpath("pyproject.toml").write_text("[tool.poetry]\n")
+    assert get_project().pyproject == {"tool": {"poetry": {}}}
+
+
+@pytest.mark.usefixtures("pip")
+def test_pip_install_from_subdirectory(project, subdir, execute_command):
+    project.joinpath("requirements.txt").touch()
+    pi([])
+    execute_command.assert_called_with(
+        [
+            "python",
+            "-m",
+            "pip",
+            "install",
+            "-r",
+            os.path.join("..", "..", "requirements.txt"),
+        ],
+        None,
+        exit=True,
+    )
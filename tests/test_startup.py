@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+from onepm.cache import ResolutionCache
+
+# Modules that must not be imported by the shortcuts on a warm cache
+HEAVY_MODULES = {
+    "tomlkit",
+    "tomllib",
+    "packaging",
+    "importlib.metadata",
+    "uuid",
+    "unearth",
+    "onepm.core",
+}
+
+
+def loaded_modules(code: str) -> set[str]:
+    """The modules in sys.modules after running the code in a fresh interpreter."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def shortcut_imports(code: str) -> set[str]:
+    return loaded_modules(code) - loaded_modules("pass")
+
+
+def heavy_modules(imported: set[str]) -> set[str]:
+    """The heavy modules and their submodules among the imported ones."""
+    return {
+        name
+        for name in imported
+        if any(name == heavy or name.startswith(f"{heavy}.") for heavy in HEAVY_MODULES)
+    }
+
+
+def test_import_onepm_is_lightweight():
+    imported = shortcut_imports("import onepm")
+    assert not heavy_modules(imported)
+
+
+def test_shortcut_cache_hit_is_lightweight(project, onepm_home):
+    executable = project / "pdm"
+    executable.touch()
+    project.joinpath("pdm.lock").touch()
+    ResolutionCache(onepm_home).set(project, None, "pdm", str(executable))
+
+    imported = shortcut_imports(
+        "from onepm import resolve_package_manager\n"
+        "assert resolve_package_manager().name == 'pdm'"
+    )
+    assert "onepm.pm.base" in imported
+    assert not heavy_modules(imported)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from onepm.store import SharedStore
+
+
+@pytest.fixture()
+def store(tmp_path):
+    return SharedStore(tmp_path / "objects")
+
+
+def make_tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+
+def test_identical_files_are_linked(tmp_path, store):
+    first = make_tree(tmp_path / "a", {"pkg/__init__.py": "x = 1", "dep.py": "y"})
+    second = make_tree(tmp_path / "b", {"pkg/__init__.py": "x = 2", "dep.py": "y"})
+
+    assert store.link_tree(first) == 0
+    assert store.link_tree(second) == 1
+    assert os.path.samefile(first / "dep.py", second / "dep.py")
+    assert not os.path.samefile(first / "pkg/__init__.py", second / "pkg/__init__.py")
+    assert (second / "pkg/__init__.py").read_text() == "x = 2"
+    # Linking again is a no-op
+    assert store.link_tree(second) == 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+def test_executable_files_are_not_shared_with_regular_files(tmp_path, store):
+    first = make_tree(tmp_path / "a", {"run": "#!/bin/sh"})
+    second = make_tree(tmp_path / "b", {"run": "#!/bin/sh"})
+    (second / "run").chmod(0o755)
+
+    store.link_tree(first)
+    store.link_tree(second)
+    assert not os.path.samefile(first / "run", second / "run")
+    assert os.access(second / "run", os.X_OK)
+
+
+def test_prune_removes_unreferenced_objects(tmp_path, store):
+    first = make_tree(tmp_path / "a", {"dep.py": "y", "only_a.py": "a"})
+    second = make_tree(tmp_path / "b", {"dep.py": "y"})
+    store.link_tree(first)
+    store.link_tree(second)
+
+    (first / "only_a.py").unlink()
+    assert store.prune() == 1
+    (first / "dep.py").unlink()
+    assert store.prune() == 0
+    (second / "dep.py").unlink()
+    assert store.prune() == 1
+    assert not any(store.root.rglob("*/*"))
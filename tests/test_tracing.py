@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from packaging.version import Version
+
+from onepm import tracing
+from onepm.core import OneManager
+
+
+def test_tracing_disabled(monkeypatch):
+    # Enabled at import time when ONEPM_TRACE is set
+    monkeypatch.setattr(tracing, "tracer", None)
+
+    def func():
+        pass
+
+    assert tracing.traced("func")(func) is func
+    assert tracing.span("block") is tracing.span("other")
+
+
+def test_tracer_records_nested_spans():
+    tracer = tracing.Tracer()
+    with tracer.span("outer"):
+        with tracer.span("inner", {"name": "poetry"}):
+            pass
+
+    inner, outer = tracer.spans
+    assert (outer.name, outer.depth) == ("outer", 0)
+    assert (inner.name, inner.depth) == ("inner", 1)
+    assert outer.start <= inner.start
+    assert outer.duration >= inner.duration
+    assert "  inner (name=poetry)" in tracer.summary()
+    events = tracer.chrome_trace()["traceEvents"]
+    assert [e["name"] for e in events] == ["inner", "outer"]
+    assert events[0]["ph"] == "X"
+    assert events[0]["args"] == {"name": "poetry"}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake tool is a shell script")
+@pytest.mark.parametrize("destination", ["1", "trace.json"])
+def test_trace_shortcut(project, destination):
+    project.joinpath("poetry.lock").touch()
+    core = OneManager()
+    venv = core.package_dir("poetry") / "1.8.0"
+    executable = venv / "bin" / "poetry"
+    executable.parent.mkdir(parents=True)
+    executable.write_text("#!/bin/sh\nexit 0\n")
+    executable.chmod(0o755)
+    index = core.installation_index("poetry")
+    index.add(index.make_installation(Version("1.8.0"), venv))
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(sys.path),
+        "ONEPM_TRACE": destination,
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", "from onepm import pa; pa(['--version'])"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    if destination == "1":
+        output = result.stderr
+    else:
+        output = project.joinpath(destination).read_text()
+        json.loads(output)
+    for name in [
+        "resolve_package_manager",
+        "OneManager.detect_package_manager",
+        "PackageManager.ensure_executable",
+    ]:
+        assert name in output
@@ -0,0 +1,85 @@
+import subprocess
+import sys
+from importlib.metadata import version
+
+from onepm.core import OneManager
+from onepm.venvs import (
+    TEMPLATE_PROMPT,
+    compile_bytecode,
+    create_venv,
+    pip_version,
+    site_packages,
+    warmup,
+)
+
+BIN_DIR = "Scripts" if sys.platform == "win32" else "bin"
+
+
+def run_python(venv, code):
+    return subprocess.run(
+        [str(venv / BIN_DIR / "python"), "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+def test_create_venv_from_template(tmp_path):
+    templates = tmp_path / "templates"
+    first = create_venv(tmp_path / "first", templates)
+    second = create_venv(tmp_path / "second", templates)
+
+    assert len(list(templates.iterdir())) == 2  # The template and its lock
+    for venv in (first, second):
+        assert run_python(venv, "import sys; print(sys.prefix)") == str(venv)
+        config = venv.joinpath("pyvenv.cfg").read_text().splitlines()
+        assert not any(line.startswith("prompt") for line in config)
+        assert pip_version(venv) is None
+    if sys.platform != "win32":
+        activate = second.joinpath("bin", "activate").read_text()
+        assert str(second) in activate
+        assert "(second)" in activate
+        assert TEMPLATE_PROMPT not in activate
+
+
+def test_make_venv_links_shared_pip(project):
+    core = OneManager()
+    venv = core.make_venv(project / ".venv")
+
+    assert pip_version(venv) == version("pip")
+    pip_file = run_python(venv, "import pip; print(pip.__file__)")
+    assert pip_file.startswith(str(core._tool_dir / "shared"))
+    assert core.make_venv(venv) == venv
+
+
+def test_compile_bytecode_and_warmup(tmp_path):
+    venv = create_venv(tmp_path / "venv", tmp_path / "templates")
+    package = site_packages(venv) / "tool"
+    package.mkdir()
+    package.joinpath("__init__.py").write_text("from tool import cli\n")
+    package.joinpath("cli.py").write_text("VERSION = 1\n")
+    package.joinpath("template.py").write_text("{% if not python %}\n")
+
+    assert not compile_bytecode(venv, jobs=2)
+    compiled = {path.name.split(".")[0] for path in package.glob("__pycache__/*.pyc")}
+    assert compiled == {"__init__", "cli"}
+    assert warmup(venv, "tool")
+    assert not warmup(venv, "missing")
+
+
+def test_precompile_as_configured(project, mocker, monkeypatch):
+    compile_bytecode = mocker.patch("onepm.venvs.compile_bytecode")
+    warmup = mocker.patch("onepm.venvs.warmup")
+    monkeypatch.setenv("ONEPM_COMPILE_JOBS", "2")
+    OneManager()._precompile("poetry", project / "venv")
+    compile_bytecode.assert_called_once_with(project / "venv", 2)
+    warmup.assert_not_called()
+
+    monkeypatch.setenv("ONEPM_COMPILE_BYTECODE", "false")
+    monkeypatch.setenv("ONEPM_WARMUP", "true")
+    compile_bytecode.reset_mock()
+    OneManager()._precompile("poetry", project / "venv")
+    compile_bytecode.assert_not_called()
+    warmup.assert_called_once_with(project / "venv", "poetry.console.application")
+    OneManager()._precompile("uv", project / "venv")
+    warmup.assert_called_once()